@@ -1,13 +1,15 @@
 from django.contrib import admin
 from django import forms
 from django.db import models
-from .models import Challenge, SolvedChallenge, CTFProfile, ChallengeAttempt, Tournament, Team, TournamentRegistration
+from .models import Challenge, SolvedChallenge, CTFProfile, ChallengeAttempt, Tournament, Team, TournamentRegistration, ScoreEvent
+from . import scheduler
 
 @admin.register(Challenge)
 class ChallengeAdmin(admin.ModelAdmin):
-    list_display = ('title', 'category', 'points', 'tournament', 'is_active', 'created_at')
+    list_display = ('title', 'category', 'points', 'solve_count', 'tournament', 'is_active', 'created_at')
     list_filter = ('category', 'is_active', 'tournament')
     search_fields = ('title', 'description')
+    readonly_fields = ('solve_count', 'first_blood_user', 'docker_image_digest')
     
     # Textarea ni kattalashtirish va Monospace font berish
     formfield_overrides = {
@@ -31,10 +33,26 @@ class ChallengeAttemptAdmin(admin.ModelAdmin):
     list_filter = ('is_correct', 'challenge')
     search_fields = ('user__username', 'challenge__title', 'input_flag')
 
+@admin.register(ScoreEvent)
+class ScoreEventAdmin(admin.ModelAdmin):
+    # Jurnal faqat o'qish uchun: hisoblar undan qayta quriladi (rebuild_scores)
+    list_display = ('kind', 'points', 'user', 'registration_id', 'challenge_id', 'created_at')
+    list_filter = ('kind',)
+    search_fields = ('user__username',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 @admin.register(Tournament)
 class TournamentAdmin(admin.ModelAdmin):
-    list_display = ('title', 'start_date', 'end_date', 'is_active', 'mode')
-    list_filter = ('is_active', 'mode')
+    list_display = ('title', 'start_date', 'end_date', 'phase', 'is_active', 'mode')
+    list_filter = ('phase', 'is_active', 'mode')
     search_fields = ('title',)
     actions = ['publish_challenges']
 
@@ -44,9 +62,11 @@ class TournamentAdmin(admin.ModelAdmin):
         for tournament in queryset:
             # Turnirga bog'langan masalalarni topamiz va turnirni NULL qilamiz
             # Bu ularni "Umumiy Masalalar" sahifasida ko'rinadigan qiladi
-            updated_count = tournament.challenges.update(tournament=None)
+            updated_count = tournament.challenges.update(tournament=None, visibility=Challenge.PUBLIC)
             total_moved += updated_count
             
+        # queryset.update signal yubormaydi - ro'yxat keshini o'zimiz eskirtiramiz
+        scheduler.bump_listing()
         self.message_user(request, f"Jami {total_moved} ta masala muvaffaqiyatli umumiy bo'limga o'tkazildi.")
 
 @admin.register(Team)
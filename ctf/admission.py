@@ -0,0 +1,159 @@
+"""
+Laboratoriyalar uchun umumiy (host bo'yicha) sig'im nazorati.
+
+Har bir konteyner docker_utils dagi LAB_MEM_LIMIT / LAB_CPU_QUOTA bilan
+ishga tushadi, shuning uchun node'lar bir vaqtning o'zida nechta laboratoriyani
+ko'tara olishini oldindan hisoblash mumkin (ctf.nodes, capacity()). Sig'im tugaganda
+yangi so'rovlar ActiveContainer qatori sifatida state=queued holatida kutadi.
+
+Navbat: guruhlar (amaliyot = tournament_id None, har bir turnir - alohida)
+orasida eng kam joy egallagan guruh birinchi, guruh ichida - FIFO. Faol
+turnirlar uchun Tournament.reserved_labs joylari zaxiralanadi: boshqa
+guruhlar ularni egallay olmaydi.
+
+Joy bo'shaganda (qator o'chirilganda) admit() qayta chaqiriladi.
+
+admit() bazadagi sig'im qatorini (SharedCounter 'admission') select_for_update
+bilan qulflab ishlaydi: barcha worker process'lardagi chaqiruvlar ketma-ket
+bajariladi, shuning uchun sig'im process'lar orasida ham oshib ketmaydi.
+Band bo'lgan chaqiruv qaytib ketmaydi - qulf bo'shashini kutadi va navbatni
+yangilangan holat bo'yicha qayta ko'radi (uyg'otish yo'qolmaydi).
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from . import nodes
+
+logger = logging.getLogger(__name__)
+
+LOCK_COUNTER = 'admission'
+QUEUE_SCAN = 200
+
+
+def capacity():
+    """Barcha node'lar bir vaqtda ko'tara oladigan laboratoriyalar soni."""
+    override = getattr(settings, 'CTF_LAB_CAPACITY', None)
+    if override is not None:
+        return override
+    return nodes.registry.total_capacity()
+
+
+def _models():
+    from .models import ActiveContainer, Tournament
+    return ActiveContainer, Tournament
+
+
+def _admitted_states():
+    ActiveContainer, _ = _models()
+    return [ActiveContainer.PENDING, ActiveContainer.STARTING, ActiveContainer.RUNNING, ActiveContainer.STOPPING]
+
+
+def usage_by_group():
+    """{tournament_id yoki None: sig'imdan foydalanayotgan konteynerlar soni} (pool ham kiradi)."""
+    ActiveContainer, _ = _models()
+    rows = (
+        ActiveContainer.objects
+        .filter(state__in=_admitted_states())
+        .values('challenge__tournament_id')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    return {row['challenge__tournament_id']: row['n'] for row in rows}
+
+
+def active_reservations(now=None):
+    _, Tournament = _models()
+    now = now or timezone.now()
+    return dict(
+        Tournament.objects
+        .filter(is_active=True, reserved_labs__gt=0, start_date__lte=now, end_date__gte=now)
+        .values_list('id', 'reserved_labs')
+    )
+
+
+def free_slots(group, used, reservations, cap):
+    """group uchun hozir ochiq joylar (boshqalarning ishlatilmagan zaxirasi chiqarib tashlanadi)."""
+    held_for_others = sum(
+        max(0, reserved - used.get(tid, 0))
+        for tid, reserved in reservations.items() if tid != group
+    )
+    return cap - sum(used.values()) - held_for_others
+
+
+def has_capacity(group=None):
+    """Yangi konteyner (masalan warm pool) uchun joy bormi - navbatda hech kim bo'lmasa."""
+    ActiveContainer, _ = _models()
+    if ActiveContainer.objects.filter(state=ActiveContainer.QUEUED).exists():
+        return False
+    return free_slots(group, usage_by_group(), active_reservations(), capacity()) > 0
+
+
+def _lock():
+    """Sig'im qatorini tranzaksiya oxirigacha qulflaydi (boshqa admit() lar kutadi)."""
+    from .models import SharedCounter
+
+    counters = SharedCounter.objects.select_for_update().filter(name=LOCK_COUNTER)
+    if counters.first() is None:
+        SharedCounter.objects.get_or_create(name=LOCK_COUNTER)
+        counters.first()
+
+
+def admit():
+    """Sig'im yetguncha navbatdagi qatorlarni pending ga o'tkazib, start job'ini qo'yadi."""
+    ActiveContainer, _ = _models()
+    from . import jobs
+
+    with transaction.atomic():
+        _lock()
+        queued = list(
+            ActiveContainer.objects
+            .filter(state=ActiveContainer.QUEUED)
+            .order_by('created_at', 'id')
+            .values_list('pk', 'challenge__tournament_id')[:QUEUE_SCAN]
+        )
+        if not queued:
+            return 0
+
+        cap = capacity()
+        used = usage_by_group()
+        reservations = active_reservations()
+        waiting = {}
+        for pk, group in queued:
+            waiting.setdefault(group, []).append(pk)
+
+        admitted = 0
+        while waiting:
+            eligible = [g for g in waiting if free_slots(g, used, reservations, cap) > 0]
+            if not eligible:
+                break
+            # Eng kam joy egallagan guruh; teng bo'lsa - eng oldin navbatga turgan
+            group = min(eligible, key=lambda g: (used.get(g, 0), waiting[g][0]))
+            pk = waiting[group].pop(0)
+            if not waiting[group]:
+                del waiting[group]
+
+            # created_at - navbatdan chiqqan payt (reaper "stuck" hisobini shundan boshlaydi)
+            promoted = ActiveContainer.objects.filter(pk=pk, state=ActiveContainer.QUEUED).update(
+                state=ActiveContainer.PENDING,
+                created_at=timezone.now(),
+            )
+            if promoted:
+                jobs.enqueue_start(ActiveContainer(pk=pk))  # runner commit'dan keyin (qulf bo'shagach) yuboradi
+                used[group] = used.get(group, 0) + 1
+                admitted += 1
+        return admitted
+
+
+def queue_position(container):
+    """Navbatdagi taxminiy o'rin (1 - keyingi). Navbatda bo'lmasa None."""
+    ActiveContainer, _ = _models()
+    if container.state != ActiveContainer.QUEUED:
+        return None
+    ahead = ActiveContainer.objects.filter(state=ActiveContainer.QUEUED).filter(
+        Q(created_at__lt=container.created_at) | Q(created_at=container.created_at, pk__lt=container.pk)
+    ).count()
+    return ahead + 1
@@ -0,0 +1,209 @@
+"""
+ChallengeAttempt uchun write-behind yozuvchi.
+
+Har bir flag POST alohida INSERT qilardi; turnir boshida bu eng ko'p yoziladigan
+jadval bo'lib, SQLite ning yagona writer lock'i uchun talashardi. Endi view
+urinishni xotiradagi buferga qo'shadi, fondagi thread esa uni har
+CTF_ATTEMPT_FLUSH_MS millisoniyada yoki CTF_ATTEMPT_BATCH_SIZE qator
+to'planganda bitta bulk_create bilan yozadi.
+
+Yo'qolmaslik uchun:
+  * process tugashida (atexit) bufer yoziladi; baza javob bermasa - spool
+    fayliga (JSON lines) tushadi va keyingi ishga tushishda qayta yoziladi;
+  * flush xato bersa qatorlar buferga qaytadi, bufer juda kattalashsa spool ga.
+
+Anti-brute-force bu jadvalni o'qimaydi (ctf/ratelimit.py). Hali yozilmagan
+urinishlar pending() orqali progress keshiga qo'shiladi.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+# Baza uzoq vaqt javob bermasa xotirada shuncha paketdan ortig'i saqlanmaydi (qolgani spool ga)
+MAX_BUFFERED_BATCHES = 20
+
+
+def _model():
+    from .models import ChallengeAttempt
+    return ChallengeAttempt
+
+
+def spool_path():
+    return Path(getattr(settings, 'CTF_ATTEMPT_SPOOL', settings.BASE_DIR / 'attempts.spool'))
+
+
+class AttemptWriter:
+    def __init__(self, background=True, flush_ms=None, batch_size=None, spool=None):
+        self.background = background
+        self.flush_interval = (flush_ms or getattr(settings, 'CTF_ATTEMPT_FLUSH_MS', 250)) / 1000
+        self.batch_size = batch_size or getattr(settings, 'CTF_ATTEMPT_BATCH_SIZE', 200)
+        self.spool_path = Path(spool) if spool else spool_path()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._buffer = []
+        self._thread = None
+        self._stopped = False
+        self.stats = Counter()
+
+    def record(self, user_id, challenge_id, input_flag, is_correct, timestamp=None):
+        attempt = _model()(
+            user_id=user_id,
+            challenge_id=challenge_id,
+            input_flag=input_flag[:255],  # bitta uzun qator butun paketni yiqitmasligi uchun
+            is_correct=is_correct,
+            timestamp=timestamp or timezone.now(),
+        )
+        if not self.background:
+            with self._flush_lock:
+                self._buffer.append(attempt)
+                self._flush_locked()
+            return
+
+        with self._lock:
+            self._buffer.append(attempt)
+            full = len(self._buffer) >= self.batch_size
+        self._ensure_started()
+        if full:
+            self._wake.set()
+
+    def pending(self, user_id=None):
+        with self._lock:
+            return [a for a in self._buffer if user_id is None or a.user_id == user_id]
+
+    def pending_challenge_ids(self, user_id):
+        return {a.challenge_id for a in self.pending(user_id)}
+
+    def flush(self):
+        """Buferni bazaga yozadi. Yozilgan qatorlar sonini qaytaradi (xatolikda 0)."""
+        with self._flush_lock:
+            return self._flush_locked()
+
+    def _flush_locked(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return 0
+        try:
+            _model().objects.bulk_create(batch, batch_size=self.batch_size)
+        except Exception as e:
+            logger.error(f"Error writing {len(batch)} challenge attempts: {e}")
+            self.stats['failed_flushes'] += 1
+            with self._lock:
+                self._buffer[:0] = batch
+                overflow = len(self._buffer) - self.batch_size * MAX_BUFFERED_BATCHES
+                if overflow > 0:
+                    batch, self._buffer = self._buffer[:overflow], self._buffer[overflow:]
+                else:
+                    batch = []
+            if batch:
+                self._spool(batch)
+            return 0
+        self.stats['flushes'] += 1
+        self.stats['written'] += len(batch)
+        return len(batch)
+
+    def _spool(self, attempts):
+        lines = ''.join(
+            json.dumps({
+                'user_id': a.user_id,
+                'challenge_id': a.challenge_id,
+                'input_flag': a.input_flag,
+                'is_correct': a.is_correct,
+                'timestamp': a.timestamp.isoformat(),
+            }) + '\n'
+            for a in attempts
+        )
+        with open(self.spool_path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self.stats['spooled'] += len(attempts)
+        logger.warning(f"Spooled {len(attempts)} challenge attempts to {self.spool_path}")
+
+    def replay_spool(self):
+        """Spool faylidagi urinishlarni bazaga yozadi. Yozilganlar sonini qaytaradi."""
+        if not self.spool_path.exists():
+            return 0
+        # Faylni nomini o'zgartirib "egallaymiz" - bir nechta worker bir xil qatorni ikki marta yozmaydi
+        claimed = self.spool_path.with_name(f"{self.spool_path.name}.{os.getpid()}")
+        try:
+            os.replace(self.spool_path, claimed)
+        except FileNotFoundError:
+            return 0
+
+        Attempt = _model()
+        with open(claimed, encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        attempts = [
+            Attempt(
+                user_id=row['user_id'],
+                challenge_id=row['challenge_id'],
+                input_flag=row['input_flag'],
+                is_correct=row['is_correct'],
+                timestamp=parse_datetime(row['timestamp']),
+            )
+            for row in rows
+        ]
+        try:
+            Attempt.objects.bulk_create(attempts, batch_size=self.batch_size)
+        except Exception as e:
+            logger.error(f"Error replaying attempt spool: {e}")
+            self._spool(attempts)
+            os.remove(claimed)
+            return 0
+        os.remove(claimed)
+        logger.info(f"Replayed {len(attempts)} spooled challenge attempts")
+        return len(attempts)
+
+    def shutdown(self):
+        """Process tugashida: bazaga yozib bo'lmasa - spool ga."""
+        self._stopped = True
+        self._wake.set()
+        with self._flush_lock:
+            self._flush_locked()
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if batch:
+                self._spool(batch)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='attempt-writer', daemon=True)
+            self._thread.start()
+        atexit.register(self.shutdown)
+
+    def _run(self):
+        try:
+            close_old_connections()
+            self.replay_spool()
+        except Exception as e:
+            logger.error(f"Error replaying attempt spool: {e}")
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                close_old_connections()
+                self.flush()
+            except Exception as e:
+                logger.error(f"Attempt writer error: {e}")
+            finally:
+                close_old_connections()
+
+
+writer = AttemptWriter(background=not getattr(settings, 'CTF_ATTEMPTS_INLINE', False))
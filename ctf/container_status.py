@@ -0,0 +1,146 @@
+"""
+Konteyner holatlari keshi.
+
+challenge_detail har ko'rishda Docker API ga murojaat qilardi. Endi holatlar
+cache da saqlanadi va ularni fondagi watcher yangilab turadi:
+  * `docker events` oqimi (start/die/destroy ...) - deyarli real vaqtda;
+  * har RECONCILE_INTERVAL soniyada to'liq solishtirish (containers.list) -
+    yo'qolgan event'lar yoki daemon qayta ishga tushishi uchun zaxira. Shu
+    pass'da "ghost" ActiveContainer qatorlari bitta so'rov bilan o'chiriladi.
+
+Watcher birinchi get_status() chaqiruvida ishga tushadi (process va node boshiga bitta thread).
+Backend event'larni qo'llamasa (FakeDockerBackend) - cache + to'g'ridan-to'g'ri so'rov.
+"""
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from . import docker_utils, nodes
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'ctf:cstatus:'
+RECONCILE_INTERVAL = 30
+
+# docker events "Action" -> container status
+EVENT_STATUS = {
+    'create': 'created',
+    'start': 'running',
+    'unpause': 'running',
+    'restart': 'running',
+    'pause': 'paused',
+    'die': 'exited',
+    'stop': 'exited',
+    'kill': 'exited',
+    'destroy': 'not_found',
+}
+
+# Bu holatlar qaytmas - qator ghost hisoblanadi
+GONE_STATUSES = {'exited', 'dead', 'not_found'}
+
+
+def _key(container_id):
+    return f"{CACHE_PREFIX}{container_id}"
+
+
+def set_status(container_id, status):
+    # TTL: bir necha reconcile davri - watcher to'xtasa eskirgan holat abadiy qolmaydi
+    cache.set(_key(container_id), status, RECONCILE_INTERVAL * 3)
+
+
+def get_status(container_id, node=None):
+    watcher.ensure_started()
+    status = cache.get(_key(container_id))
+    if status is None:
+        status = docker_utils.get_container_status(container_id, node=node)
+        if status != 'error':
+            set_status(container_id, status)
+    return status
+
+
+def reconcile_ghosts(statuses=None, node=None):
+    """
+    Node dagi running ActiveContainer qatorlarini daemon holati bilan solishtiradi va
+    konteyneri yo'q/to'xtagan qatorlarni bitta DELETE bilan o'chiradi
+    (node berilmasa - barcha node'lar). O'chirilgan qatorlar sonini qaytaradi.
+    """
+    from .models import ActiveContainer
+
+    if node is None:
+        return sum(reconcile_ghosts(node=n.name) for n in nodes.registry.all() if n.enabled)
+
+    if statuses is None:
+        statuses = docker_utils.list_container_statuses(node=node)
+        if statuses is None:
+            return 0  # daemon javob bermadi - hech narsani o'chirmaymiz
+
+    rows = ActiveContainer.objects.filter(node=node, state=ActiveContainer.RUNNING).values_list('pk', 'container_id')
+    ghosts = [pk for pk, container_id in rows if statuses.get(container_id, 'not_found') in GONE_STATUSES]
+    if ghosts:
+        ActiveContainer.objects.filter(pk__in=ghosts).delete()
+        logger.info(f"Removed {len(ghosts)} ghost container records on {node}")
+    return len(ghosts)
+
+
+class StatusWatcher:
+    """Har bir node uchun alohida events thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._threads = {}
+        self._started = False
+
+    def ensure_started(self):
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            for node in nodes.registry.all():
+                if not node.enabled or not getattr(docker_utils.get_backend(node.name), 'supports_events', False):
+                    continue
+                thread = threading.Thread(target=self._run, args=(node.name,), name=f'docker-events-{node.name}', daemon=True)
+                self._threads[node.name] = thread
+                thread.start()
+
+    def handle_event(self, event):
+        if event.get('Type', 'container') != 'container':
+            return
+        status = EVENT_STATUS.get(event.get('Action') or event.get('status'))
+        container_id = event.get('id') or event.get('Actor', {}).get('ID')
+        if status and container_id:
+            set_status(container_id, status)
+
+    def reconcile(self, node):
+        statuses = docker_utils.list_container_statuses(node=node)
+        if statuses is None:
+            return
+        for container_id, status in statuses.items():
+            set_status(container_id, status)
+        reconcile_ghosts(statuses, node=node)
+
+    def _run(self, node):
+        backend = docker_utils.get_backend(node)
+        since = int(time.time())
+        while True:
+            try:
+                close_old_connections()
+                self.reconcile(node)
+                # until bilan oqim RECONCILE_INTERVAL dan keyin tugaydi -> keyingi to'liq solishtirish
+                until = int(time.time()) + RECONCILE_INTERVAL
+                for event in backend.events(since=since, until=until):
+                    self.handle_event(event)
+                since = until
+            except Exception as e:
+                logger.error(f"Docker events watcher error ({node}): {e}")
+                since = int(time.time())
+                time.sleep(5)
+            finally:
+                close_old_connections()
+
+
+watcher = StatusWatcher()
@@ -1,29 +1,324 @@
-import docker
+"""
+Docker daemon bilan ishlash.
+
+Client import paytida emas, birinchi murojaatda yaratiladi (LazyDockerClient):
+`manage.py migrate`, bot va web worker'lar ishga tushishda daemon ga ulanmaydi
+va docker-py ni import qilmaydi. Ulanish pool'i (max_pool_size) node boshiga
+bitta client da qayta ishlatiladi, har bir so'rovga timeout qo'yiladi.
+"""
 from django.conf import settings
+import hashlib
+import itertools
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
-try:
-    client = docker.from_env()
-except Exception as e:
-    logger.error(f"Error initializing Docker client: {e}")
-    client = None
+# Client shuncha vaqt ishlatilmagan bo'lsa, murojaatdan oldin ping qilinadi
+HEALTH_CHECK_INTERVAL = 30
+# Daemon ga ulanib bo'lmasa - qayta urinishlar orasidagi pauza (log to'lib ketmasligi uchun)
+RECONNECT_INTERVAL = 10
+
+# Har bir laboratoriya uchun resurs cheklovlari
+LAB_MEM_LIMIT = '128m'
+LAB_CPU_QUOTA = 50000  # 50% CPU
+
+# Pool dagi konteynerlarni ajratib olish uchun label
+POOL_LABEL = 'wan-net.pool'
+
+# Har bir daemon (node) ga bir vaqtda nechta run/stop yuborilishi mumkin (process bo'yicha)
+_slots = {}
+_slots_lock = threading.Lock()
+
+
+def _daemon_slots(node):
+    with _slots_lock:
+        if node not in _slots:
+            _slots[node] = threading.BoundedSemaphore(getattr(settings, 'CTF_DOCKER_CONCURRENCY', 4))
+        return _slots[node]
 
-def start_container(image_name, port_binding=None):
+
+def client_options():
+    return {
+        'timeout': getattr(settings, 'CTF_DOCKER_TIMEOUT', 15),
+        'max_pool_size': getattr(settings, 'CTF_DOCKER_POOL_SIZE', 10),
+    }
+
+
+class LazyDockerClient:
+    """
+    docker.DockerClient ni birinchi get() da yaratadi (base_url bo'lmasa - docker.from_env()).
+    Uzoq ishlatilmagan client ping bilan tekshiriladi; javob bermasa yopilib, qayta ulanadi.
+    Ulanib bo'lmasa get() None qaytaradi va RECONNECT_INTERVAL davomida qayta urinmaydi.
+    """
+
+    def __init__(self, base_url=None):
+        self.base_url = base_url
+        self._client = None
+        self._checked_at = 0.0
+        self._failed_at = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._client is not None and now - self._checked_at > HEALTH_CHECK_INTERVAL:
+                try:
+                    self._client.ping()
+                    self._checked_at = now
+                except Exception as e:
+                    logger.warning(f"Docker daemon ({self.base_url or 'env'}) did not answer ping, reconnecting: {e}")
+                    self._close()
+            if self._client is None:
+                if self._failed_at is not None and now - self._failed_at < RECONNECT_INTERVAL:
+                    return None
+                self._client = self._connect()
+                self._checked_at = now
+            return self._client
+
+    def _connect(self):
+        import docker
+
+        try:
+            if self.base_url:
+                client = docker.DockerClient(base_url=self.base_url, **client_options())
+            else:
+                client = docker.from_env(**client_options())
+        except Exception as e:
+            logger.error(f"Error initializing Docker client ({self.base_url or 'env'}): {e}")
+            self._failed_at = time.monotonic()
+            return None
+        self._failed_at = None
+        return client
+
+    def _close(self):
+        if self._client is not None:
+            try:
+                self._client.close()
+            except Exception:
+                pass
+        self._client = None
+
+    def reset(self):
+        """Ulanish xatosidan keyin: keyingi get() yangi client yaratadi."""
+        with self._lock:
+            self._close()
+
+    @property
+    def connected(self):
+        return self._client is not None
+
+
+def _is_connection_error(exc):
+    # docker.errors.APIError - daemon javob berdi (404, 409 ...), ulanish sog'
+    import docker
+
+    return not isinstance(exc, docker.errors.DockerException)
+
+
+def image_digest(image):
+    """Registry dan kelgan image - RepoDigest (node'lar orasida bir xil), aks holda image ID."""
+    repo_digests = image.attrs.get('RepoDigests') or []
+    if repo_digests:
+        return repo_digests[0].split('@', 1)[1]
+    return image.id
+
+
+class DockerBackend:
+    """docker-py orqali haqiqiy Docker daemon."""
+
+    supports_events = True
+
+    def __init__(self, base_url=None):
+        self._client = LazyDockerClient(base_url)
+
+    @property
+    def client(self):
+        return self._client.get()
+
+    def _require_client(self):
+        client = self.client
+        if not client:
+            raise RuntimeError("Docker client is not active.")
+        return client
+
+    def _call(self, func):
+        try:
+            return func()
+        except Exception as e:
+            if _is_connection_error(e):
+                self._client.reset()
+            raise
+
+    def run(self, image_name, ports, labels=None):
+        client = self.client
+        if not client:
+            logger.error("Docker client is not active.")
+            return None
+        return self._call(lambda: client.containers.run(
+            image_name,
+            detach=True,
+            ports=ports,
+            labels=labels or {},
+            mem_limit=LAB_MEM_LIMIT,  # Security: Limit memory
+            cpu_quota=LAB_CPU_QUOTA,  # Security: Limit CPU (50%)
+            restart_policy={'Name': 'no'},
+            remove=True # Auto remove when stopped
+        ))
+
+    def stop(self, container_id):
+        client = self.client
+        if not client:
+            return False
+        self._call(lambda: client.containers.get(container_id).stop(timeout=2))
+        return True
+
+    def status(self, container_id):
+        import docker
+
+        client = self.client
+        if not client:
+            return "error"
+        try:
+            return self._call(lambda: client.containers.get(container_id).status)
+        except docker.errors.NotFound:
+            return "not_found"
+
+    def list_statuses(self):
+        client = self._require_client()
+        # sparse=True: har bir konteyner uchun alohida inspect so'rovi yo'q
+        return self._call(lambda: {c.id: c.status for c in client.containers.list(all=True, sparse=True)})
+
+    def events(self, since=None, until=None):
+        client = self._require_client()
+        # docker-py events oqimiga timeout qo'ymaydi - oqim until da tugaydi
+        return self._call(lambda: client.events(since=since, until=until, decode=True, filters={'type': 'container'}))
+
+    def inspect_image(self, tag):
+        """{'digest', 'labels'} yoki image node da bo'lmasa None."""
+        import docker
+
+        client = self._require_client()
+        try:
+            image = self._call(lambda: client.images.get(tag))
+        except docker.errors.ImageNotFound:
+            return None
+        return {'digest': image_digest(image), 'labels': image.labels or {}}
+
+    def build_image(self, path, tag, labels=None):
+        client = self._require_client()
+        timeout = getattr(settings, 'CTF_IMAGE_BUILD_TIMEOUT', 900)
+        image, _ = self._call(lambda: client.images.build(
+            path=str(path), tag=tag, labels=labels or {}, rm=True, timeout=timeout,
+        ))
+        return image_digest(image)
+
+    def pull_image(self, tag):
+        client = self._require_client()
+        return image_digest(self._call(lambda: client.images.pull(tag)))
+
+
+class FakeContainer:
+    def __init__(self, id, image, ports, labels):
+        self.id = id
+        self.image = image
+        self.ports = ports
+        self.labels = labels
+        self.status = 'running'
+
+
+class FakeDockerBackend:
+    """
+    Daemon siz testlar va lokal ishlab chiqish uchun (CTF_DOCKER_BACKEND = 'ctf.docker_utils.FakeDockerBackend').
+    Konteynerlar faqat xotirada saqlanadi.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.containers = {}
+        self.run_calls = 0
+        self.fail_images = set()
+        self.images = {}
+        self.build_calls = 0
+        self.pull_calls = 0
+
+    def run(self, image_name, ports, labels=None):
+        import docker
+
+        with self._lock:
+            self.run_calls += 1
+            if image_name in self.fail_images:
+                raise docker.errors.ImageNotFound(f"{image_name} not found")
+            container = FakeContainer(f"fake{next(self._ids):012d}", image_name, ports, labels or {})
+            self.containers[container.id] = container
+            return container
+
+    def stop(self, container_id):
+        import docker
+
+        with self._lock:
+            container = self.containers.pop(container_id, None)
+        if container is None:
+            raise docker.errors.NotFound(container_id)
+        return True
+
+    def status(self, container_id):
+        with self._lock:
+            container = self.containers.get(container_id)
+        return container.status if container else "not_found"
+
+    def list_statuses(self):
+        with self._lock:
+            return {cid: c.status for cid, c in self.containers.items()}
+
+    def inspect_image(self, tag):
+        with self._lock:
+            image = self.images.get(tag)
+        return dict(image) if image else None
+
+    def build_image(self, path, tag, labels=None):
+        with self._lock:
+            self.build_calls += 1
+            digest = 'sha256:' + hashlib.sha256(f"{tag}{sorted((labels or {}).items())}".encode()).hexdigest()
+            self.images[tag] = {'digest': digest, 'labels': dict(labels or {})}
+        return digest
+
+    def pull_image(self, tag):
+        with self._lock:
+            self.pull_calls += 1
+            digest = 'sha256:' + hashlib.sha256(tag.encode()).hexdigest()
+            self.images[tag] = {'digest': digest, 'labels': {}}
+        return digest
+
+
+_backend = None
+
+
+def get_backend(node=None):
+    """Node ning backendi (ctf.nodes). set_backend() bilan o'rnatilgan backend barcha node'lar uchun ishlatiladi."""
+    if _backend is not None:
+        return _backend
+    from .nodes import registry
+    return registry.get(node).backend
+
+
+def set_backend(backend):
+    """Testlar uchun: backendni almashtirish (None - node sozlamalaridan o'qish)."""
+    global _backend
+    _backend = backend
+
+
+def start_container(image_name, port_binding=None, labels=None, node=None):
     """
     Starts a container from the given image name.
     port_binding: dict mapping container port to host port, e.g., {5000: 8001}
     Returns the container object or None.
     """
-    if not client:
-        logger.error("Docker client is not active.")
-        return None
-    
-    
     # Ensure port keys are strings like "5000/tcp" if they are passing raw ints
     # But checking docs: client.containers.run(ports={'5000/tcp': 8080})
-    
+
     # Let's clean the input to be sure
     safe_ports = {}
     if port_binding:
@@ -35,44 +330,37 @@ def start_container(image_name, port_binding=None):
             safe_ports[key] = int(v)
 
     try:
-        container = client.containers.run(
-            image_name,
-            detach=True,
-            ports=safe_ports,
-            mem_limit='128m',  # Security: Limit memory
-            cpu_quota=50000,   # Security: Limit CPU (50%)
-            restart_policy={'Name': 'no'},
-            remove=True # Auto remove when stopped
-        )
-        return container
-    except docker.errors.ImageNotFound:
-        logger.error(f"Image {image_name} not found.")
-        return None
+        with _daemon_slots(node):
+            return get_backend(node).run(image_name, safe_ports, labels)
     except Exception as e:
-        logger.error(f"Error starting container: {e}")
+        import docker
+
+        if isinstance(e, docker.errors.ImageNotFound):
+            logger.error(f"Image {image_name} not found.")
+        else:
+            logger.error(f"Error starting container: {e}")
         return None
 
-def stop_container(container_id):
+def stop_container(container_id, node=None):
     """Stops a container (auto-removed due to remove=True above)."""
-    if not client:
-        return False
-        
     try:
-        container = client.containers.get(container_id)
-        container.stop(timeout=2)
-        return True
+        with _daemon_slots(node):
+            return get_backend(node).stop(container_id)
     except Exception as e:
         logger.error(f"Error stopping container {container_id}: {e}")
         return False
 
-def get_container_status(container_id):
-    if not client:
-        return "error"
+def list_container_statuses(node=None):
+    """Daemon dagi barcha konteynerlar holati {id: status}; xatolikda None."""
+    try:
+        return get_backend(node).list_statuses()
+    except Exception as e:
+        logger.error(f"Error listing containers: {e}")
+        return None
+
+def get_container_status(container_id, node=None):
     try:
-        container = client.containers.get(container_id)
-        return container.status
-    except docker.errors.NotFound:
-        return "not_found"
+        return get_backend(node).status(container_id)
     except Exception as e:
         logger.error(f"Error getting status for {container_id}: {e}")
         return "error"
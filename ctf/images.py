@@ -0,0 +1,137 @@
+"""
+Challenge image'larini oldindan build/pull qilish.
+
+challenges/docker/<nom>/Dockerfile kataloglari avtomatik topiladi: ping_rce ->
+wan-net/ping-rce:latest. Kontekst (katalogdagi barcha fayllar) sha256 digest i
+image'ga LABEL sifatida yoziladi; node dagi image'da shu digest bo'lsa, build
+o'tkazib yuboriladi. Kontekst katalogi bo'lmagan challenge image'lari
+(docker_image_name) registry dan pull qilinadi.
+
+Har bir faol node da image tayyorlanadi - tournament paytida containers.run
+image'ni build/pull qilib kutmaydi. Natijadagi image digest
+Challenge.docker_image_digest ga yoziladi.
+"""
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+
+from . import docker_utils, nodes
+
+logger = logging.getLogger(__name__)
+
+IMAGE_PREFIX = 'wan-net'
+DIGEST_LABEL = 'wan-net.context-digest'
+IGNORED = {'__pycache__', '.git'}
+
+
+def docker_root():
+    return Path(getattr(settings, 'CTF_DOCKER_CHALLENGES_DIR', settings.BASE_DIR / 'challenges' / 'docker'))
+
+
+@dataclass
+class ImageContext:
+    image: str
+    path: Path = None  # None - registry dan pull qilinadi
+
+
+@dataclass
+class SyncResult:
+    node: str
+    image: str
+    action: str  # built / pulled / cached / failed
+    digest: str = ''
+    error: str = ''
+
+
+def image_name(context_name):
+    return f"{IMAGE_PREFIX}/{context_name.replace('_', '-')}:latest"
+
+
+def discover(root=None):
+    """Dockerfile bor har bir kontekst katalogi uchun ImageContext (nom bo'yicha tartibda)."""
+    root = Path(root) if root else docker_root()
+    return [
+        ImageContext(image_name(dockerfile.parent.name), dockerfile.parent)
+        for dockerfile in sorted(root.glob('*/Dockerfile'))
+    ]
+
+
+def context_digest(path):
+    """Kontekst fayllarining nisbiy yo'li va tarkibi bo'yicha sha256."""
+    digest = hashlib.sha256()
+    for file in sorted(p for p in Path(path).rglob('*') if p.is_file()):
+        relative = file.relative_to(path)
+        if IGNORED.intersection(relative.parts) or file.suffix == '.pyc':
+            continue
+        digest.update(relative.as_posix().encode() + b'\0')
+        digest.update(hashlib.sha256(file.read_bytes()).digest())
+    return f"sha256:{digest.hexdigest()}"
+
+
+def challenge_images():
+    """Challenge.docker_image_name lardan kontekst katalogi yo'q (pull qilinadigan) image'lar."""
+    from .models import Challenge
+
+    built = {ctx.image for ctx in discover()}
+    names = (
+        Challenge.objects
+        .exclude(docker_image_name__isnull=True).exclude(docker_image_name='')
+        .values_list('docker_image_name', flat=True).distinct()
+    )
+    return [ImageContext(name) for name in sorted(set(names) - built)]
+
+
+def ensure_image(node, context, force=False):
+    """Bitta node da image'ni tayyorlaydi. SyncResult qaytaradi."""
+    backend = docker_utils.get_backend(node)
+    try:
+        if context.path is None:
+            if not force:
+                found = backend.inspect_image(context.image)
+                if found is not None:
+                    return SyncResult(node, context.image, 'cached', found['digest'])
+            return SyncResult(node, context.image, 'pulled', backend.pull_image(context.image))
+
+        digest = context_digest(context.path)
+        found = None if force else backend.inspect_image(context.image)
+        if found is not None and found['labels'].get(DIGEST_LABEL) == digest:
+            return SyncResult(node, context.image, 'cached', found['digest'])
+        image_digest = backend.build_image(context.path, context.image, labels={DIGEST_LABEL: digest})
+        return SyncResult(node, context.image, 'built', image_digest)
+    except Exception as e:
+        logger.error(f"Error preparing image {context.image} on {node}: {e}")
+        return SyncResult(node, context.image, 'failed', error=str(e))
+
+
+def sync_images(contexts, node_names=None, workers=4, force=False):
+    """
+    Barcha (node, image) juftlarini parallel tayyorlaydi va digest'larni Challenge ga yozadi.
+    SyncResult lar ro'yxatini qaytaradi.
+    """
+    if node_names is None:
+        node_names = [node.name for node in nodes.registry.all() if node.enabled]
+    jobs = [(node, context) for context in contexts for node in node_names]
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='image-sync') as executor:
+        results = list(executor.map(lambda job: ensure_image(*job, force=force), jobs))
+    record_digests(results)
+    return results
+
+
+def record_digests(results):
+    """
+    Har bir image uchun digest: registry image'larida RepoDigest (barcha node'larda bir xil),
+    build qilinganlarida - birinchi node dagi image ID. Biror node da xato bo'lsa yozilmaydi.
+    """
+    from .models import Challenge
+
+    by_image = {}
+    for result in results:
+        by_image.setdefault(result.image, []).append(result)
+    for image, image_results in by_image.items():
+        if any(r.action == 'failed' or not r.digest for r in image_results):
+            continue
+        Challenge.objects.filter(docker_image_name=image).update(docker_image_digest=image_results[0].digest)
@@ -0,0 +1,126 @@
+"""
+Laboratoriyalarni fonda ishga tushirish / to'xtatish.
+
+containers.run bir necha soniya davom etishi mumkin; ilgari bu vaqt davomida
+web worker band bo'lib, flag yuborish so'rovlari navbatda turib qolardi.
+Endi view faqat ActiveContainer qatorini (state=pending) yozadi va ishni shu
+yerdagi thread pool ga topshiradi, sahifa esa lab_status endpointini so'raydi.
+
+Docker daemon ga bir vaqtdagi murojaatlar soni CTF_DOCKER_CONCURRENCY bilan
+cheklanadi (docker_utils dagi semafor pool va boshqa chaqiruvlarni ham qamraydi).
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from django.utils import timezone
+
+from . import admission, container_status, docker_utils, nodes, readiness, reaper
+from .models import ActiveContainer
+
+logger = logging.getLogger(__name__)
+
+
+class JobRunner:
+    def __init__(self, background=True, workers=None):
+        workers = workers or getattr(settings, 'CTF_DOCKER_CONCURRENCY', 4)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='lab-jobs') if background else None
+
+    def submit(self, func, *args):
+        """Tranzaksiya commit bo'lgach ishni navbatga qo'yadi (qator boshqa ulanishga ko'rinishi uchun)."""
+        transaction.on_commit(lambda: self._dispatch(func, *args))
+
+    def _dispatch(self, func, *args):
+        if self._executor is None:
+            func(*args)
+            return
+        self._executor.submit(self._run, func, *args)
+
+    @staticmethod
+    def _run(func, *args):
+        try:
+            close_old_connections()
+            func(*args)
+        except Exception as e:
+            logger.error(f"Lab job {func.__name__}{args} failed: {e}")
+        finally:
+            close_old_connections()
+
+
+runner = JobRunner(background=not getattr(settings, 'CTF_JOBS_INLINE', False))
+
+
+def start_lab(container_pk):
+    """pending -> starting -> running | failed"""
+    if not ActiveContainer.objects.filter(pk=container_pk, state=ActiveContainer.PENDING).update(state=ActiveContainer.STARTING):
+        return  # allaqachon boshqa job olgan yoki foydalanuvchi bekor qilgan
+
+    row = ActiveContainer.objects.select_related('challenge').get(pk=container_pk)
+    challenge = row.challenge
+    container = docker_utils.start_container(
+        challenge.docker_image_name,
+        {f"{challenge.docker_port}/tcp": row.host_port},
+        node=row.node,
+    )
+
+    if not container:
+        ActiveContainer.objects.filter(pk=container_pk, state=ActiveContainer.STARTING).update(
+            state=ActiveContainer.FAILED,
+            error="Konteynerni ishga tushirishda xatolik!",
+        )
+        admission.admit()  # band qilingan joy bo'shadi
+        return
+
+    # container_id ni darhol yozamiz: probe paytida to'xtatish so'ralsa stop_lab uni topadi
+    ActiveContainer.objects.filter(pk=container_pk, state=ActiveContainer.STARTING).update(container_id=container.id)
+
+    # Ilova portni tinglamaguncha foydalanuvchiga URL bermaymiz
+    ready, latency_ms = readiness.wait_until_ready(
+        nodes.registry.get(row.node).probe_host, row.host_port, challenge.ready_probe
+    )
+    readiness.record(challenge.id, latency_ms, ready)
+    if not ready:
+        docker_utils.stop_container(container.id, node=row.node)
+        ActiveContainer.objects.filter(pk=container_pk, state=ActiveContainer.STARTING).update(
+            state=ActiveContainer.FAILED,
+            error="Laboratoriya belgilangan vaqtda javob bermadi. Qaytadan urinib ko'ring.",
+            probe_latency_ms=latency_ms,
+        )
+        logger.warning(f"Lab {container_pk} ({challenge.docker_image_name}) not ready after {latency_ms} ms")
+        admission.admit()
+        return
+
+    now = timezone.now()
+    updated = ActiveContainer.objects.filter(pk=container_pk, state=ActiveContainer.STARTING).update(
+        state=ActiveContainer.RUNNING,
+        container_id=container.id,
+        expires_at=reaper.new_expiry(now),
+        ready_at=now,
+        probe_latency_ms=latency_ms,
+    )
+    if updated:
+        container_status.set_status(container.id, 'running')
+    else:
+        # Ishga tushayotgan paytda to'xtatish so'ralgan - konteynerni o'zimiz yopamiz
+        docker_utils.stop_container(container.id, node=row.node)
+        ActiveContainer.objects.filter(pk=container_pk).delete()
+
+
+def stop_lab(container_pk):
+    row = ActiveContainer.objects.filter(pk=container_pk).first()
+    if row is None:
+        return
+    if row.container_id:
+        docker_utils.stop_container(row.container_id, node=row.node)
+    ActiveContainer.objects.filter(pk=container_pk).delete()
+
+
+def enqueue_start(container):
+    runner.submit(start_lab, container.pk)
+
+
+def enqueue_stop(container):
+    ActiveContainer.objects.filter(pk=container.pk).update(state=ActiveContainer.STOPPING)
+    runner.submit(stop_lab, container.pk)
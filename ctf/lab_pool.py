@@ -0,0 +1,224 @@
+"""
+Docker laboratoriyalari uchun warm pool.
+
+Challenge.pool_min_idle > 0 bo'lsa, shu challenge image'idan oldindan bir nechta
+konteyner ishga tushirib qo'yiladi. Ular ActiveContainer qatori sifatida
+user=NULL bilan saqlanadi, shuning uchun pool barcha worker process'lar uchun
+umumiy va restartdan keyin ham saqlanib qoladi. Foydalanuvchiga berish -
+bitta shartli UPDATE (user IS NULL -> user), ya'ni ikki so'rov bitta
+konteynerni ololmaydi. Berilgandan keyin pool fonda to'ldiriladi.
+"""
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from . import admission
+from . import docker_utils
+from . import nodes
+from . import ports
+from . import readiness
+from . import reaper
+from .models import ActiveContainer, Challenge
+
+logger = logging.getLogger(__name__)
+
+# Hech kimga (foydalanuvchi yoki jamoaga) berilmagan konteyner
+IDLE = Q(user__isnull=True, team__isnull=True)
+
+
+class LabPool:
+    def __init__(self, background=True, workers=2):
+        self._lock = threading.Lock()
+        self._refilling = set()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='lab-pool') if background else None
+        self.stats = Counter()
+
+    # --- foydalanuvchiga berish ---
+
+    def acquire(self, challenge, user, team=None):
+        """
+        Bo'sh konteynerni foydalanuvchiga (team berilsa - jamoaga, user holder bo'ladi)
+        biriktiradi. Pool bo'sh bo'lsa None.
+        """
+        if not challenge.pool_max_idle and not challenge.pool_min_idle:
+            return None
+
+        candidates = (
+            ActiveContainer.objects
+            .filter(IDLE, challenge=challenge, state=ActiveContainer.RUNNING)
+            .order_by('created_at')
+        )
+        for row in candidates[:5]:
+            now = timezone.now()
+            try:
+                with transaction.atomic():
+                    claimed = ActiveContainer.objects.filter(IDLE, pk=row.pk).update(
+                        user=None if team else user,
+                        team=team,
+                        created_at=now,  # lease foydalanuvchiga berilgan paytdan hisoblanadi
+                        expires_at=reaper.new_expiry(now),
+                    )
+            except IntegrityError:
+                # Jamoadoshi shu paytda boshqa konteynerni olib bo'ldi
+                break
+            if claimed:
+                self._count('hits')
+                self.refill_async(challenge)
+                claimed_row = ActiveContainer.objects.get(pk=row.pk)
+                if team:
+                    claimed_row.holders.add(user)
+                return claimed_row
+
+        self._count('misses')
+        self.refill_async(challenge)
+        return None
+
+    # --- to'ldirish ---
+
+    def refill(self, challenge):
+        """Bo'sh konteynerlar sonini pool_min_idle gacha yetkazadi (pool_max_idle dan oshirmay)."""
+        target = challenge.pool_min_idle
+        limit = max(challenge.pool_max_idle, target)
+        started = 0
+
+        idle_rows = ActiveContainer.objects.filter(IDLE, challenge=challenge)
+
+        # Sozlama kamaytirilgan bo'lsa ortiqcha bo'sh konteynerlarni to'xtatamiz
+        excess = idle_rows.count() - limit
+        if excess > 0:
+            for row in idle_rows.order_by('created_at')[:excess]:
+                if ActiveContainer.objects.filter(IDLE, pk=row.pk).delete()[0]:
+                    docker_utils.stop_container(row.container_id, node=row.node)
+
+        while True:
+            if idle_rows.count() >= target:
+                break
+            # Navbatda foydalanuvchilar bo'lsa yoki host to'la bo'lsa pool kutadi
+            if not admission.has_capacity(challenge.tournament_id):
+                break
+
+            lease = ports.lease(user=None, challenge=challenge, container_id='')
+            if lease is None:
+                self._count('failed')
+                break
+
+            container = docker_utils.start_container(
+                challenge.docker_image_name,
+                {f"{challenge.docker_port}/tcp": lease.host_port},
+                labels={docker_utils.POOL_LABEL: str(challenge.id)},
+                node=lease.node,
+            )
+            if not container:
+                lease.delete()
+                self._count('failed')
+                break
+
+            # Pool dan faqat tayyor (javob beradigan) konteynerlar beriladi
+            ready, latency_ms = readiness.wait_until_ready(
+                nodes.registry.get(lease.node).probe_host, lease.host_port, challenge.ready_probe
+            )
+            readiness.record(challenge.id, latency_ms, ready)
+            if not ready:
+                docker_utils.stop_container(container.id, node=lease.node)
+                lease.delete()
+                self._count('failed')
+                break
+
+            lease.container_id = container.id
+            lease.state = ActiveContainer.RUNNING
+            lease.ready_at = timezone.now()
+            lease.probe_latency_ms = latency_ms
+            lease.save(update_fields=['container_id', 'state', 'ready_at', 'probe_latency_ms'])
+            self._count('started')
+            started += 1
+
+        return started
+
+    def refill_async(self, challenge):
+        if not challenge.pool_min_idle:
+            return
+        if self._executor is None:
+            self.refill(challenge)
+            return
+
+        with self._lock:
+            if challenge.id in self._refilling:
+                return
+            self._refilling.add(challenge.id)
+        self._executor.submit(self._refill_job, challenge.id)
+
+    def _refill_job(self, challenge_id):
+        try:
+            close_old_connections()
+            challenge = Challenge.objects.get(pk=challenge_id)
+            self.refill(challenge)
+        except Exception as e:
+            logger.error(f"Lab pool refill failed for challenge {challenge_id}: {e}")
+        finally:
+            with self._lock:
+                self._refilling.discard(challenge_id)
+            close_old_connections()
+
+    def warm_all(self):
+        """Barcha pool yoqilgan challenge'lar uchun sinxron to'ldirish."""
+        started = 0
+        for challenge in Challenge.objects.filter(is_active=True, pool_min_idle__gt=0).exclude(docker_image_name__isnull=True).exclude(docker_image_name=''):
+            started += self.refill(challenge)
+        return started
+
+    def drain(self, challenge=None):
+        """Bo'sh (hech kimga berilmagan) konteynerlarni to'xtatadi."""
+        idle = ActiveContainer.objects.filter(IDLE)
+        if challenge is not None:
+            idle = idle.filter(challenge=challenge)
+        stopped = 0
+        for row in idle:
+            docker_utils.stop_container(row.container_id, node=row.node)
+            row.delete()
+            stopped += 1
+        return stopped
+
+    # --- metrikalar ---
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def metrics(self):
+        """Process ichidagi hisoblagichlar + bazadagi bo'sh/band konteynerlar (challenge bo'yicha)."""
+        with self._lock:
+            stats = dict(self.stats)
+            refilling = len(self._refilling)
+
+        requests = stats.get('hits', 0) + stats.get('misses', 0)
+        per_challenge = {}
+        rows = (
+            ActiveContainer.objects
+            .values('challenge_id', 'challenge__docker_image_name')
+            .annotate(idle=Count('id', filter=IDLE), in_use=Count('id', filter=~IDLE))
+            .order_by()
+        )
+        for row in rows:
+            per_challenge[row['challenge_id']] = {
+                'image': row['challenge__docker_image_name'],
+                'idle': row['idle'],
+                'in_use': row['in_use'],
+            }
+
+        return {
+            'hits': stats.get('hits', 0),
+            'misses': stats.get('misses', 0),
+            'hit_rate': round(stats.get('hits', 0) / requests, 3) if requests else None,
+            'started': stats.get('started', 0),
+            'failed': stats.get('failed', 0),
+            'refilling': refilling,
+            'challenges': per_challenge,
+        }
+
+
+pool = LabPool()
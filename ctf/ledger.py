@@ -0,0 +1,188 @@
+"""
+Ballar jurnali (ScoreEvent) va undan kelib chiqadigan hisoblagichlar.
+
+Ilgari ball uch joyda joyida o'zgartirilardi (profile.total_points +=,
+registration score, yechim o'chirilganda ayirish) va qayta hisoblab bo'lmasdi.
+Endi har bir yechim/bonus/bekor qilish avval ScoreEvent sifatida yoziladi,
+CTFProfile.total_points va TournamentRegistration.score esa F() bilan atomik
+oshiriladi. Hisoblagichlar har doim jurnaldan qayta qurilishi mumkin
+(rebuild_totals, `manage.py rebuild_scores`); farqlarni ko'rib, faqat
+buzilgan qatorlarni tuzatish uchun - score_drift / apply_drift
+(`manage.py reconcile_scores --dry-run`).
+
+Turnir yechimi ham global profilga, ham ishtirokchi (user yoki jamoa)
+registratsiyasiga yoziladi.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import ranking
+from .models import CTFProfile, ScoreEvent, TournamentRegistration
+
+FIRST_BLOOD_BONUS = 50
+
+
+def _apply(user_id, registration_id, points, solved_at=None):
+    """Hisoblagichlarni F() bilan o'zgartiradi (read-modify-write yo'q)."""
+    if user_id is not None:
+        fields = {'total_points': F('total_points') + points}
+        if solved_at is not None:
+            fields['last_solved'] = solved_at
+        profiles = CTFProfile.objects.filter(user_id=user_id)
+        if not profiles.update(**fields):
+            CTFProfile.objects.get_or_create(user_id=user_id)
+            profiles.update(**fields)
+        # queryset.update signal yubormaydi - reyting indeksini o'zimiz yangilaymiz
+        row = profiles.values_list('id', 'total_points', 'last_solved').first()
+        if row is not None:
+            ranking.schedule_update(user_id, *row)
+
+    if registration_id is not None:
+        fields = {'score': F('score') + points}
+        if solved_at is not None:
+            fields['last_solved'] = solved_at
+        TournamentRegistration.objects.filter(pk=registration_id).update(**fields)
+
+
+def award_solve(user, challenge, first_blood=False, registration=None, solved_at=None):
+    """Yechim (va first blood bonusi) uchun jurnal yozuvlari. Qo'shilgan ballni qaytaradi."""
+    solved_at = solved_at or timezone.now()
+    common = {
+        'user_id': user.pk,
+        'challenge_id': challenge.pk,
+        'registration_id': getattr(registration, 'pk', registration),
+        'created_at': solved_at,
+    }
+    events = [ScoreEvent(kind=ScoreEvent.SOLVE, points=challenge.points, **common)]
+    if first_blood:
+        events.append(ScoreEvent(kind=ScoreEvent.FIRST_BLOOD, points=FIRST_BLOOD_BONUS, **common))
+    ScoreEvent.objects.bulk_create(events)
+
+    points = sum(event.points for event in events)
+    _apply(user.pk, common['registration_id'], points, solved_at)
+    return points
+
+
+def award_first_blood(user_id, challenge_id):
+    """
+    First blood yangi egaga o'tganda (oldingi egasining yechimi o'chirildi) bonus
+    jurnalga yoziladi - yechimi yozilgan hisob(lar)ga (profil / registratsiya).
+    """
+    from .models import SolvedChallenge
+
+    solved_at = (
+        SolvedChallenge.objects.filter(user_id=user_id, challenge_id=challenge_id)
+        .values_list('solved_at', flat=True).first()
+    )
+    registrations = (
+        ScoreEvent.objects
+        .filter(user_id=user_id, challenge_id=challenge_id, kind=ScoreEvent.SOLVE)
+        .values_list('registration_id', flat=True)
+        .distinct()
+        .order_by()
+    )
+    for registration_id in list(registrations) or [None]:
+        ScoreEvent.objects.create(
+            user_id=user_id,
+            challenge_id=challenge_id,
+            registration_id=registration_id,
+            kind=ScoreEvent.FIRST_BLOOD,
+            points=FIRST_BLOOD_BONUS,
+            created_at=solved_at or timezone.now(),
+        )
+        _apply(user_id, registration_id, FIRST_BLOOD_BONUS)
+    return FIRST_BLOOD_BONUS
+
+
+def revoke_solve(user_id, challenge_id):
+    """
+    Yechim bekor qilinganda: shu (user, challenge) uchun berilgan ballar (bonus ham)
+    har bir hisob (profil / registratsiya) bo'yicha teskari yozuv bilan qaytariladi.
+    """
+    granted = (
+        ScoreEvent.objects
+        .filter(user_id=user_id, challenge_id=challenge_id)
+        .values('registration_id')
+        .annotate(total=Sum('points'))
+        .order_by()
+    )
+    revoked = 0
+    for row in granted:
+        if not row['total']:
+            continue
+        ScoreEvent.objects.create(
+            user_id=user_id,
+            challenge_id=challenge_id,
+            registration_id=row['registration_id'],
+            kind=ScoreEvent.REVOKE,
+            points=-row['total'],
+        )
+        _apply(user_id, row['registration_id'], -row['total'])
+        revoked += row['total']
+    return revoked
+
+
+def _ledger_total(**lookup):
+    events = ScoreEvent.objects.filter(**lookup).order_by().values(*lookup).annotate(total=Sum('points'))
+    return Coalesce(Subquery(events.values('total')), Value(0))
+
+
+def rebuild_totals():
+    """
+    Barcha profil va registratsiya hisoblarini jurnaldan qayta yozadi - ikkita
+    UPDATE ... SET = (SELECT SUM ...) so'rovi. (profillar, registratsiyalar) sonini qaytaradi.
+    """
+    with transaction.atomic():
+        profiles = CTFProfile.objects.update(total_points=_ledger_total(user_id=OuterRef('user_id')))
+        registrations = TournamentRegistration.objects.update(score=_ledger_total(registration_id=OuterRef('pk')))
+        ranking.index.invalidate()
+    return profiles, registrations
+
+
+def score_drift():
+    """
+    Jurnaldan farq qiladigan hisoblar: {'profiles': [(pk, saqlangan, kutilgan)], 'registrations': [...]}.
+    Har bir model uchun bitta so'rov (saqlangan qiymat va SUM bir xil snapshot dan o'qiladi).
+    """
+    profiles = (
+        CTFProfile.objects
+        .annotate(expected=_ledger_total(user_id=OuterRef('user_id')))
+        .exclude(total_points=F('expected'))
+        .values_list('pk', 'total_points', 'expected')
+    )
+    registrations = (
+        TournamentRegistration.objects
+        .annotate(expected=_ledger_total(registration_id=OuterRef('pk')))
+        .exclude(score=F('expected'))
+        .values_list('pk', 'score', 'expected')
+    )
+    return {'profiles': list(profiles), 'registrations': list(registrations)}
+
+
+def apply_drift(drift, batch_size=1000):
+    """
+    Farqlarni tuzatadi. Qiymat to'g'ridan-to'g'ri yozilmaydi, F() + farq qo'shiladi:
+    hisob o'qilgandan keyin kelgan yechimlar yo'qolmaydi. Qatorlar farq bo'yicha
+    guruhlanadi (odatda bir nechta: +-50 bonus, topshiriq ballari) va har guruh
+    batch_size lik `UPDATE ... WHERE pk IN (...)` bilan yoziladi - bulk_update ning
+    CASE ifodasidan ancha tez.
+    """
+    def apply(queryset, field, rows):
+        by_delta = defaultdict(list)
+        for pk, stored, expected in rows:
+            by_delta[expected - stored].append(pk)
+        for delta, pks in by_delta.items():
+            for i in range(0, len(pks), batch_size):
+                queryset.filter(pk__in=pks[i:i + batch_size]).update(**{field: F(field) + delta})
+        return len(rows)
+
+    with transaction.atomic():
+        profiles = apply(CTFProfile.objects, 'total_points', drift['profiles'])
+        registrations = apply(TournamentRegistration.objects, 'score', drift['registrations'])
+        if profiles:
+            ranking.index.invalidate()
+    return profiles, registrations
@@ -0,0 +1,173 @@
+"""
+Jonli scoreboard: yangi yechimlar, first blood va reyting o'zgarishlari.
+
+Yechim tranzaksiyasi commit bo'lgach publish_solve() turnir reytingini BIR marta
+hisoblaydi, keshdagi oldingi holat bilan solishtiradi (rank o'zgarishlari) va
+hodisalarni turnirning kesh jurnaliga yozadi (raqam - cache.incr, atomar).
+Tomoshabinlar jurnalni o'qiydi, shuning uchun hodisa qaysi worker'da yozilganidan
+qat'i nazar hammaga yetadi - N ta tomoshabin bitta hisob-kitob narxiga tushadi.
+Bir nechta worker process bilan umumiy kesh (Redis/Memcached) shart.
+
+Jurnal ikki usulda o'qiladi:
+  * poll (standart): sahifa har POLL_SECONDS da tournament_live ga
+    `?after=<raqam>` bilan so'rov yuboradi - WSGI (runserver/gunicorn) da ishlaydi;
+  * SSE oqimi (settings.CTF_LIVE_STREAM = True): faqat ASGI server bilan
+    (masalan `uvicorn wan.asgi:application`). WSGI da Django async iteratorni
+    ro'yxatga yig'adi va har tomoshabin worker'ni abadiy band qiladi, shuning
+    uchun sozlama o'chiq bo'lsa tournament_stream 204 qaytaradi (EventSource
+    qayta ulanmaydi) va sahifalar poll qiladi. Oqim STREAM_SECONDS dan keyin
+    yopiladi; brauzer Last-Event-ID bilan qayta ulanib, uzilgan joydan davom etadi.
+"""
+import asyncio
+import json
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .scoreboard import tournament_standings
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_LIMIT = 100
+EVENT_TTL = 120
+SNAPSHOT_TTL = 300
+# Tomoshabin shu vaqt ichida so'rov yubormasa - reyting hisoblanmaydi
+WATCH_TTL = 60
+# Shundan ko'p hodisa orqada qolgan mijozga joriy reyting yuboriladi
+MAX_BACKLOG = 200
+POLL_SECONDS = 5
+STREAM_POLL_SECONDS = 1
+STREAM_SECONDS = 300
+HEARTBEAT_SECONDS = 15
+
+
+def stream_enabled():
+    """SSE oqimi faqat ASGI serverda yoqiladi (CTF_LIVE_STREAM)."""
+    return getattr(settings, 'CTF_LIVE_STREAM', False)
+
+
+def format_event(event_type, data, event_id=None):
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}event: {event_type}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _key(tournament_id, name):
+    return f'ctf:live:{tournament_id}:{name}'
+
+
+def last_seq(tournament_id):
+    return cache.get(_key(tournament_id, 'seq'), 0)
+
+
+def append(tournament_id, event_type, data):
+    """Hodisani jurnalga yozadi, raqamini qaytaradi."""
+    key = _key(tournament_id, 'seq')
+    cache.add(key, 0, None)
+    try:
+        seq = cache.incr(key)
+    except ValueError:
+        # add va incr orasida kalit keshdan tushdi - o'quvchilar resync qiladi
+        cache.set(key, 1, None)
+        seq = 1
+    cache.set(_key(tournament_id, f'e:{seq}'), (event_type, data), EVENT_TTL)
+    return seq
+
+
+def touch(tournament_id):
+    """Kimdir tomosha qilyapti - publish_solve reytingni hisoblaydi."""
+    cache.set(_key(tournament_id, 'watched'), 1, WATCH_TTL)
+
+
+def get_snapshot(tournament):
+    key = _key(tournament.id, 'snapshot')
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = tournament_standings(tournament, limit=SNAPSHOT_LIMIT)
+        cache.add(key, snapshot, SNAPSHOT_TTL)
+    return snapshot
+
+
+def read(tournament, after):
+    """
+    `after` dan keyingi hodisalar: (oxirgi_raqam, [(raqam, tur, data), ...]).
+    Hodisalar keshdan tushib qolgan bo'lsa - joriy reyting bitta 'scoreboard' bilan.
+    """
+    seq = last_seq(tournament.id)
+    if after == seq:
+        return seq, []
+    if 0 <= after < seq and seq - after <= MAX_BACKLOG:
+        keys = [_key(tournament.id, f'e:{n}') for n in range(after + 1, seq + 1)]
+        found = cache.get_many(keys)
+        if len(found) == len(keys):
+            return seq, [(after + 1 + i, *found[key]) for i, key in enumerate(keys)]
+    return seq, [(seq, 'scoreboard', {'changes': [], 'standings': get_snapshot(tournament)})]
+
+
+def publish_solve(tournament, username, challenge, points, first_blood):
+    """Yechimdan keyin (on_commit) chaqiriladi. Reyting bir marta hisoblanadi."""
+    snapshot_key = _key(tournament.id, 'snapshot')
+    if not cache.get(_key(tournament.id, 'watched')):
+        # Hech kim tinglamayapti - keyingi tomoshabin uchun snapshot qaytadan hisoblanadi
+        cache.delete(snapshot_key)
+        return
+
+    standings = tournament_standings(tournament, limit=SNAPSHOT_LIMIT)
+    previous = cache.get(snapshot_key) or []
+    cache.set(snapshot_key, standings, SNAPSHOT_TTL)
+
+    append(tournament.id, 'solve', {
+        'name': username,
+        'challenge': challenge.title,
+        'points': points,
+        'first_blood': first_blood,
+    })
+    changes = diff_standings(previous, standings)
+    if changes:
+        append(tournament.id, 'scoreboard', {
+            'changes': changes,
+            'standings': standings,
+        })
+
+
+def diff_standings(previous, current):
+    old = {entry['id']: entry for entry in previous}
+    changes = []
+    for entry in current:
+        before = old.get(entry['id'])
+        if before is None or before['rank'] != entry['rank'] or before['score'] != entry['score']:
+            changes.append({
+                'id': entry['id'],
+                'name': entry['name'],
+                'rank': entry['rank'],
+                'old_rank': before['rank'] if before else None,
+                'score': entry['score'],
+            })
+    return changes
+
+
+async def event_stream(tournament, after=None):
+    """SSE: jurnalni STREAM_POLL_SECONDS da o'qiydi, STREAM_SECONDS dan keyin tugaydi."""
+    yield "retry: 5000\n\n"
+    if after is None:
+        # Avval raqam, keyin snapshot - oradagi yechimlar keyingi o'qishda keladi
+        after = await sync_to_async(last_seq)(tournament.id)
+        snapshot = await sync_to_async(get_snapshot)(tournament)
+        yield format_event('snapshot', {'standings': snapshot}, after)
+
+    deadline = time.monotonic() + STREAM_SECONDS
+    idle_since = time.monotonic()
+    while time.monotonic() < deadline:
+        await sync_to_async(touch)(tournament.id)
+        after, events = await sync_to_async(read)(tournament, after)
+        for seq, event_type, data in events:
+            yield format_event(event_type, data, seq)
+        if events:
+            idle_since = time.monotonic()
+        elif time.monotonic() - idle_since >= HEARTBEAT_SECONDS:
+            # Proxy/brauzer ulanishni yopib qo'ymasligi uchun izoh satri
+            yield ": ping\n\n"
+            idle_since = time.monotonic()
+        await asyncio.sleep(STREAM_POLL_SECONDS)
@@ -0,0 +1,79 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from ctf import search
+from ctf.models import Challenge
+
+WORDS = (
+    "sql injection cookie header token jwt cipher caesar base64 binary stego pixel "
+    "exif metadata dns record robots admin panel reverse python logic regex buffer "
+    "overflow kernel network packet firewall hash crack brute force archive zip"
+).split()
+
+QUERIES = ["sql", "injection", "cook", "jwt token", "reverse python", "zzzz"]
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks challenge search (LIKE vs FTS index) on synthetic catalogs. All data is rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        fts = search.FTS5Backend()
+        like = search.LikeBackend()
+        if search.get_backend().name != 'fts5':
+            self.stdout.write(self.style.WARNING("FTS index is not available on this database."))
+            return
+
+        for size in options['sizes']:
+            with transaction.atomic():
+                self._populate(size)
+                search.rebuild_index()
+
+                base = Challenge.objects.filter(is_active=True).filter(
+                    Q(tournament__isnull=True)
+                ).order_by('-created_at')
+
+                self.stdout.write(f"\n=== {size} challenges ===")
+                self.stdout.write(f"{'query':<18}{'LIKE ms':>10}{'FTS ms':>10}{'hits':>8}")
+                for query in QUERIES:
+                    like_ms, _ = self._measure(lambda: list(like.filter_queryset(base, query)[:12]), options['repeat'])
+                    fts_ms, hits = self._measure(lambda: list(fts.filter_queryset(base, query)[:12]), options['repeat'])
+                    self.stdout.write(f"{query:<18}{like_ms:>10.2f}{fts_ms:>10.2f}{len(hits):>8}")
+
+                transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("\nDone (synthetic data rolled back)."))
+
+    def _populate(self, size):
+        rnd = random.Random(size)
+        categories = [code for code, _ in Challenge.CATEGORY_CHOICES]
+        batch = []
+        for i in range(size):
+            batch.append(Challenge(
+                title=f"{' '.join(rnd.sample(WORDS, 3))} #{i}",
+                description=' '.join(rnd.choices(WORDS, k=40)),
+                category=rnd.choice(categories),
+                points=rnd.choice([10, 20, 50, 100]),
+                flag_hash='0' * 64,
+            ))
+            if len(batch) == 5000:
+                Challenge.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Challenge.objects.bulk_create(batch)
+
+    def _measure(self, fn, repeat):
+        best = None
+        result = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn()
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
@@ -0,0 +1,55 @@
+import os
+import statistics
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand
+
+# Har bir o'lchov yangi process da: django.setup() + ctf modullari (URLconf orqali views ham)
+SNIPPET = """
+import sys, time
+started = time.perf_counter()
+import django
+django.setup()
+import ctf.views, ctf.jobs, ctf.reaper
+{extra}
+print((time.perf_counter() - started) * 1000, 'docker' in sys.modules)
+"""
+
+# Avvalgi xatti-harakat: docker_utils import paytida docker.from_env() chaqirardi
+EAGER = """
+try:
+    import docker
+    docker.from_env()
+except Exception:
+    pass
+"""
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks Django process startup with the lazy Docker client vs import-time docker.from_env().'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=7)
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'wan.settings')
+
+        self.stdout.write(f"{'variant':<10}{'median ms':>12}{'min ms':>10}{'docker imported':>18}")
+        results = {}
+        for name, extra in (('lazy', ''), ('eager', EAGER)):
+            timings, imported = [], False
+            for _ in range(options['repeat']):
+                out = subprocess.run(
+                    [sys.executable, '-c', SNIPPET.format(extra=extra)],
+                    capture_output=True, text=True, env=env, check=True,
+                ).stdout.split()
+                timings.append(float(out[-2]))
+                imported = out[-1] == 'True'
+            results[name] = statistics.median(timings)
+            self.stdout.write(f"{name:<10}{results[name]:>12.1f}{min(timings):>10.1f}{str(imported):>18}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\nImport-time cost removed: {results['eager'] - results['lazy']:.1f} ms per process."
+        ))
@@ -0,0 +1,51 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ctf import images, nodes
+
+
+class Command(BaseCommand):
+    help = 'Builds challenges/docker/*/Dockerfile images and pulls other challenge images on every Docker node'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help="Faqat shu kontekstlar (masalan ping_rce)")
+        parser.add_argument('--node', action='append', dest='nodes', help="Faqat shu node(lar)")
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'CTF_DOCKER_CONCURRENCY', 4))
+        parser.add_argument('--force', action='store_true', help="Digest o'zgarmagan bo'lsa ham qayta build/pull")
+        parser.add_argument('--no-pull', action='store_true', help="Faqat kontekstli image'larni build qilish")
+
+    def handle(self, *args, **options):
+        contexts = images.discover()
+        if options['names']:
+            wanted = set(options['names'])
+            contexts = [ctx for ctx in contexts if ctx.path.name in wanted]
+            missing = wanted - {ctx.path.name for ctx in contexts}
+            if missing:
+                raise CommandError(f"Unknown image contexts: {', '.join(sorted(missing))}")
+        elif not options['no_pull']:
+            contexts += images.challenge_images()
+
+        node_names = options['nodes']
+        for name in node_names or []:
+            try:
+                nodes.registry.get(name)
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        self.stdout.write(f"Preparing {len(contexts)} images...")
+        results = images.sync_images(contexts, node_names, workers=options['workers'], force=options['force'])
+
+        for result in results:
+            line = f"{result.node:<12}{result.image:<40}{result.action:<8}{result.digest[:19]}"
+            if result.action == 'failed':
+                self.stdout.write(self.style.ERROR(f"{line}{result.error}"))
+            else:
+                self.stdout.write(line)
+
+        summary = Counter(result.action for result in results)
+        self.stdout.write(', '.join(f"{action}: {count}" for action, count in sorted(summary.items())))
+        if summary['failed']:
+            raise CommandError(f"{summary['failed']} image(s) failed.")
+        self.stdout.write(self.style.SUCCESS("All challenge images are ready."))
@@ -0,0 +1,23 @@
+import json
+
+from django.core.management.base import BaseCommand
+from ctf.lab_pool import LabPool
+
+class Command(BaseCommand):
+    help = 'Manages the warm container pool for Docker challenges (warm / drain / stats)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['warm', 'drain', 'stats'])
+
+    def handle(self, *args, **options):
+        pool = LabPool(background=False)
+        action = options['action']
+
+        if action == 'warm':
+            started = pool.warm_all()
+            self.stdout.write(self.style.SUCCESS(f"Started {started} pooled containers."))
+        elif action == 'drain':
+            stopped = pool.drain()
+            self.stdout.write(self.style.SUCCESS(f"Stopped {stopped} idle containers."))
+
+        self.stdout.write(json.dumps(pool.metrics(), indent=2))
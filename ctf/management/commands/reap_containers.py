@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from ctf import admission, container_status, reaper
+
+class Command(BaseCommand):
+    help = 'Stops expired/idle lab containers (long-running loop, or --once for cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run a single pass and exit')
+        parser.add_argument('--interval', type=int, default=30, help='Seconds between passes')
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--workers', type=int, default=4, help='Parallel docker stop calls')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            reaped = reaper.reap(batch_size=options['batch_size'], workers=options['workers'])
+            ghosts = container_status.reconcile_ghosts()
+            # Signal o'tkazib yuborgan bo'lsa ham navbat to'xtab qolmasin
+            admission.admit()
+            if reaped or ghosts or options['once']:
+                self.stdout.write(f"Reaped {reaped} expired containers, removed {ghosts} ghost records.")
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ctf import ledger
+
+
+class Command(BaseCommand):
+    help = 'Recomputes every CTFProfile.total_points and TournamentRegistration.score from the ScoreEvent ledger'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        profiles, registrations = ledger.rebuild_totals()
+        elapsed = (time.monotonic() - started) * 1000
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {profiles} profiles and {registrations} registrations in {elapsed:.0f} ms."
+        ))
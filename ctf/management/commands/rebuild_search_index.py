@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from ctf import search
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index for Challenges'
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        self.stdout.write(f"Search backend: {backend.name}")
+
+        if backend.name == 'like':
+            self.stdout.write(self.style.WARNING("FTS index is not available, nothing to rebuild."))
+            return
+
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} challenges."))
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ctf import ledger
+from ctf.models import CTFProfile, TournamentRegistration
+
+
+class Command(BaseCommand):
+    help = 'Compares CTFProfile / TournamentRegistration totals with the ScoreEvent ledger and fixes the drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Faqat farqlarni ko'rsatish")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--show', type=int, default=20, help="Eng katta farqlardan nechtasini chiqarish")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        drift = ledger.score_drift()
+        elapsed = (time.monotonic() - started) * 1000
+
+        self._report('Profiles', drift['profiles'], self._profile_names, options['show'])
+        self._report('Registrations', drift['registrations'], self._registration_names, options['show'])
+        self.stdout.write(f"Drift computed in {elapsed:.0f} ms.")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING("Dry run: nothing changed."))
+            return
+
+        started = time.monotonic()
+        profiles, registrations = ledger.apply_drift(drift, batch_size=options['batch_size'])
+        elapsed = (time.monotonic() - started) * 1000
+        self.stdout.write(self.style.SUCCESS(
+            f"Fixed {profiles} profiles and {registrations} registrations in {elapsed:.0f} ms."
+        ))
+
+    def _report(self, title, rows, names, show):
+        total = sum(abs(expected - stored) for _, stored, expected in rows)
+        self.stdout.write(f"{title}: {len(rows)} drifted, {total} points in total")
+        if not rows or not show:
+            return
+        worst = sorted(rows, key=lambda row: abs(row[2] - row[1]), reverse=True)[:show]
+        labels = names([pk for pk, _, _ in worst])
+        self.stdout.write(f"  {'name':<30}{'stored':>10}{'ledger':>10}{'diff':>10}")
+        for pk, stored, expected in worst:
+            self.stdout.write(f"  {labels.get(pk, pk):<30}{stored:>10}{expected:>10}{expected - stored:>+10}")
+
+    @staticmethod
+    def _profile_names(pks):
+        return dict(CTFProfile.objects.filter(pk__in=pks).values_list('pk', 'user__username'))
+
+    @staticmethod
+    def _registration_names(pks):
+        rows = TournamentRegistration.objects.filter(pk__in=pks).values_list('pk', 'tournament__title', 'user__username', 'team__name')
+        return {pk: f"{tournament}: {team or user}" for pk, tournament, user, team in rows}
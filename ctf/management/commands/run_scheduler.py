@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from ctf import scheduler
+
+
+class Command(BaseCommand):
+    help = 'Flips tournament phases and challenge visibility at start/end times (catch-up pass first; --once for cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run a single catch-up pass and exit')
+        parser.add_argument('--max-sleep', type=int, default=60, help="O'tishlar orasida eng ko'p kutish (soniya)")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            now = timezone.now()
+            changed = scheduler.sync(now)
+            if any(changed.values()) or options['once']:
+                self.stdout.write(f"{changed['tournaments']} tournaments, {changed['challenges']} challenges changed.")
+
+            if options['once']:
+                break
+            # Keyingi chegaragacha uxlaymiz; admin sanalarni o'zgartirsa ham max-sleep dan keyin qayta hisoblanadi
+            upcoming = scheduler.next_transition(now)
+            delay = options['max_sleep']
+            if upcoming is not None:
+                delay = min(delay, (upcoming - timezone.now()).total_seconds())
+            time.sleep(max(0.05, delay))
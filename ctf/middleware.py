@@ -0,0 +1,12 @@
+from .user_context import UserContext
+
+
+class UserContextMiddleware:
+    """request.ctx ni o'rnatadi (AuthenticationMiddleware dan keyin turishi kerak). Yuklash dangasa."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.ctx = UserContext(request.user)
+        return self.get_response(request)
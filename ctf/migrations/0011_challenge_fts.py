@@ -0,0 +1,34 @@
+from django.db import migrations
+
+from ctf.search import FTS_TABLE, create_fts_table
+
+
+def create_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if not create_fts_table(connection):
+        return
+    Challenge = apps.get_model('ctf', 'Challenge')
+    table = Challenge._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, description, category) "
+            f"SELECT id, title, description, category FROM {table}"
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctf', '0010_activecontainer'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
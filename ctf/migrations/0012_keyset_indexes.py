@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctf', '0011_challenge_fts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='challenge',
+            index=models.Index(fields=['-created_at', '-id'], name='ctf_challenge_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ctfprofile',
+            index=models.Index(fields=['-total_points', 'last_solved', 'id'], name='ctf_profile_rank_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctf', '0012_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='challenge',
+            name='pool_max_idle',
+            field=models.PositiveSmallIntegerField(default=0, help_text="Pool dagi bo'sh konteynerlarning yuqori chegarasi", verbose_name="Pool (max bo'sh)"),
+        ),
+        migrations.AddField(
+            model_name='challenge',
+            name='pool_min_idle',
+            field=models.PositiveSmallIntegerField(default=0, help_text="Oldindan ishga tushirib qo'yiladigan bo'sh konteynerlar soni (0 - pool yo'q)", verbose_name="Pool (min bo'sh)"),
+        ),
+        migrations.AlterField(
+            model_name='activecontainer',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='active_containers', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctf', '0013_warm_pool'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activecontainer',
+            name='host_port',
+            field=models.IntegerField(help_text='Port on the host machine', unique=True),
+        ),
+    ]
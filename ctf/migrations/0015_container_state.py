@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:57
+
+from django.db import migrations, models
+
+
+def mark_existing_running(apps, schema_editor):
+    # Migratsiyadan oldingi qatorlar - allaqachon ishlab turgan konteynerlar
+    ActiveContainer = apps.get_model('ctf', 'ActiveContainer')
+    ActiveContainer.objects.exclude(container_id='').update(state='running')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctf', '0014_port_leases'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activecontainer',
+            name='error',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='activecontainer',
+            name='state',
+            field=models.CharField(choices=[('pending', 'Navbatda'), ('starting', 'Ishga tushirilmoqda'), ('running', 'Ishlayapti'), ('failed', 'Xatolik'), ('stopping', "To'xtatilmoqda")], default='pending', max_length=10),
+        ),
+        migrations.RunPython(mark_existing_running, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctf', '0015_container_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activecontainer',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='activecontainer',
+            name='last_seen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
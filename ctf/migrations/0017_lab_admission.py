@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctf', '0016_container_expiry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournament',
+            name='reserved_labs',
+            field=models.PositiveIntegerField(default=0, verbose_name='Zaxira laboratoriyalar'),
+        ),
+        migrations.AlterField(
+            model_name='activecontainer',
+            name='state',
+            field=models.CharField(choices=[('queued', "Sig'im kutilmoqda"), ('pending', 'Navbatda'), ('starting', 'Ishga tushirilmoqda'), ('running', 'Ishlayapti'), ('failed', 'Xatolik'), ('stopping', "To'xtatilmoqda")], default='pending', max_length=10),
+        ),
+    ]
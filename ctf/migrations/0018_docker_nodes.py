@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctf', '0017_lab_admission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activecontainer',
+            name='node',
+            field=models.CharField(db_index=True, default='local', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='activecontainer',
+            name='host_port',
+            field=models.IntegerField(help_text='Port on the host machine'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='activecontainer',
+            unique_together={('node', 'host_port'), ('user', 'challenge')},
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctf', '0018_docker_nodes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activecontainer',
+            name='holders',
+            field=models.ManyToManyField(blank=True, related_name='shared_labs', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='activecontainer',
+            name='team',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='active_containers', to='ctf.team'),
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='share_team_labs',
+            field=models.BooleanField(default=True, verbose_name='Jamoaviy laboratoriya'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='activecontainer',
+            unique_together={('node', 'host_port'), ('team', 'challenge'), ('user', 'challenge')},
+        ),
+    ]
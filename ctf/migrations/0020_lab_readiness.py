@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctf', '0019_team_labs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activecontainer',
+            name='probe_latency_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='activecontainer',
+            name='ready_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='challenge',
+            name='ready_probe',
+            field=models.CharField(choices=[('http', 'HTTP javob'), ('tcp', 'TCP ulanish'), ('none', 'Tekshirilmaydi')], default='http', max_length=4, verbose_name='Tayyorlik tekshiruvi'),
+        ),
+    ]
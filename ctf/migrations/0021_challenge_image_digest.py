@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctf', '0020_lab_readiness'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='challenge',
+            name='docker_image_digest',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100, verbose_name='Docker Image Digest'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctf', '0021_challenge_image_digest'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='challengeattempt',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Vaqt'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_solve_counters(apps, schema_editor):
+    Challenge = apps.get_model('ctf', 'Challenge')
+    SolvedChallenge = apps.get_model('ctf', 'SolvedChallenge')
+
+    counts = SolvedChallenge.objects.values('challenge_id').annotate(n=Count('id')).order_by()
+    first = {}
+    for challenge_id, user_id in SolvedChallenge.objects.order_by('solved_at', 'id').values_list('challenge_id', 'user_id').iterator():
+        first.setdefault(challenge_id, user_id)
+    for row in counts:
+        Challenge.objects.filter(pk=row['challenge_id']).update(
+            solve_count=row['n'], first_blood_user_id=first.get(row['challenge_id'])
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctf', '0022_attempt_timestamp_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='challenge',
+            name='first_blood_user',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='first_bloods', to=settings.AUTH_USER_MODEL, verbose_name='First Blood'),
+        ),
+        migrations.AddField(
+            model_name='challenge',
+            name='solve_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Yechganlar soni'),
+        ),
+        migrations.RunPython(backfill_solve_counters, migrations.RunPython.noop),
+    ]
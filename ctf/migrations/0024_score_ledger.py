@@ -0,0 +1,84 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_ledger(apps, schema_editor):
+    """
+    Mavjud yechimlardan (SolvedChallenge x Challenge.points + first blood) jurnal
+    yozuvlari. Saqlangan hisoblardagi eski farqlar jurnalga ko'chirilmaydi -
+    ularni `manage.py reconcile_scores --dry-run` ko'rsatadi.
+    """
+    ScoreEvent = apps.get_model('ctf', 'ScoreEvent')
+    SolvedChallenge = apps.get_model('ctf', 'SolvedChallenge')
+    TournamentRegistration = apps.get_model('ctf', 'TournamentRegistration')
+    Team = apps.get_model('ctf', 'Team')
+
+    user_regs, team_regs = {}, {}
+    for reg_id, tournament_id, user_id, team_id in TournamentRegistration.objects.values_list('id', 'tournament_id', 'user_id', 'team_id'):
+        if team_id:
+            team_regs[(tournament_id, team_id)] = reg_id
+        elif user_id:
+            user_regs[(tournament_id, user_id)] = reg_id
+    user_teams = {}
+    for team_id, user_id in Team.members.through.objects.values_list('team_id', 'user_id'):
+        user_teams.setdefault(user_id, []).append(team_id)
+
+    def registration_for(tournament_id, mode, user_id):
+        if tournament_id is None:
+            return None
+        if mode == 'TEAM':
+            for team_id in user_teams.get(user_id, []):
+                if (tournament_id, team_id) in team_regs:
+                    return team_regs[(tournament_id, team_id)]
+            return None
+        return user_regs.get((tournament_id, user_id))
+
+    events = []
+    solves = SolvedChallenge.objects.values_list(
+        'user_id', 'challenge_id', 'solved_at', 'challenge__points',
+        'challenge__tournament_id', 'challenge__tournament__mode', 'challenge__first_blood_user_id',
+    )
+    for user_id, challenge_id, solved_at, points, tournament_id, mode, first_blood_user_id in solves.iterator():
+        common = {
+            'user_id': user_id,
+            'challenge_id': challenge_id,
+            'registration_id': registration_for(tournament_id, mode, user_id),
+            'created_at': solved_at,
+        }
+        events.append(ScoreEvent(kind='solve', points=points, **common))
+        if first_blood_user_id == user_id:
+            events.append(ScoreEvent(kind='first_blood', points=50, **common))
+    ScoreEvent.objects.bulk_create(events, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctf', '0023_solve_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('solve', 'Yechim'), ('first_blood', 'First Blood bonusi'), ('revoke', 'Bekor qilish'), ('adjust', "Qo'lda tuzatish")], max_length=12, verbose_name='Turi')),
+                ('points', models.IntegerField(verbose_name='Ball')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Vaqt')),
+                ('challenge', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='score_events', to='ctf.challenge', verbose_name='Masala')),
+                ('registration', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='score_events', to='ctf.tournamentregistration', verbose_name='Turnir Ishtirokchisi')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='score_events', to=settings.AUTH_USER_MODEL, verbose_name='Foydalanuvchi')),
+            ],
+            options={
+                'verbose_name': 'Ball yozuvi',
+                'verbose_name_plural': 'Ballar jurnali',
+                'indexes': [models.Index(fields=['user', 'challenge'], name='ctf_score_user_chal_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
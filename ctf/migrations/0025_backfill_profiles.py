@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:05
+
+from django.conf import settings
+from django.db import migrations
+
+
+def create_missing_profiles(apps, schema_editor):
+    """Profilsiz foydalanuvchilar uchun CTFProfile (ilgari har User.save() da get_or_create qilinardi)."""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    CTFProfile = apps.get_model('ctf', 'CTFProfile')
+    missing = User.objects.filter(ctf_profile__isnull=True).values_list('pk', flat=True)
+    CTFProfile.objects.bulk_create([CTFProfile(user_id=pk) for pk in missing.iterator()], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctf', '0024_score_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
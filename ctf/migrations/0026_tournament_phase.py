@@ -0,0 +1,42 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:29
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q
+from django.utils import timezone
+
+
+def backfill_phase(apps, schema_editor):
+    """Hozirgi vaqt bo'yicha bosqich va ko'rinish (keyingi o'tishlarni ctf/scheduler.py qiladi)."""
+    Tournament = apps.get_model('ctf', 'Tournament')
+    Challenge = apps.get_model('ctf', 'Challenge')
+    now = timezone.now()
+    Tournament.objects.filter(start_date__lte=now, end_date__gt=now).update(phase='running')
+    Tournament.objects.filter(end_date__lte=now).update(phase='finished')
+    Challenge.objects.exclude(Q(tournament__isnull=True) | Q(tournament__phase='finished')).update(visibility='tournament')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctf', '0025_backfill_profiles'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='challenge',
+            name='visibility',
+            field=models.CharField(choices=[('public', "Umumiy ro'yxatda"), ('tournament', 'Faqat turnirda')], default='public', editable=False, max_length=10, verbose_name="Ko'rinish"),
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='phase',
+            field=models.CharField(choices=[('upcoming', 'Kutilmoqda'), ('running', 'Davom etmoqda'), ('finished', 'Tugagan')], db_index=True, default='upcoming', editable=False, max_length=10, verbose_name='Bosqich'),
+        ),
+        migrations.AddIndex(
+            model_name='challenge',
+            index=models.Index(fields=['visibility', 'is_active', '-created_at', '-id'], name='ctf_challenge_listing_idx'),
+        ),
+        migrations.RunPython(backfill_phase, migrations.RunPython.noop),
+    ]
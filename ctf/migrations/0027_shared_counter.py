@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:37
+
+from django.db import migrations, models
+
+
+def create_rank_counter(apps, schema_editor):
+    apps.get_model('ctf', 'SharedCounter').objects.get_or_create(name='rank')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctf', '0026_tournament_phase'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SharedCounter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Nomi')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Qiymat')),
+            ],
+            options={
+                'verbose_name': 'Hisoblagich',
+                'verbose_name_plural': 'Hisoblagichlar',
+            },
+        ),
+        migrations.RunPython(create_rank_counter, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctf', '0027_shared_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProbeLatency',
+            fields=[
+                ('challenge', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='probe_latency', serialize=False, to='ctf.challenge')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name="Probe'lar soni")),
+                ('failed', models.PositiveIntegerField(default=0, verbose_name='Javob bermaganlar')),
+                ('total_ms', models.BigIntegerField(default=0, verbose_name='Jami kutish (ms)')),
+                ('max_ms', models.PositiveIntegerField(default=0, verbose_name='Eng uzoq kutish (ms)')),
+            ],
+            options={
+                'verbose_name': 'Probe kutish vaqti',
+                'verbose_name_plural': 'Probe kutish vaqtlari',
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:05
+
+from django.db import migrations
+
+
+def drop_backfill_adjustments(apps, schema_editor):
+    """
+    0024 ning avvalgi versiyasi saqlangan hisoblardagi farqni 'adjust' yozuvlari
+    bilan jurnalga ko'chirgan edi - natijada reconcile_scores eski farqlarni
+    (o'chirilgan yechimlarning bonusi va h.k.) hech qachon ko'rmasdi. Boshqa
+    joyda 'adjust' yozilmaydi (admin jurnalni faqat o'qiydi), shuning uchun
+    hammasi o'chiriladi: jurnal yechimlardan qurilgan haqiqiy qiymatga qaytadi.
+    """
+    apps.get_model('ctf', 'ScoreEvent').objects.filter(kind='adjust').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ctf', '0028_probe_latency'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_backfill_adjustments, migrations.RunPython.noop),
+    ]
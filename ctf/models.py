@@ -1,8 +1,16 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery
 import secrets # Token generatsiya uchun
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import m2m_changed, post_save, post_delete
 from django.dispatch import receiver
+from django.utils import timezone
+from . import search
+from . import progress
+from . import ranking
+from . import ports
+from . import admission
+from . import scheduler
 
 class Challenge(models.Model):
     CATEGORY_CHOICES = (
@@ -26,17 +34,75 @@ class Challenge(models.Model):
     # Docker Integration
     docker_image_name = models.CharField(max_length=255, blank=True, null=True, help_text="Docker image name (e.g., wan-net/ping-rce:latest)", verbose_name="Docker Image")
     docker_port = models.IntegerField(default=5000, help_text="Internal port exposed by the container", verbose_name="Docker Port")
+    # build_challenge_images yozadi (ctf/images.py): node'larda tayyorlangan image digest i
+    docker_image_digest = models.CharField(max_length=100, blank=True, default='', editable=False, verbose_name="Docker Image Digest")
+    READY_PROBE_CHOICES = (
+        ('http', 'HTTP javob'),
+        ('tcp', 'TCP ulanish'),
+        ('none', 'Tekshirilmaydi'),
+    )
+    # Konteyner "running" deb belgilanishidan oldin host_port qanday tekshiriladi (ctf/readiness.py)
+    ready_probe = models.CharField(max_length=4, choices=READY_PROBE_CHOICES, default='http', verbose_name="Tayyorlik tekshiruvi")
+    pool_min_idle = models.PositiveSmallIntegerField(default=0, help_text="Oldindan ishga tushirib qo'yiladigan bo'sh konteynerlar soni (0 - pool yo'q)", verbose_name="Pool (min bo'sh)")
+    pool_max_idle = models.PositiveSmallIntegerField(default=0, help_text="Pool dagi bo'sh konteynerlarning yuqori chegarasi", verbose_name="Pool (max bo'sh)")
+
+    # Denormalizatsiya: ro'yxat sahifasi COUNT siz ko'rsatadi, first blood shartli UPDATE bilan aniqlanadi
+    solve_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Yechganlar soni")
+    first_blood_user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='first_bloods', verbose_name="First Blood")
 
     # Agar masala turnirga tegishli bo'lsa, uni shu yerda tanlaymiz. Agar bo'sh bo'lsa - bu oddiy mashq masalasi.
     tournament = models.ForeignKey('Tournament', on_delete=models.SET_NULL, null=True, blank=True, related_name='challenges', verbose_name="Turnir")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Yaratilgan vaqt")
 
+    PUBLIC = 'public'
+    TOURNAMENT = 'tournament'
+    VISIBILITY_CHOICES = (
+        (PUBLIC, "Umumiy ro'yxatda"),
+        (TOURNAMENT, "Faqat turnirda"),
+    )
+    # Denormalizatsiya: turnirsiz yoki turniri tugagan masala - PUBLIC. Turnir bosqichi
+    # o'zgarganda ctf/scheduler.py yangilaydi, ro'yxat JOIN va vaqt solishtirishsiz filtrlanadi.
+    visibility = models.CharField(max_length=10, choices=VISIBILITY_CHOICES, default=PUBLIC, editable=False, verbose_name="Ko'rinish")
+
     def __str__(self):
         return f"{self.title} ({self.category}) - {self.points} pts"
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'tournament' in update_fields:
+            tournament = self.tournament if self.tournament_id else None
+            if tournament is None or tournament.phase == Tournament.FINISHED:
+                self.visibility = self.PUBLIC
+            else:
+                self.visibility = self.TOURNAMENT
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'visibility'}
+        super().save(*args, **kwargs)
+
+    def register_solve(self, user):
+        """
+        solve_count ni oshiradi va first blood ni egallashga urinadi. Ikkalasi ham bitta
+        shartli UPDATE: bir vaqtda kelgan yechimlardan faqat bittasi True oladi
+        (SQLite da select_for_update ishlamaydi). Odatiy holatda - bitta so'rov.
+        """
+        challenges = Challenge.objects.filter(pk=self.pk)
+        for _ in range(2):
+            if challenges.filter(first_blood_user__isnull=False).update(solve_count=F('solve_count') + 1):
+                return False
+            if challenges.filter(first_blood_user__isnull=True).update(solve_count=F('solve_count') + 1, first_blood_user=user):
+                return True
+            # Ikki UPDATE orasida boshqa yechim first blood ni oldi - birinchisini qaytaramiz
+        return False
     
     class Meta:
         verbose_name = "Masala"
         verbose_name_plural = "Masalalar"
+        indexes = [
+            # Keyset pagination: (created_at, id) bo'yicha kamayish tartibida
+            models.Index(fields=['-created_at', '-id'], name='ctf_challenge_created_idx'),
+            # Umumiy ro'yxat: visibility + is_active filtri, keyin keyset tartibi
+            models.Index(fields=['visibility', 'is_active', '-created_at', '-id'], name='ctf_challenge_listing_idx'),
+        ]
 
 class SolvedChallenge(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='solved_challenges', verbose_name="Foydalanuvchi")
@@ -55,7 +121,8 @@ class ChallengeAttempt(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='challenge_attempts', verbose_name="Foydalanuvchi")
     challenge = models.ForeignKey(Challenge, on_delete=models.CASCADE, related_name='attempts', verbose_name="Masala")
     input_flag = models.CharField(max_length=255, verbose_name="Kiritilgan flag")
-    timestamp = models.DateTimeField(auto_now_add=True, verbose_name="Vaqt")
+    # auto_now_add emas: attempt_log buferidan bulk_create qilinganda ham yuborilgan vaqt saqlanadi
+    timestamp = models.DateTimeField(default=timezone.now, verbose_name="Vaqt")
     is_correct = models.BooleanField(default=False, verbose_name="To'g'rimi?")
 
     class Meta:
@@ -73,6 +140,10 @@ class CTFProfile(models.Model):
     class Meta:
         verbose_name = "CTF Profil"
         verbose_name_plural = "CTF Profillari"
+        indexes = [
+            # Leaderboard tartibi: -total_points, last_solved, id
+            models.Index(fields=['-total_points', 'last_solved', 'id'], name='ctf_profile_rank_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.total_points} pts"
@@ -91,25 +162,97 @@ class Tournament(models.Model):
     end_date = models.DateTimeField(verbose_name="Tugash Vaqti")
     is_active = models.BooleanField(default=False, verbose_name="Faolmi?")
     mode = models.CharField(max_length=10, choices=MODE_CHOICES, default='SOLO', verbose_name="Format")
-    
-    # Kelajakda avtomatik ochish/yopish uchun
-    
+    # Turnir davomida faqat shu turnir uchun saqlab qo'yiladigan laboratoriya joylari
+    reserved_labs = models.PositiveIntegerField(default=0, verbose_name="Zaxira laboratoriyalar")
+    # TEAM rejimida jamoa a'zolari bitta konteynerdan foydalanadi
+    share_team_labs = models.BooleanField(default=True, verbose_name="Jamoaviy laboratoriya")
+
+    UPCOMING = 'upcoming'
+    RUNNING = 'running'
+    FINISHED = 'finished'
+    PHASE_CHOICES = (
+        (UPCOMING, 'Kutilmoqda'),
+        (RUNNING, 'Davom etmoqda'),
+        (FINISHED, 'Tugagan'),
+    )
+    # start_date / end_date dan kelib chiqadi; chegaralarda ctf/scheduler.py o'zgartiradi
+    phase = models.CharField(max_length=10, choices=PHASE_CHOICES, default=UPCOMING, editable=False, db_index=True, verbose_name="Bosqich")
+
     def __str__(self):
         return self.title
+
+    def phase_at(self, now):
+        if now < self.start_date:
+            return self.UPCOMING
+        if now < self.end_date:
+            return self.RUNNING
+        return self.FINISHED
+
+    def save(self, *args, **kwargs):
+        self.phase = self.phase_at(timezone.now())
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'phase'}
+        super().save(*args, **kwargs)
     
     class Meta:
         verbose_name = "Turnir"
         verbose_name_plural = "Turnirlar"
 
 class ActiveContainer(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='active_containers')
+    QUEUED = 'queued'
+    PENDING = 'pending'
+    STARTING = 'starting'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STOPPING = 'stopping'
+    STATE_CHOICES = (
+        (QUEUED, "Sig'im kutilmoqda"),
+        (PENDING, 'Navbatda'),
+        (STARTING, 'Ishga tushirilmoqda'),
+        (RUNNING, 'Ishlayapti'),
+        (FAILED, 'Xatolik'),
+        (STOPPING, "To'xtatilmoqda"),
+    )
+
+    # user va team bo'sh (NULL) bo'lsa - konteyner warm pool da, hali hech kimga berilmagan
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='active_containers')
+    # Jamoaviy laboratoriya (ctf/team_labs.py): holders - hozir foydalanayotgan a'zolar
+    team = models.ForeignKey('Team', on_delete=models.CASCADE, null=True, blank=True, related_name='active_containers')
+    holders = models.ManyToManyField(User, blank=True, related_name='shared_labs')
     challenge = models.ForeignKey(Challenge, on_delete=models.CASCADE)
+    # Bo'sh bo'lsa - port ijaraga olingan, konteyner hali ishga tushirilmoqda
     container_id = models.CharField(max_length=255)
+    # Konteyner ishlayotgan Docker node (ctf/nodes.py)
+    node = models.CharField(max_length=64, default='local', db_index=True)
+    # (node, host_port) UNIQUE - port ijarasi shu qator orqali (ctf/ports.py)
     host_port = models.IntegerField(help_text="Port on the host machine")
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=PENDING)
+    error = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Reaper shu vaqtdan keyin konteynerni to'xtatadi (foydalanuvchi uzaytirishi mumkin)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+    # Readiness probe: ilova qachon javob bergani va run() dan keyin qancha kutilgani
+    ready_at = models.DateTimeField(null=True, blank=True)
+    probe_latency_ms = models.PositiveIntegerField(null=True, blank=True)
     
     class Meta:
-        unique_together = ('user', 'challenge')
+        unique_together = [('user', 'challenge'), ('team', 'challenge'), ('node', 'host_port')]
+
+class ProbeLatency(models.Model):
+    """
+    Readiness probe kutish vaqtlari (challenge bo'yicha yig'indi, ctf/readiness.py).
+    ActiveContainer qatori o'chirilsa ham tarix saqlanib qoladi.
+    """
+    challenge = models.OneToOneField(Challenge, on_delete=models.CASCADE, primary_key=True, related_name='probe_latency')
+    count = models.PositiveIntegerField(default=0, verbose_name="Probe'lar soni")
+    failed = models.PositiveIntegerField(default=0, verbose_name="Javob bermaganlar")
+    total_ms = models.BigIntegerField(default=0, verbose_name="Jami kutish (ms)")
+    max_ms = models.PositiveIntegerField(default=0, verbose_name="Eng uzoq kutish (ms)")
+
+    class Meta:
+        verbose_name = "Probe kutish vaqti"
+        verbose_name_plural = "Probe kutish vaqtlari"
 
 class Team(models.Model):
     name = models.CharField(max_length=100, unique=True, verbose_name="Jamoa Nomi")
@@ -147,6 +290,57 @@ class TournamentRegistration(models.Model):
         verbose_name = "Turnir Ishtirokchisi"
         verbose_name_plural = "Turnir Ishtirokchilari"
 
+class ScoreEvent(models.Model):
+    """
+    Ballar jurnali (append-only): har bir yechim, bonus va bekor qilish bitta qator.
+    CTFProfile.total_points va TournamentRegistration.score shu jurnal yig'indisi
+    (ctf/ledger.py, rebuild_scores). Qatorlar o'zgartirilmaydi va o'chirilmaydi, shuning
+    uchun challenge/registration o'chsa ham tarix saqlanib qoladi (db_constraint=False).
+    """
+    SOLVE = 'solve'
+    FIRST_BLOOD = 'first_blood'
+    REVOKE = 'revoke'
+    ADJUST = 'adjust'
+    KIND_CHOICES = (
+        (SOLVE, 'Yechim'),
+        (FIRST_BLOOD, 'First Blood bonusi'),
+        (REVOKE, 'Bekor qilish'),
+        (ADJUST, "Qo'lda tuzatish"),
+    )
+
+    # user bo'sh - faqat registration hisobiga (masalan jamoa bali tuzatishi)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='score_events', verbose_name="Foydalanuvchi")
+    registration = models.ForeignKey(TournamentRegistration, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='score_events', verbose_name="Turnir Ishtirokchisi")
+    challenge = models.ForeignKey(Challenge, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='score_events', verbose_name="Masala")
+    kind = models.CharField(max_length=12, choices=KIND_CHOICES, verbose_name="Turi")
+    points = models.IntegerField(verbose_name="Ball")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Vaqt")
+
+    class Meta:
+        verbose_name = "Ball yozuvi"
+        verbose_name_plural = "Ballar jurnali"
+        indexes = [
+            models.Index(fields=['user', 'challenge'], name='ctf_score_user_chal_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.points:+d} ({self.user_id or self.registration_id})"
+
+class SharedCounter(models.Model):
+    """
+    Worker process'lar o'rtasida umumiy versiya hisoblagichlari (masalan, reyting
+    indeksi - ctf/ranking.py). LocMem kesh process ichida qoladi, shuning uchun bazada.
+    """
+    name = models.CharField(max_length=50, primary_key=True, verbose_name="Nomi")
+    value = models.BigIntegerField(default=0, verbose_name="Qiymat")
+
+    class Meta:
+        verbose_name = "Hisoblagich"
+        verbose_name_plural = "Hisoblagichlar"
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
+
 class TelegramAuth(models.Model):
     telegram_id = models.BigIntegerField(unique=True, verbose_name="Telegram ID")
     username = models.CharField(max_length=255, null=True, blank=True, verbose_name="Telegram Username")
@@ -156,35 +350,118 @@ class TelegramAuth(models.Model):
     def __str__(self):
         return f"{self.telegram_id} - {self.access_code}"
 
-# Signal to create CTFProfile when User is created
+# Signal to create CTFProfile when User is created.
+# Faqat created=True da: har bir User.save() (masalan login() dagi last_login)
+# profilni qayta saqlamasin. Eski foydalanuvchilar profili 0025 migratsiyasida yaratilgan.
 @receiver(post_save, sender=User)
-def create_ctf_profile(sender, instance, created, **kwargs):
-    if created:
+def create_ctf_profile(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
         CTFProfile.objects.create(user=instance)
 
-@receiver(post_save, sender=User)
-def save_ctf_profile(sender, instance, **kwargs):
-    # Ensure profile exists
-    if hasattr(instance, 'ctf_profile'):
-        instance.ctf_profile.save()
-    else:    
-        CTFProfile.objects.get_or_create(user=instance)
-
 @receiver(post_delete, sender=SolvedChallenge)
-def subtract_points_on_delete(sender, instance, **kwargs):
+def subtract_points_on_delete(sender, instance, origin=None, **kwargs):
     """
-    Agar yechilgan masala (SolvedChallenge) o'chirilsa, foydalanuvchi balidan ayirib tashlash.
+    Agar yechilgan masala (SolvedChallenge) o'chirilsa, berilgan ballar (bonus bilan)
+    jurnalda teskari yozuv bilan bekor qilinadi (ctf/ledger.py).
     """
-    try:
-        profile = instance.user.ctf_profile
-        profile.total_points -= instance.challenge.points
-        # Ball manfiy bo'lib qolmasligi uchun tekshirish ixtiyoriy, 
-        # lekin agarda hisob-kitob to'g'ri bo'lsa, manfiy bo'lmasligi kerak.
-        # Agar oldin xato bilan ko'p yozilgan bo'lsa, 0 ga tushirish mantiqan to'g'ri.
-        if profile.total_points < 0:
-            profile.total_points = 0
-            
-        profile.save()
-    except Exception:
-        # User o'chib ketgan bo'lsa yoki profil yo'q bo'lsa
-        pass
+    progress.invalidate(instance.user_id)
+    # Foydalanuvchining o'zi o'chirilayotgan bo'lsa - profili va jurnali ham o'chadi
+    if isinstance(origin, User) or getattr(origin, 'model', None) is User:
+        return
+    from . import ledger
+    ledger.revoke_solve(instance.user_id, instance.challenge_id)
+
+@receiver(post_delete, sender=SolvedChallenge)
+def update_solve_counters_on_delete(sender, instance, **kwargs):
+    challenges = Challenge.objects.filter(pk=instance.challenge_id)
+    challenges.filter(solve_count__gt=0).update(solve_count=F('solve_count') - 1)
+    # First blood egasining yechimi o'chirilsa - keyingi eng birinchi yechuvchiga o'tadi
+    # va bonus unga jurnal orqali beriladi (hisoblagichlar jurnal bilan mos qoladi)
+    next_solver = SolvedChallenge.objects.filter(challenge_id=OuterRef('pk')).order_by('solved_at', 'id').values('user_id')[:1]
+    if challenges.filter(first_blood_user_id=instance.user_id).update(first_blood_user=Subquery(next_solver)):
+        new_holder = challenges.values_list('first_blood_user_id', flat=True).first()
+        if new_holder is not None:
+            from . import ledger
+            ledger.award_first_blood(new_holder, instance.challenge_id)
+
+@receiver(post_delete, sender=ChallengeAttempt)
+def invalidate_progress_on_attempt_delete(sender, instance, **kwargs):
+    progress.invalidate(instance.user_id)
+
+# --- PORT LEASES ---
+
+@receiver(post_delete, sender=ActiveContainer)
+def release_port_on_delete(sender, instance, **kwargs):
+    # Qator o'chirilsa (stop, ghost tozalash, pool drain) port bo'sh ro'yxatga qaytadi
+    transaction.on_commit(lambda: ports.allocator_for(instance.node).release(instance.host_port))
+
+@receiver(post_delete, sender=ActiveContainer)
+def admit_queued_on_delete(sender, instance, **kwargs):
+    # Joy bo'shadi - navbatdagilarni kiritamiz
+    if instance.state != ActiveContainer.QUEUED:
+        transaction.on_commit(admission.admit)
+
+# --- TEAM LABS ---
+
+@receiver(m2m_changed, sender=Team.members.through)
+def leave_team_labs_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # Chiqqan/chetlashtirilgan a'zo jamoa laboratoriyalarini ushlab turmasin (ctf/team_labs.py)
+    if action == 'post_remove':
+        pairs = [(team_id, [instance.pk]) for team_id in pk_set] if reverse else [(instance.pk, list(pk_set))]
+    elif action == 'pre_clear':
+        if reverse:
+            pairs = [(team_id, [instance.pk]) for team_id in instance.teams.values_list('pk', flat=True)]
+        else:
+            pairs = [(instance.pk, list(instance.members.values_list('pk', flat=True)))]
+    else:
+        return
+
+    from . import jobs, team_labs
+    for team_id, user_ids in pairs:
+        for container in team_labs.drop_members(team_id, user_ids):
+            jobs.enqueue_stop(container)
+
+# --- RANK INDEX SYNC ---
+
+@receiver(post_save, sender=CTFProfile)
+def update_rank_index(sender, instance, **kwargs):
+    ranking.schedule_update(instance.user_id, instance.pk, instance.total_points, instance.last_solved)
+
+@receiver(post_delete, sender=CTFProfile)
+def remove_from_rank_index(sender, instance, **kwargs):
+    ranking.schedule_remove(instance.user_id)
+
+# --- VISIBILITY SCHEDULER (ctf/scheduler.py) ---
+
+@receiver(post_save, sender=Tournament)
+def sync_visibility_on_tournament_save(sender, instance, **kwargs):
+    # Sanalar o'zgargan bo'lishi mumkin - masalalar holati va keyingi o'tish vaqti qayta hisoblanadi
+    visibility = Challenge.PUBLIC if instance.phase == Tournament.FINISHED else Challenge.TOURNAMENT
+    instance.challenges.exclude(visibility=visibility).update(visibility=visibility)
+    scheduler.schedule_changed()
+
+@receiver(post_delete, sender=Tournament)
+def sync_visibility_on_tournament_delete(sender, instance, **kwargs):
+    # on_delete=SET_NULL signalsiz UPDATE qiladi - turnirsiz qolgan masalalar umumiy ro'yxatga
+    Challenge.objects.filter(tournament__isnull=True).exclude(visibility=Challenge.PUBLIC).update(visibility=Challenge.PUBLIC)
+    scheduler.schedule_changed()
+
+@receiver(post_save, sender=Challenge)
+@receiver(post_delete, sender=Challenge)
+def bump_listing_on_challenge_change(sender, instance, **kwargs):
+    scheduler.bump_listing()
+
+# --- SEARCH INDEX SYNC ---
+
+SEARCH_FIELDS = {'title', 'description', 'category'}
+
+@receiver(post_save, sender=Challenge)
+def index_challenge_on_save(sender, instance, update_fields=None, **kwargs):
+    # Faqat indekslanadigan maydonlar o'zgargan bo'lsa qayta yozamiz
+    if update_fields is not None and not SEARCH_FIELDS.intersection(update_fields):
+        return
+    search.index_challenge(instance)
+
+@receiver(post_delete, sender=Challenge)
+def remove_challenge_from_index(sender, instance, **kwargs):
+    search.remove_challenge(instance.pk)
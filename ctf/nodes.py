@@ -0,0 +1,152 @@
+"""
+Docker node'lar ro'yxati va konteynerlarni joylashtirish (scheduler).
+
+Node'lar settings.CTF_DOCKER_NODES da beriladi:
+
+    CTF_DOCKER_NODES = {
+        'local': {},                                   # docker.from_env()
+        'lab-2': {
+            'base_url': 'tcp://10.0.0.12:2376',
+            'public_host': 'lab2.wan-net.uz',          # foydalanuvchi ulanadigan manzil
+            'probe_host': '10.0.0.12',                 # readiness probe manzili (standart: public_host)
+            'memory_mb': 8192, 'cpus': 8,              # yoki to'g'ridan-to'g'ri 'capacity': 40
+        },
+        'fake': {'backend': 'ctf.docker_utils.FakeDockerBackend'},
+    }
+
+Har bir ActiveContainer qatori qaysi node da ishlayotganini (node) saqlaydi,
+stop/status chaqiruvlari shu node ning client'iga yuboriladi.
+"""
+import re
+import threading
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils.module_loading import import_string
+
+from . import docker_utils
+
+DEFAULT_NODE = 'local'
+
+_UNITS = {'k': 1 / 1024, 'm': 1, 'g': 1024}
+
+
+def lab_memory_mb():
+    match = re.fullmatch(r'(\d+)([kmg]?)b?', docker_utils.LAB_MEM_LIMIT.lower())
+    return int(match.group(1)) * _UNITS.get(match.group(2) or 'm', 1)
+
+
+def lab_cpus():
+    # cpu_quota 100000 mikrosoniyalik standart period ga nisbatan
+    return docker_utils.LAB_CPU_QUOTA / 100000
+
+
+class Node:
+    def __init__(self, name, config):
+        self.name = name
+        self.config = config
+        self.public_host = config.get('public_host', '127.0.0.1')
+        # Readiness probe shu manzilga ulanadi (web server dan ko'rinadigan ichki manzil bo'lishi mumkin)
+        self.probe_host = config.get('probe_host', self.public_host)
+        self.enabled = config.get('enabled', True)
+        self._backend = None
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self):
+        """Node bir vaqtda ko'tara oladigan laboratoriyalar soni (LAB_MEM_LIMIT/LAB_CPU_QUOTA dan)."""
+        if self.config.get('capacity') is not None:
+            return self.config['capacity']
+        memory = self.config.get('memory_mb', getattr(settings, 'CTF_HOST_MEMORY_MB', 4096))
+        memory *= getattr(settings, 'CTF_HOST_MEMORY_FRACTION', 0.8)
+        # CPU quota - yuqori chegara, band qilingan resurs emas: ma'lum darajada overcommit qilamiz
+        cpus = self.config.get('cpus', getattr(settings, 'CTF_HOST_CPUS', 4))
+        cpus *= getattr(settings, 'CTF_CPU_OVERCOMMIT', 4)
+        return int(min(memory // lab_memory_mb(), cpus // lab_cpus()))
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = self._make_backend()
+        return self._backend
+
+    def _make_backend(self):
+        path = self.config.get('backend') or getattr(settings, 'CTF_DOCKER_BACKEND', None)
+        if path:
+            return import_string(path)()
+        # Client birinchi Docker so'rovida yaratiladi (base_url bo'lmasa - docker.from_env())
+        return docker_utils.DockerBackend(base_url=self.config.get('base_url'))
+
+    def __repr__(self):
+        return f"<Node {self.name}>"
+
+
+class NodeRegistry:
+    def __init__(self):
+        self._nodes = None
+
+    def configure(self, nodes=None):
+        """Node'larni (qayta) o'qiydi. Testlar fake node'lar bilan chaqiradi; None - settings dan."""
+        if nodes is None:
+            nodes = getattr(settings, 'CTF_DOCKER_NODES', None) or {DEFAULT_NODE: {}}
+        self._nodes = {name: Node(name, config) for name, config in nodes.items()}
+
+    def all(self):
+        if self._nodes is None:
+            self.configure()
+        return list(self._nodes.values())
+
+    def get(self, name):
+        if self._nodes is None:
+            self.configure()
+        try:
+            return self._nodes[name or DEFAULT_NODE]
+        except KeyError:
+            raise ValueError(f"Unknown docker node: {name}")
+
+    def total_capacity(self):
+        return sum(node.capacity for node in self.all() if node.enabled)
+
+    def public_url(self, container):
+        return f"http://{self.get(container.node).public_host}:{container.host_port}"
+
+
+registry = NodeRegistry()
+
+
+def node_load():
+    """{node: band konteynerlar soni} - navbatdagi va ishga tushayotganlar ham kiradi."""
+    from .models import ActiveContainer
+
+    rows = (
+        ActiveContainer.objects
+        .exclude(state=ActiveContainer.FAILED)
+        .values('node')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    return {row['node']: row['n'] for row in rows}
+
+
+def choose_node(strategy=None):
+    """
+    Yangi konteyner uchun node tanlaydi.
+      least_loaded - eng bo'sh node (yuk tekis taqsimlanadi)
+      binpack      - joyi bor eng to'la node (bo'sh node'larni o'chirish mumkin bo'ladi)
+    """
+    strategy = strategy or getattr(settings, 'CTF_NODE_STRATEGY', 'least_loaded')
+    load = node_load()
+    nodes = [node for node in registry.all() if node.enabled]
+    if len(nodes) == 1:
+        return nodes[0].name
+
+    def utilisation(node):
+        return load.get(node.name, 0) / max(node.capacity, 1)
+
+    with_room = [node for node in nodes if load.get(node.name, 0) < node.capacity]
+    if strategy == 'binpack' and with_room:
+        return max(with_room, key=lambda node: (utilisation(node), node.name)).name
+    # Hamma node to'la bo'lsa ham eng kam yuklanganini qaytaramiz - admission navbati kutadi
+    return min(with_room or nodes, key=lambda node: (utilisation(node), node.name)).name
@@ -0,0 +1,195 @@
+"""
+Keyset (seek) pagination.
+
+Django Paginator OFFSET + COUNT(*) ishlatadi: chuqur sahifalar sekinlashadi va
+har bir so'rov qo'shimcha COUNT to'laydi. Bu yerda sahifa oxirgi qatorning
+saralash kalitidan keyin "qidiriladi" (WHERE key > cursor LIMIT n), shuning
+uchun har qanday sahifa indeks bo'yicha bir xil tezlikda ochiladi.
+
+Cursor - shaffof bo'lmagan (opaque) base64 satr. Unda:
+    v - chegaradagi qatorning kalit qiymatlari
+    r - shu qatorning o'rni (rank), oldingi qatorlarni sanamaslik uchun
+    d - yo'nalish: 'n' (keyingi) yoki 'p' (oldingi)
+    o - offset (faqat kalitsiz saralash uchun, masalan qidiruv relevantligi)
+"""
+import base64
+import datetime
+import json
+import math
+
+from django.db.models import Q
+
+
+def _json_default(value):
+    # DjangoJSONEncoder mikrosekundlarni kesadi - kalit tengligi uchun to'liq ISO kerak
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_cursor(data):
+    raw = json.dumps(data, default=_json_default, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Noto'g'ri yoki buzilgan cursor - birinchi sahifa (None)."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+class KeysetPage:
+    """Template uchun Paginator Page ga o'xshash interfeys."""
+
+    def __init__(self, object_list, per_page, start_rank, has_next, has_previous, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.start_rank = start_rank
+        self.has_next_page = has_next
+        self.has_previous_page = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    def has_other_pages(self):
+        return self.has_next_page or self.has_previous_page
+
+    @property
+    def end_rank(self):
+        return self.start_rank + len(self.object_list) - 1
+
+    @property
+    def number(self):
+        # Sahifalar har doim to'liq bo'lgani uchun raqamni rankdan hisoblash mumkin
+        return math.ceil(self.start_rank / self.per_page) if self.start_rank > 0 else 1
+
+
+class KeysetPaginator:
+    """
+    ordering: ('-total_points', 'last_solved', 'id') kabi maydonlar ro'yxati.
+    Oxirgi maydon unikal bo'lishi shart (odatda 'id'), aks holda qatorlar
+    sahifalar orasida tushib qolishi mumkin.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = per_page
+        self.fields = []
+        for name in ordering:
+            descending = name.startswith('-')
+            self.fields.append((name.lstrip('-'), descending))
+
+    def _values(self, obj):
+        return [getattr(obj, name) for name, _ in self.fields]
+
+    def _parse_values(self, raw_values):
+        model = self.queryset.model
+        values = []
+        for (name, _), raw in zip(self.fields, raw_values):
+            field = model._meta.get_field(name)
+            values.append(field.to_python(raw))
+        return values
+
+    def _seek(self, values, forward):
+        """
+        (a, b, c) > (va, vb, vc) shartini aralash yo'nalishlar uchun yoyadi:
+        a > va OR (a = va AND b > vb) OR (a = va AND b = vb AND c > vc)
+        """
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.fields, values):
+            # oldinga yurishda: desc -> lt, asc -> gt; orqaga - aksincha
+            lookup = f'{name}__lt' if descending == forward else f'{name}__gt'
+            condition |= equal & Q(**{lookup: value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _reversed_ordering(self):
+        return [name if descending else f'-{name}' for name, descending in self.fields]
+
+    def get_page(self, cursor):
+        data = decode_cursor(cursor)
+        per_page = self.per_page
+
+        if data and 'v' in data and len(data['v']) == len(self.fields):
+            try:
+                values = self._parse_values(data['v'])
+                rank = int(data.get('r', 0))
+            except Exception:
+                data = None
+        else:
+            data = None
+
+        if data is None:
+            rows = list(self.queryset[:per_page + 1])
+            has_next = len(rows) > per_page
+            rows = rows[:per_page]
+            return self._page(rows, 1, has_next, False)
+
+        if data.get('d') == 'p':
+            qs = self.queryset.filter(self._seek(values, forward=False)).order_by(*self._reversed_ordering())
+            rows = list(qs[:per_page + 1])
+            has_previous = len(rows) > per_page
+            rows = rows[:per_page]
+            rows.reverse()
+            return self._page(rows, max(rank - len(rows), 1), True, has_previous)
+
+        rows = list(self.queryset.filter(self._seek(values, forward=True))[:per_page + 1])
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        return self._page(rows, rank + 1, has_next, True)
+
+    def _page(self, rows, start_rank, has_next, has_previous):
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor({'v': self._values(rows[-1]), 'r': start_rank + len(rows) - 1, 'd': 'n'})
+        if rows and has_previous:
+            previous_cursor = encode_cursor({'v': self._values(rows[0]), 'r': start_rank, 'd': 'p'})
+        return KeysetPage(rows, self.per_page, start_rank, has_next, has_previous, next_cursor, previous_cursor)
+
+
+class OffsetCursorPaginator:
+    """
+    Barqaror kalit bo'lmagan saralash uchun (masalan, bm25 qidiruv relevantligi).
+    Interfeys KeysetPaginator bilan bir xil, lekin cursor ichida offset saqlanadi.
+    Qidiruv natijalari odatda kichik bo'lgani uchun OFFSET bu yerda arzon.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def get_page(self, cursor):
+        data = decode_cursor(cursor) or {}
+        try:
+            offset = max(int(data.get('o', 0)), 0)
+        except (TypeError, ValueError):
+            offset = 0
+
+        rows = list(self.queryset[offset:offset + self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        next_cursor = encode_cursor({'o': offset + self.per_page}) if has_next else None
+        previous_cursor = encode_cursor({'o': max(offset - self.per_page, 0)}) if offset > 0 else None
+        return KeysetPage(rows, self.per_page, offset + 1, has_next, offset > 0, next_cursor, previous_cursor)
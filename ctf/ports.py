@@ -0,0 +1,118 @@
+"""
+Laboratoriyalar uchun host port ajratish.
+
+Avval tasodifiy port tanlanib socket bilan tekshirilardi: parallel so'rovlar
+bir xil portni olishi mumkin edi. Endi:
+  * har bir process bo'sh portlar ro'yxatini (free-list, deque) saqlaydi - O(1);
+  * haqiqiy "ijara" (lease) - ActiveContainer qatori, (node, host_port) esa UNIQUE.
+    Ikki process bir xil portni tanlasa, ikkinchisi IntegrityError oladi va
+    keyingi portni sinaydi;
+  * qator o'chirilganda (stop, reaper, ghost tozalash) port ro'yxatga qaytadi.
+
+Har bir Docker node o'z port oralig'iga ega (allocator_for(node)); lease()
+avval ctf.nodes scheduler orqali node tanlaydi.
+"""
+import logging
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .nodes import DEFAULT_NODE, choose_node
+
+logger = logging.getLogger(__name__)
+
+LEASE_ATTEMPTS = 20
+
+
+class PortAllocator:
+    def __init__(self, start=None, end=None, node=DEFAULT_NODE):
+        self.node = node
+        port_range = getattr(settings, 'CTF_LAB_PORT_RANGE', (20000, 30000))
+        self.start = start if start is not None else port_range[0]
+        self.end = end if end is not None else port_range[1]
+        self._lock = threading.Lock()
+        self._free = deque()
+        self._free_set = set()
+        self._loaded = False
+
+    def reload(self):
+        """Bo'sh portlar ro'yxatini bazadan qayta quradi."""
+        with self._lock:
+            self._reload()
+
+    def _reload(self):
+        from .models import ActiveContainer
+
+        used = set(ActiveContainer.objects.filter(node=self.node).values_list('host_port', flat=True))
+        self._free = deque(p for p in range(self.start, self.end + 1) if p not in used)
+        self._free_set = set(self._free)
+        self._loaded = True
+
+    def allocate(self):
+        """Bo'sh port nomzodi (hali band qilinmagan). Port qolmagan bo'lsa None."""
+        with self._lock:
+            if not self._loaded or not self._free:
+                # Boshqa process'lar bo'shatgan portlarni ham ko'rish uchun bazadan qayta o'qiymiz
+                self._reload()
+            if not self._free:
+                return None
+            port = self._free.popleft()
+            self._free_set.discard(port)
+            return port
+
+    def release(self, port):
+        with self._lock:
+            if self.start <= port <= self.end and port not in self._free_set:
+                self._free.append(port)
+                self._free_set.add(port)
+
+    def free_count(self):
+        with self._lock:
+            return len(self._free)
+
+    def lease(self, **fields):
+        """
+        Unikal port bilan ActiveContainer qatorini yaratadi (port ijarasi).
+        Bo'sh port topilmasa None qaytaradi.
+        """
+        from .models import ActiveContainer
+
+        for _ in range(LEASE_ATTEMPTS):
+            port = self.allocate()
+            if port is None:
+                return None
+            try:
+                with transaction.atomic():
+                    return ActiveContainer.objects.create(node=self.node, host_port=port, **fields)
+            except IntegrityError:
+                if not ActiveContainer.objects.filter(node=self.node, host_port=port).exists():
+                    # Port emas, boshqa cheklov (masalan user+challenge) buzilgan - port bo'sh qoladi
+                    self.release(port)
+                    raise
+                logger.info(f"Port {port} was taken by another worker, retrying")
+            except Exception:
+                self.release(port)
+                raise
+        return None
+
+
+_allocators = {}
+_allocators_lock = threading.Lock()
+
+
+def allocator_for(node):
+    with _allocators_lock:
+        if node not in _allocators:
+            _allocators[node] = PortAllocator(node=node)
+        return _allocators[node]
+
+
+def lease(**fields):
+    """Scheduler tanlagan node da port ijarasi (qarang: PortAllocator.lease)."""
+    return allocator_for(choose_node()).lease(**fields)
+
+
+# Asosiy (yagona node) allocator
+allocator = allocator_for(DEFAULT_NODE)
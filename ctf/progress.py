@@ -0,0 +1,149 @@
+"""
+Foydalanuvchi progressi keshi (challenges sahifasi uchun).
+
+Har bir foydalanuvchi uchun ikkita bitset saqlanadi: yechilgan va urinish
+qilingan masalalar (bit raqami = challenge.id). Python int ixtiyoriy uzunlikdagi
+bitset bo'lib xizmat qiladi, 100k masala ham ~12KB ga sig'adi.
+
+Kesh miss bo'lganda bazadan ikkita so'rov bilan quriladi. Urinish/yechim
+bitsetni qayta qurmaydi va uni o'qib-yozmaydi (get -> bit qo'shish -> set
+parallel so'rovlarda bitlarni yo'qotardi). Buning o'rniga hodisa alohida
+kalitga yoziladi: raqami foydalanuvchi hisoblagichidan (cache.incr - atomar)
+olinadi. Bitset qaysi raqamgacha bo'lgan hodisalarni o'z ichiga olganini
+saqlaydi; load() yangi hodisalarni bitta get_many bilan qo'shadi va natijani
+qayta yozadi. Hodisa yoki hisoblagich keshdan tushib qolgan bo'lsa - bazadan
+qayta quriladi. Yechim yoki urinish o'chirilganda (signal) kesh o'chiriladi.
+
+Bir nechta worker process bo'lsa umumiy kesh (Redis/Memcached) shart: LocMem
+har process uchun alohida, u holda boshqa worker hodisalarni ko'rmaydi va
+eski holatni CTF_PROGRESS_TTL gacha ko'rsatadi.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from . import attempt_log
+
+
+def cache_timeout():
+    return getattr(settings, 'CTF_PROGRESS_TTL', 60)
+
+
+def _key(user_id):
+    return f'ctf:progress:{user_id}'
+
+
+def _seq_key(user_id):
+    return f'ctf:progress:{user_id}:seq'
+
+
+def _event_key(user_id, seq):
+    return f'ctf:progress:{user_id}:e:{seq}'
+
+
+def _iter_bits(bits):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class UserProgress:
+    __slots__ = ('solved', 'attempted')
+
+    def __init__(self, solved=0, attempted=0):
+        self.solved = solved
+        self.attempted = attempted
+
+    def is_solved(self, challenge_id):
+        return bool(self.solved >> challenge_id & 1)
+
+    def has_failed(self, challenge_id):
+        """Urinish bor, lekin yechilmagan."""
+        return bool((self.attempted & ~self.solved) >> challenge_id & 1)
+
+    def solved_ids(self):
+        return list(_iter_bits(self.solved))
+
+    def failed_ids(self):
+        return list(_iter_bits(self.attempted & ~self.solved))
+
+
+def _build(user_id):
+    from .models import SolvedChallenge, ChallengeAttempt
+
+    solved = 0
+    for challenge_id in SolvedChallenge.objects.filter(user_id=user_id).values_list('challenge_id', flat=True):
+        solved |= 1 << challenge_id
+
+    attempted = 0
+    for challenge_id in ChallengeAttempt.objects.filter(user_id=user_id).values_list('challenge_id', flat=True).distinct():
+        attempted |= 1 << challenge_id
+    # Bazaga hali yozilmagan urinishlar (attempt_log buferi)
+    for challenge_id in attempt_log.writer.pending_challenge_ids(user_id):
+        attempted |= 1 << challenge_id
+
+    return UserProgress(solved, attempted)
+
+
+def _current_seq(user_id):
+    seq = cache.get(_seq_key(user_id))
+    if seq is None:
+        cache.add(_seq_key(user_id), 0, None)
+        seq = cache.get(_seq_key(user_id), 0)
+    return seq
+
+
+def _replay(user_id, solved, attempted, covered, seq):
+    """covered+1..seq hodisalarini bitsetga qo'shadi. Biror hodisa yo'qolgan bo'lsa None."""
+    keys = [_event_key(user_id, n) for n in range(covered + 1, seq + 1)]
+    events = cache.get_many(keys)
+    if len(events) != len(keys):
+        return None
+    for challenge_id, is_solve in events.values():
+        attempted |= 1 << challenge_id
+        if is_solve:
+            solved |= 1 << challenge_id
+    return solved, attempted
+
+
+def load(user_id):
+    """Keshdan o'qiydi (yangi hodisalar qo'shiladi), bo'lmasa bazadan quradi va keshga yozadi."""
+    seq = _current_seq(user_id)
+    cached = cache.get(_key(user_id))
+    if cached is not None:
+        solved, attempted, covered = cached
+        if covered == seq:
+            return UserProgress(solved, attempted)
+        if covered < seq:
+            merged = _replay(user_id, solved, attempted, covered, seq)
+            if merged is not None:
+                cache.set(_key(user_id), (*merged, seq), cache_timeout())
+                return UserProgress(*merged)
+
+    # seq bazani o'qishdan oldin olingan: keyingi hodisalar keyingi load() da qo'shiladi
+    progress = _build(user_id)
+    cache.set(_key(user_id), (progress.solved, progress.attempted, seq), cache_timeout())
+    return progress
+
+
+def invalidate(user_id):
+    cache.delete(_key(user_id))
+
+
+def _record(user_id, challenge_id, is_solve):
+    try:
+        seq = cache.incr(_seq_key(user_id))
+    except ValueError:
+        # Hisoblagich yo'q - eski bitset qaysi hodisalarni o'z ichiga olgani noma'lum
+        invalidate(user_id)
+        cache.add(_seq_key(user_id), 0, None)
+        return
+    cache.set(_event_key(user_id, seq), (challenge_id, is_solve), cache_timeout())
+
+
+def record_attempt(user_id, challenge_id):
+    _record(user_id, challenge_id, False)
+
+
+def record_solve(user_id, challenge_id):
+    _record(user_id, challenge_id, True)
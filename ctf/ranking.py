@@ -0,0 +1,221 @@
+"""
+Global reyting indeksi (leaderboard, profil sahifasidagi o'rin, podium).
+
+Har bir process xotirasida CTFProfile kalitlarining saralangan massivi
+saqlanadi: (-total_points, last_solved, profile_id). Leaderboard bilan bir xil
+tartib, shuning uchun rank_of() teng ballarni ham last_solved bo'yicha ajratadi.
+O'rin bisect bilan O(log n) da topiladi, sahifa esa oddiy slice.
+
+Bir nechta worker process o'rtasidagi moslik bazadagi versiya hisoblagichi
+(SharedCounter 'rank') orqali ta'minlanadi: ball o'zgartirgan tranzaksiya
+ichida versiya F() + 1 bilan oshiriladi (bump_version), shuning uchun ball va
+versiya birga commit bo'ladi. Har bir o'qish versiyani PK bo'yicha o'qiydi va
+o'zinikidan farq qilsa indeksni bazadan qayta quradi.
+"""
+import bisect
+import logging
+import threading
+import time
+
+from django.db import transaction
+from django.db.models import F
+
+from .pagination import KeysetPage, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+VERSION_COUNTER = 'rank'
+
+# Signalni chetlab o'tgan yangilanishlar (queryset.update) uchun xavfsizlik tarmog'i
+REBUILD_INTERVAL = 5 * 60
+
+
+def make_key(total_points, last_solved, profile_id):
+    return (-total_points, last_solved, profile_id)
+
+
+class RankIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys = []
+        self._by_user = {}
+        self._version = None
+        self._built_at = 0
+
+    # --- versiya ---
+
+    def _ensure_fresh(self):
+        version = shared_version()
+        if version != self._version or time.monotonic() - self._built_at > REBUILD_INTERVAL:
+            self.rebuild(version)
+
+    def rebuild(self, version=None):
+        from .models import CTFProfile
+
+        with self._lock:
+            if version is None:
+                # Avval versiya, keyin qatorlar: oraliqda commit bo'lgan o'zgarish keyingi o'qishda ko'rinadi
+                version = shared_version()
+            rows = CTFProfile.objects.values_list('id', 'user_id', 'total_points', 'last_solved')
+            by_user = {}
+            for profile_id, user_id, points, last_solved in rows:
+                by_user[user_id] = make_key(points, last_solved, profile_id)
+            self._keys = sorted(by_user.values())
+            self._by_user = by_user
+            self._version = version
+            self._built_at = time.monotonic()
+            logger.debug(f"Rank index rebuilt: {len(self._keys)} profiles")
+
+    def invalidate(self):
+        """Barcha process'lar keyingi o'qishda qayta quradi (o'zgarish tranzaksiyasi ichida chaqiriladi)."""
+        with self._lock:
+            self._version = None
+        bump_version()
+
+    # --- yozish ---
+
+    def _after_local_change(self, version):
+        # version - shu o'zgarish tranzaksiyasida bump_version() qaytargan qiymat
+        if version is not None and self._version is not None and version == self._version + 1:
+            self._version = version
+        else:
+            # Boshqa process ham o'zgartirgan - keyingi o'qishda qayta quramiz
+            self._version = None
+
+    def update(self, user_id, profile_id, total_points, last_solved, version=None):
+        key = make_key(total_points, last_solved, profile_id)
+        with self._lock:
+            old = self._by_user.get(user_id)
+            if old == key:
+                return
+            if old is not None:
+                i = bisect.bisect_left(self._keys, old)
+                if i < len(self._keys) and self._keys[i] == old:
+                    del self._keys[i]
+            bisect.insort(self._keys, key)
+            self._by_user[user_id] = key
+            self._after_local_change(version)
+
+    def remove(self, user_id, version=None):
+        with self._lock:
+            old = self._by_user.pop(user_id, None)
+            if old is None:
+                return
+            i = bisect.bisect_left(self._keys, old)
+            if i < len(self._keys) and self._keys[i] == old:
+                del self._keys[i]
+            self._after_local_change(version)
+
+    # --- o'qish ---
+
+    def rank_of(self, user):
+        """1 dan boshlanadigan o'rin yoki profil bo'lmasa None."""
+        with self._lock:
+            self._ensure_fresh()
+            key = self._by_user.get(getattr(user, 'id', user))
+            if key is None:
+                return None
+            return bisect.bisect_left(self._keys, key) + 1
+
+    def page(self, offset, size):
+        """[offset, offset+size) oralig'idagi CTFProfile id lari (rank = offset + i + 1)."""
+        with self._lock:
+            self._ensure_fresh()
+            return [key[2] for key in self._keys[offset:offset + size]]
+
+    def top(self, n):
+        return self.page(0, n)
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_fresh()
+            return len(self._keys)
+
+    def position(self, key, after=True):
+        """Cursor kaliti uchun massivdagi joy (kalit o'chib ketgan bo'lsa ham ishlaydi)."""
+        with self._lock:
+            self._ensure_fresh()
+            if after:
+                return bisect.bisect_right(self._keys, key)
+            return bisect.bisect_left(self._keys, key)
+
+
+def shared_version():
+    from .models import SharedCounter
+    return SharedCounter.objects.filter(name=VERSION_COUNTER).values_list('value', flat=True).first() or 0
+
+
+def bump_version():
+    """Versiyani F() + 1 bilan oshiradi (chaqiruvchining tranzaksiyasida). Yangi qiymatni qaytaradi."""
+    from .models import SharedCounter
+
+    counters = SharedCounter.objects.filter(name=VERSION_COUNTER)
+    if not counters.update(value=F('value') + 1):
+        SharedCounter.objects.get_or_create(name=VERSION_COUNTER)
+        counters.update(value=F('value') + 1)
+    return counters.values_list('value', flat=True).first()
+
+
+index = RankIndex()
+
+
+def rank_of(user):
+    return index.rank_of(user)
+
+
+def top(n):
+    return index.top(n)
+
+
+def page(offset, size):
+    return index.page(offset, size)
+
+
+def schedule_update(user_id, profile_id, total_points, last_solved):
+    """Versiyani hozir (tranzaksiya ichida) oshiradi, lokal indeksni commit dan keyin yangilaydi."""
+    version = bump_version()
+    transaction.on_commit(lambda: index.update(user_id, profile_id, total_points, last_solved, version=version))
+
+
+def schedule_remove(user_id):
+    version = bump_version()
+    transaction.on_commit(lambda: index.remove(user_id, version=version))
+
+
+def leaderboard_page(cursor, per_page):
+    """
+    Leaderboard sahifasi (KeysetPage, CTFProfile obyektlari bilan).
+    Cursor formati pagination.KeysetPaginator bilan bir xil: (total_points, last_solved, id).
+    """
+    from .models import CTFProfile
+
+    offset = 0
+    data = decode_cursor(cursor)
+    if data and isinstance(data.get('v'), list) and len(data['v']) == 3:
+        try:
+            field = CTFProfile._meta.get_field('last_solved')
+            points, last_solved, profile_id = data['v']
+            key = make_key(int(points), field.to_python(last_solved), int(profile_id))
+            if data.get('d') == 'p':
+                offset = max(index.position(key, after=False) - per_page, 0)
+            else:
+                offset = index.position(key, after=True)
+        except (TypeError, ValueError):
+            offset = 0
+
+    ids = index.page(offset, per_page + 1)
+    has_next = len(ids) > per_page
+    ids = ids[:per_page]
+
+    profiles = CTFProfile.objects.select_related('user').in_bulk(ids)
+    rows = [profiles[pk] for pk in ids if pk in profiles]
+
+    next_cursor = previous_cursor = None
+    if rows and has_next:
+        last = rows[-1]
+        next_cursor = encode_cursor({'v': [last.total_points, last.last_solved, last.pk], 'r': offset + len(rows), 'd': 'n'})
+    if rows and offset > 0:
+        first = rows[0]
+        previous_cursor = encode_cursor({'v': [first.total_points, first.last_solved, first.pk], 'r': offset + 1, 'd': 'p'})
+
+    return KeysetPage(rows, per_page, offset + 1, has_next, offset > 0, next_cursor, previous_cursor)
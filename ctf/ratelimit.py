@@ -0,0 +1,148 @@
+"""
+Cache asosidagi rate limiter (sliding window counter).
+
+Har bir kalit uchun joriy va oldingi oyna hisoblagichlari cache da saqlanadi
+(cache.incr - Redis/Memcached da atomar). Baho: oldingi oyna qiymatining
+o'tgan qismi + joriy oyna, ya'ni oyna chegarasida "ikki baravar" portlash bo'lmaydi.
+Bazaga murojaat yo'q.
+
+    FLAG_SUBMIT = RateLimit('flag', 5, 60, key=lambda request, challenge_id, **kw: f"{request.user.pk}:{challenge_id}")
+
+    @ratelimit(FLAG_SUBMIT)
+    def view(request, challenge_id): ...
+
+Limit oshganda 429 va Retry-After (soniya) qaytariladi. Chegaralarni
+settings.CTF_RATELIMITS = {'flag': (5, 60)} bilan o'zgartirish mumkin.
+
+Faqat muvaffaqiyatsiz so'rovlarni sanash uchun (masalan, noto'g'ri flaglar)
+so'rov baribir oldindan atomar hisoblanadi (parallel so'rovlar limitdan
+o'tib keta olmaydi), muvaffaqiyatli bo'lsa view hisobni qaytaradi:
+
+    @ratelimit(FLAG_SUBMIT)
+    def view(request, challenge_id):
+        ...
+        if is_correct:
+            undo_request(request)
+"""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+CACHE_PREFIX = 'ctf:rl:'
+
+
+def user_key(request, *args, **kwargs):
+    return str(request.user.pk) if request.user.is_authenticated else request.META.get('REMOTE_ADDR', '')
+
+
+class RateLimit:
+    def __init__(self, name, limit, window, key=user_key):
+        self.name = name
+        self._limit = limit
+        self._window = window
+        self.key = key
+
+    @property
+    def limit(self):
+        return getattr(settings, 'CTF_RATELIMITS', {}).get(self.name, (self._limit, self._window))[0]
+
+    @property
+    def window(self):
+        return getattr(settings, 'CTF_RATELIMITS', {}).get(self.name, (self._limit, self._window))[1]
+
+    def _cache_key(self, ident, index):
+        return f"{CACHE_PREFIX}{self.name}:{ident}:{index}"
+
+    def hit(self, ident, now=None):
+        """
+        Bitta so'rovni hisobga oladi. (ruxsat, retry_after_soniya) qaytaradi;
+        rad etilgan so'rov hisoblagichda qolmaydi.
+        """
+        now = time.time() if now is None else now
+        limit, window = self.limit, self.window
+        index, offset = divmod(now, window)
+        key = self._cache_key(ident, int(index))
+
+        cache.add(key, 0, window * 2)
+        try:
+            current = cache.incr(key)
+        except ValueError:
+            # add va incr orasida kalit muddati tugadi
+            cache.set(key, 1, window * 2)
+            current = 1
+        previous = cache.get(self._cache_key(ident, int(index) - 1), 0)
+
+        weight = 1 - offset / window
+        if previous * weight + current <= limit:
+            return True, 0
+
+        self.undo(ident, now)
+        return False, self._retry_after(previous, current - 1, offset, limit, window)
+
+    def undo(self, ident, now=None):
+        """hit() ni bekor qiladi (masalan, keyingi limit rad etganda)."""
+        now = time.time() if now is None else now
+        try:
+            cache.decr(self._cache_key(ident, int(now // self.window)))
+        except ValueError:
+            pass
+
+    @staticmethod
+    def _retry_after(previous, current, offset, limit, window):
+        """Yana bitta so'rov sig'adigan paytgacha soniyalar."""
+        if current + 1 <= limit and previous:
+            # Joriy oynada: oldingi oyna ulushi kamayishini kutamiz
+            needed = 1 - (limit - current - 1) / previous
+            return max(1, math.ceil(needed * window - offset))
+        # Keyingi oynada joriy hisob "oldingi" bo'ladi
+        wait = window - offset
+        if current:
+            wait += max(0.0, 1 - (limit - 1) / current) * window
+        return max(1, math.ceil(wait))
+
+
+def too_many_requests(retry_after):
+    response = HttpResponse(
+        f"Juda ko'p urinishlar! Iltimos, {retry_after} soniyadan keyin qayta urinib ko'ring.",
+        status=429,
+        content_type='text/plain; charset=utf-8',
+    )
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def undo_request(request):
+    """Dekorator shu so'rov uchun qilgan hisoblarni qaytaradi (masalan, to'g'ri flag)."""
+    for limit, ident, now in getattr(request, '_ratelimit_hits', ()):
+        limit.undo(ident, now)
+    request._ratelimit_hits = []
+
+
+def ratelimit(*limits, methods=('POST',)):
+    """
+    View dekoratori. Limitlar ketma-ket tekshiriladi; biri rad etsa, oldingilari
+    hisobdan qaytariladi va 429 javob beriladi. methods=None - barcha so'rovlar.
+    Hisoblar request da saqlanadi - view ularni undo_request() bilan qaytarishi mumkin.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                now = time.time()
+                passed = []
+                for limit in limits:
+                    ident = limit.key(request, *args, **kwargs)
+                    allowed, retry_after = limit.hit(ident, now)
+                    if not allowed:
+                        for done, done_ident, _ in passed:
+                            done.undo(done_ident, now)
+                        return too_many_requests(retry_after)
+                    passed.append((limit, ident, now))
+                request._ratelimit_hits = passed
+            return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
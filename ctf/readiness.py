@@ -0,0 +1,101 @@
+"""
+Laboratoriya tayyorligini tekshirish (readiness probe).
+
+containers.run qaytgan paytda konteyner ichidagi ilova (masalan Flask) hali
+portni tinglamayotgan bo'lishi mumkin. Start job konteynerni ishga tushirgach
+host_port ni exponential backoff bilan tekshiradi va faqat javob kelganda
+qatorni running ga o'tkazadi. Kutish vaqti (probe_latency_ms) qatorga
+yoziladi, har bir probe esa ProbeLatency yig'indisiga qo'shiladi (record()) -
+qator o'chirilgandan keyin ham sig'imni rejalashtirish uchun (lab_pool_metrics).
+
+HTTP probe: docker-proxy portni darhol qabul qiladi, shuning uchun oddiy TCP
+ulanish ilova tayyorligini bildirmaydi - HTTP javob satrini kutamiz.
+"""
+import socket
+import time
+
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+INITIAL_DELAY = 0.1
+MAX_DELAY = 2.0
+
+
+def ready_timeout():
+    return getattr(settings, 'CTF_LAB_READY_TIMEOUT', 30)
+
+
+def probe_tcp(host, port, timeout=1.0):
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def probe_http(host, port, timeout=1.0):
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.sendall(f"HEAD / HTTP/1.0\r\nHost: {host}\r\n\r\n".encode())
+            return sock.recv(5) == b'HTTP/'
+    except OSError:
+        return False
+
+
+PROBES = {
+    'http': probe_http,
+    'tcp': probe_tcp,
+}
+
+
+def wait_until_ready(host, port, kind='http', timeout=None):
+    """
+    Port javob bergunga qadar kutadi (backoff: 0.1s, 0.2s, ... 2s).
+    (tayyor, kutilgan_ms) qaytaradi.
+    """
+    probe = PROBES.get(kind)
+    if probe is None or not getattr(settings, 'CTF_LAB_READINESS', True):
+        return True, 0
+
+    timeout = ready_timeout() if timeout is None else timeout
+    started = time.monotonic()
+    deadline = started + timeout
+    delay = INITIAL_DELAY
+    while True:
+        if probe(host, port, timeout=min(1.0, max(deadline - time.monotonic(), 0.05))):
+            return True, int((time.monotonic() - started) * 1000)
+        if time.monotonic() + delay > deadline:
+            return False, int((time.monotonic() - started) * 1000)
+        time.sleep(delay)
+        delay = min(delay * 2, MAX_DELAY)
+
+
+def record(challenge_id, latency_ms, ready=True):
+    """Bitta probe natijasini challenge yig'indisiga qo'shadi (F() bilan, parallel job'lar uchun xavfsiz)."""
+    from .models import ProbeLatency
+
+    if not getattr(settings, 'CTF_LAB_READINESS', True):
+        return  # probe o'tkazilmadi - 0 ms statistikani buzmasin
+    changes = {
+        'count': F('count') + 1,
+        'total_ms': F('total_ms') + latency_ms,
+        'max_ms': Greatest('max_ms', Value(latency_ms)),
+    }
+    if not ready:
+        changes['failed'] = F('failed') + 1
+    rows = ProbeLatency.objects.filter(challenge_id=challenge_id)
+    if not rows.update(**changes):
+        ProbeLatency.objects.get_or_create(challenge_id=challenge_id)
+        rows.update(**changes)
+
+
+def latency_stats():
+    """Probe kutish vaqti (ms), challenge kesimida - butun tarix bo'yicha."""
+    from .models import ProbeLatency
+
+    rows = ProbeLatency.objects.filter(count__gt=0).values_list('challenge_id', 'count', 'failed', 'total_ms', 'max_ms')
+    return {
+        challenge_id: {'avg_ms': round(total_ms / count), 'max_ms': max_ms, 'count': count, 'failed': failed}
+        for challenge_id, count, failed, total_ms, max_ms in rows
+    }
@@ -0,0 +1,122 @@
+"""
+Muddati o'tgan laboratoriyalarni to'xtatish (reaper).
+
+Har bir foydalanuvchi konteyneri expires_at gacha yashaydi (CTF_LAB_TTL,
+challenge sahifasidan uzaytirish mumkin). CTF_LAB_IDLE_TIMEOUT berilgan bo'lsa,
+sahifa shuncha vaqt ochilmagan konteynerlar ham to'xtatiladi. Uzoq vaqt
+pending/starting/stopping holatida qolib ketgan qatorlar (masalan, worker
+o'lib qolgan) ham tozalanadi.
+
+Qatorlar avval shartli UPDATE bilan "stopping" ga o'tkaziladi - bir nechta
+reaper parallel ishlasa ham bitta konteyner ikki marta to'xtatilmaydi.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from . import docker_utils
+from .models import ActiveContainer
+
+logger = logging.getLogger(__name__)
+
+STUCK_AFTER = timedelta(minutes=10)
+
+
+def lab_ttl():
+    return timedelta(seconds=getattr(settings, 'CTF_LAB_TTL', 240))
+
+
+def max_lifetime():
+    return timedelta(seconds=getattr(settings, 'CTF_LAB_MAX_LIFETIME', 3600))
+
+
+def idle_timeout():
+    seconds = getattr(settings, 'CTF_LAB_IDLE_TIMEOUT', None)
+    return timedelta(seconds=seconds) if seconds else None
+
+
+def queue_timeout():
+    return timedelta(seconds=getattr(settings, 'CTF_LAB_QUEUE_TIMEOUT', 900))
+
+
+def new_expiry(now=None):
+    return (now or timezone.now()) + lab_ttl()
+
+
+def extend(container, now=None):
+    """Ijarani CTF_LAB_TTL ga uzaytiradi (CTF_LAB_MAX_LIFETIME dan oshirmay). Yangi muddatni qaytaradi."""
+    now = now or timezone.now()
+    expires_at = min(now + lab_ttl(), container.created_at + max_lifetime())
+    if container.expires_at and expires_at <= container.expires_at:
+        return container.expires_at
+    ActiveContainer.objects.filter(pk=container.pk).update(expires_at=expires_at)
+    container.expires_at = expires_at
+    return expires_at
+
+
+def touch(container, now=None):
+    """Idle hisoblagichini yangilaydi (faqat idle timeout yoqilgan bo'lsa yoziladi)."""
+    if idle_timeout() is None:
+        return
+    ActiveContainer.objects.filter(pk=container.pk).update(last_seen_at=now or timezone.now())
+
+
+def expired_queryset(now=None):
+    now = now or timezone.now()
+    owned = Q(user__isnull=False) | Q(team__isnull=False)
+    running = Q(state=ActiveContainer.RUNNING)
+
+    expired = running & owned & (
+        Q(expires_at__lt=now) |
+        # expires_at dan oldingi qatorlar - created_at dan hisoblaymiz
+        Q(expires_at__isnull=True, created_at__lt=now - lab_ttl())
+    )
+    idle = idle_timeout()
+    if idle:
+        expired |= running & owned & Q(last_seen_at__lt=now - idle)
+
+    queued = Q(state=ActiveContainer.QUEUED)
+    stuck = ~running & ~queued & Q(created_at__lt=now - STUCK_AFTER)
+    # Navbatda juda uzoq qolgan so'rovlar (foydalanuvchi allaqachon ketgan)
+    stuck |= queued & Q(created_at__lt=now - queue_timeout())
+    return ActiveContainer.objects.filter(expired | stuck)
+
+
+def _stop(row):
+    _, container_id, node = row
+    if container_id:
+        docker_utils.stop_container(container_id, node=node)
+
+
+def reap(now=None, batch_size=20, workers=4):
+    """Muddati o'tgan konteynerlarni to'xtatadi. To'xtatilgan qatorlar sonini qaytaradi."""
+    reaped = 0
+    candidates = list(expired_queryset(now).values_list('pk', 'state')[:batch_size * 10])
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reaper') as executor:
+        for start in range(0, len(candidates), batch_size):
+            batch = candidates[start:start + batch_size]
+
+            # Qatorni "egallab olamiz": shu paytda boshqa jarayon o'zgartirgan bo'lsa tashlab ketamiz
+            claimed = []
+            for pk, state in batch:
+                if ActiveContainer.objects.filter(pk=pk, state=state).update(state=ActiveContainer.STOPPING):
+                    claimed.append(pk)
+            if not claimed:
+                continue
+
+            rows = list(ActiveContainer.objects.filter(pk__in=claimed).values_list('pk', 'container_id', 'node'))
+            # docker_utils semafori har bir daemon ga parallel murojaatlarni cheklaydi
+            list(executor.map(_stop, rows))
+
+            # post_delete signal portlarni bo'shatadi
+            ActiveContainer.objects.filter(pk__in=claimed).delete()
+            reaped += len(claimed)
+
+    if reaped:
+        logger.info(f"Reaped {reaped} expired containers")
+    return reaped
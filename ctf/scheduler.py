@@ -0,0 +1,139 @@
+"""
+Turnir bosqichlari va masalalar ko'rinishi uchun scheduler.
+
+Ro'yxat sahifasi har so'rovda `tournament__isnull | tournament__end_date__lt=now`
+(JOIN + vaqt solishtirish) bilan filtrlardi, challenge_detail / tournament_detail
+esa ochiq-yopiqlikni sanalardan qayta hisoblardi. Endi:
+
+  * Tournament.phase (upcoming / running / finished) va Challenge.visibility
+    (public / tournament) bazada saqlanadi;
+  * sync() ularni set-based UPDATE lar bilan joriy vaqtga moslaydi
+    (idempotent - ishga tushishdagi catch-up ham, chegaradagi o'tish ham shu);
+  * keyingi o'tish vaqti keshda turadi. catch_up() bitta cache.get bilan
+    "vaqti keldimi" ni tekshiradi, shuning uchun viewlar uni har so'rovda
+    chaqiradi: `run_scheduler` buyrug'i ishlamasa ham holat kechikmaydi,
+    yangi process (bo'sh kesh) esa birinchi so'rovda catch-up qiladi;
+  * masalalar ro'yxati sahifasi keyingi o'tishgacha (CTF_CHALLENGE_LIST_TTL
+    dan oshmay) keshlanadi; kalitdagi versiya o'tishda va Challenge
+    o'zgarganda oshiriladi.
+"""
+import hashlib
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+NEXT_KEY = 'ctf:sched:next'
+LOCK_KEY = 'ctf:sched:lock'
+LISTING_VERSION_KEY = 'ctf:challenges:v'
+LOCK_TIMEOUT = 30
+
+
+def sync(now=None):
+    """
+    Bosqich va ko'rinishni joriy vaqtga moslaydi, keyingi o'tish vaqtini keshga yozadi.
+    {'tournaments': n, 'challenges': m} - o'zgargan qatorlar soni.
+    """
+    from .models import Challenge, Tournament
+
+    now = now or timezone.now()
+    with transaction.atomic():
+        tournaments = Tournament.objects
+        changed_tournaments = (
+            tournaments.filter(start_date__gt=now).exclude(phase=Tournament.UPCOMING).update(phase=Tournament.UPCOMING)
+            + tournaments.filter(start_date__lte=now, end_date__gt=now).exclude(phase=Tournament.RUNNING).update(phase=Tournament.RUNNING)
+            + tournaments.filter(end_date__lte=now).exclude(phase=Tournament.FINISHED).update(phase=Tournament.FINISHED)
+        )
+        public = Q(tournament__isnull=True) | Q(tournament__phase=Tournament.FINISHED)
+        challenges = Challenge.objects
+        changed_challenges = (
+            challenges.filter(public).exclude(visibility=Challenge.PUBLIC).update(visibility=Challenge.PUBLIC)
+            + challenges.exclude(public).exclude(visibility=Challenge.TOURNAMENT).update(visibility=Challenge.TOURNAMENT)
+        )
+        upcoming = next_transition(now)
+
+    if changed_tournaments or changed_challenges:
+        logger.info(f"Scheduler: {changed_tournaments} tournaments, {changed_challenges} challenges changed")
+        bump_listing()
+    cache.set(NEXT_KEY, upcoming.timestamp() if upcoming else math.inf, None)
+    return {'tournaments': changed_tournaments, 'challenges': changed_challenges}
+
+
+def next_transition(now=None):
+    """Eng yaqin kelajakdagi start_date yoki end_date (yo'q bo'lsa None)."""
+    from .models import Tournament
+
+    now = now or timezone.now()
+    dates = Tournament.objects.aggregate(
+        start=Min('start_date', filter=Q(start_date__gt=now)),
+        end=Min('end_date', filter=Q(end_date__gt=now)),
+    )
+    dates = [d for d in dates.values() if d is not None]
+    return min(dates) if dates else None
+
+
+def is_due(now=None):
+    due = cache.get(NEXT_KEY)
+    return due is None or (now or timezone.now()).timestamp() >= due
+
+
+def catch_up(now=None):
+    """O'tish vaqti kelgan (yoki noma'lum) bo'lsa sync(). Odatiy holatda - faqat bitta cache.get."""
+    if not is_due(now):
+        return False
+    # Bir nechta so'rov bir vaqtda kelsa - bittasi bajaradi, qolganlari kutmaydi
+    if not cache.add(LOCK_KEY, 1, LOCK_TIMEOUT):
+        return False
+    try:
+        sync(now)
+    finally:
+        cache.delete(LOCK_KEY)
+    return True
+
+
+def schedule_changed():
+    """Turnir sanalari o'zgardi: keyingi o'tish vaqti qayta hisoblanadi, ro'yxat keshi eskiradi."""
+    cache.delete(NEXT_KEY)
+    bump_listing()
+
+
+# --- Ro'yxat keshi ---
+
+def listing_version():
+    version = cache.get(LISTING_VERSION_KEY)
+    if version is None:
+        cache.add(LISTING_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(LISTING_VERSION_KEY)
+    return version
+
+
+def bump_listing():
+    try:
+        cache.incr(LISTING_VERSION_KEY)
+    except ValueError:
+        cache.set(LISTING_VERSION_KEY, time.time_ns(), None)
+
+
+def listing_key(*parts):
+    # parts (kategoriya, cursor) foydalanuvchidan keladi - kalitga xeshi qo'yiladi
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f'ctf:challenges:{listing_version()}:{digest}'
+
+
+def listing_timeout(now=None):
+    """Keyingi o'tishgacha soniyalar, CTF_CHALLENGE_LIST_TTL dan oshmaydi (solve_count kabi F() hisoblagichlar uchun)."""
+    ttl = getattr(settings, 'CTF_CHALLENGE_LIST_TTL', 60)
+    due = cache.get(NEXT_KEY)
+    if due is None:
+        return ttl
+    remaining = due - (now or timezone.now()).timestamp()
+    if remaining >= ttl:
+        return ttl
+    return max(1, math.ceil(remaining))
@@ -0,0 +1,46 @@
+"""
+Turnir natijalari (scoreboard).
+
+Ballar TournamentRegistration.score da har bir yechimda bosqichma-bosqich
+saqlanadi (ScoreEvent jurnali asosida, ctf/ledger.py), shuning uchun jadval
+bitta so'rov bilan olinadi: ishtirokchilar soni qancha bo'lishidan qat'i nazar so'rovlar soni o'zgarmaydi.
+"""
+from .models import TournamentRegistration
+
+
+def tournament_standings(tournament, limit=None):
+    """
+    Turnir reytingi: score kamayish tartibida, teng ballda kim oldin
+    yechgan bo'lsa (last_solved) o'sha yuqorida.
+    """
+    registrations = (
+        TournamentRegistration.objects
+        .filter(tournament=tournament)
+        .select_related('user', 'team')
+        .order_by('-score', 'last_solved', 'id')
+    )
+    if limit:
+        registrations = registrations[:limit]
+
+    standings = []
+    for rank, reg in enumerate(registrations, start=1):
+        if reg.team_id:
+            standings.append({
+                'id': reg.id,
+                'rank': rank,
+                'name': reg.team.name,
+                'score': reg.score,
+                'is_team': True,
+                'avatar_url': reg.team.avatar.url if reg.team.avatar else None,
+            })
+        else:
+            standings.append({
+                'id': reg.id,
+                'rank': rank,
+                'name': reg.user.username,
+                'score': reg.score,
+                'is_team': False,
+                'avatar_url': None,
+            })
+    return standings
+
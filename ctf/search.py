@@ -0,0 +1,159 @@
+"""
+Masalalar katalogi uchun to'liq matnli qidiruv (full-text search).
+
+SQLite da ``ctf_challenge_fts`` nomli FTS5 jadvali ishlatiladi: u Challenge
+modeliga signallar orqali sinxron saqlanadi, natijalar bm25 bo'yicha
+saralanadi va har bir so'z prefiks sifatida qidiriladi ("inj" -> "injection").
+FTS5 mavjud bo'lmagan bazalarda eski LIKE qidiruviga qaytamiz.
+"""
+import logging
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'ctf_challenge_fts'
+
+# bm25 og'irliklari: title, description, category
+RANK_WEIGHTS = (10.0, 1.0, 5.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def build_match_expression(query):
+    """
+    Foydalanuvchi matnini xavfsiz FTS5 ifodasiga aylantiradi.
+    Har bir so'z qo'shtirnoq ichida prefiks sifatida olinadi: 'sql inj' -> '"sql"* "inj"*'
+    """
+    tokens = TOKEN_RE.findall(query.lower())
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+class LikeBackend:
+    """Eski xatti-harakat: icontains (LIKE '%q%'). Indeks talab qilmaydi."""
+
+    name = 'like'
+
+    def index(self, challenge):
+        pass
+
+    def remove(self, challenge_id):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def filter_queryset(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(category__icontains=query)
+        )
+
+
+class FTS5Backend:
+    """SQLite FTS5 inverted index."""
+
+    name = 'fts5'
+
+    def index(self, challenge):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [challenge.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, description, category) VALUES (%s, %s, %s, %s)",
+                [challenge.pk, challenge.title, challenge.description, challenge.category]
+            )
+
+    def remove(self, challenge_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [challenge_id])
+
+    def rebuild(self):
+        from .models import Challenge
+
+        table = Challenge._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, description, category) "
+                f"SELECT id, title, description, category FROM {table}"
+            )
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+            cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+            return cursor.fetchone()[0]
+
+    def filter_queryset(self, queryset, query):
+        expression = build_match_expression(query)
+        if not expression:
+            return queryset.none()
+
+        table = queryset.model._meta.db_table
+        weights = ', '.join(str(w) for w in RANK_WEIGHTS)
+        # FTS jadvali bilan JOIN: MATCH indeks orqali bajariladi, bm25 esa
+        # faqat topilgan qatorlar uchun hisoblanadi (kichikroq = yaxshiroq).
+        return queryset.extra(
+            select={'search_rank': f'bm25({FTS_TABLE}, {weights})'},
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE} MATCH %s', f'{FTS_TABLE}.rowid = {table}.id'],
+            params=[expression],
+        ).order_by('search_rank', '-created_at')
+
+
+_backend = None
+
+
+def create_fts_table(schema_connection):
+    """Migratsiya va testlar uchun: FTS5 jadvalini yaratadi (faqat SQLite)."""
+    if schema_connection.vendor != 'sqlite':
+        return False
+    with schema_connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"title, description, category, "
+            f"tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+    return True
+
+
+def _fts_available():
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+def get_backend():
+    """
+    CTF_SEARCH_BACKEND = 'fts5' | 'like' sozlamasi bilan majburlash mumkin,
+    aks holda SQLite + FTS5 jadvali bo'lsa FTS5 tanlanadi.
+    """
+    global _backend
+    if _backend is None:
+        choice = getattr(settings, 'CTF_SEARCH_BACKEND', None)
+        if choice is None:
+            choice = 'fts5' if _fts_available() else 'like'
+        _backend = FTS5Backend() if choice == 'fts5' else LikeBackend()
+        logger.info(f"Challenge search backend: {_backend.name}")
+    return _backend
+
+
+def index_challenge(challenge):
+    get_backend().index(challenge)
+
+
+def remove_challenge(challenge_id):
+    get_backend().remove(challenge_id)
+
+
+def rebuild_index():
+    """Indeksni to'liq qayta quradi. Indekslangan yozuvlar sonini qaytaradi."""
+    return get_backend().rebuild()
+
+
+def filter_queryset(queryset, query):
+    """Challenge querysetini qidiruv bo'yicha filtrlaydi va relevantlik bo'yicha saralaydi."""
+    return get_backend().filter_queryset(queryset, query)
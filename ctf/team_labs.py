@@ -0,0 +1,87 @@
+"""
+TEAM turnirlarida jamoa uchun umumiy laboratoriya.
+
+Tournament.share_team_labs yoqilgan bo'lsa, challenge uchun konteyner
+foydalanuvchiga emas, jamoaga (ActiveContainer.team) tegishli bo'ladi: birinchi
+a'zo ishga tushiradi, qolganlar shu konteynerga qo'shiladi (holders).
+TERMINATE bosgan a'zo faqat o'zini holders dan chiqaradi; oxirgi a'zo
+chiqqandagina konteyner to'xtatiladi (reference counting). Jamoadan chiqqan
+yoki chetlashtirilgan a'zo ham jamoa laboratoriyalaridan chiqariladi
+(drop_members, Team.members signali) - aks holda user_labs() ularni hisoblab,
+o'z laboratoriyasini ochishga to'sqinlik qilardi.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+
+from .models import ActiveContainer
+
+
+def lab_team(team, challenge):
+    """Challenge uchun lab jamoaviy bo'lsa - foydalanuvchi jamoasi (request.ctx.team), aks holda None."""
+    tournament = challenge.tournament
+    if tournament is None or tournament.mode != 'TEAM' or not tournament.share_team_labs:
+        return None
+    return team
+
+
+def user_labs(user):
+    """Foydalanuvchi egallab turgan barcha laboratoriyalar (shaxsiy + jamoaviy)."""
+    return ActiveContainer.objects.filter(Q(user=user) | Q(holders=user)).distinct()
+
+
+def find_lab(user, challenge, team=None):
+    if team is not None:
+        return ActiveContainer.objects.filter(team=team, challenge=challenge).first()
+    return ActiveContainer.objects.filter(user=user, challenge=challenge).first()
+
+
+def join(container, user):
+    container.holders.add(user)
+
+
+def create_or_join(lease_func, team, challenge, user):
+    """
+    Jamoa konteynerini yaratadi yoki mavjudiga qo'shiladi. (row, created) qaytaradi;
+    port topilmasa row None. Ikki a'zo bir vaqtda bossa (team, challenge) UNIQUE
+    ikkinchisini mavjud konteynerga qo'shadi.
+    """
+    existing = find_lab(user, challenge, team)
+    if existing is not None:
+        join(existing, user)
+        return existing, False
+
+    try:
+        with transaction.atomic():
+            row = lease_func(user=None, team=team, challenge=challenge, container_id='', state=ActiveContainer.QUEUED)
+            if row is not None:
+                join(row, user)
+            return row, True
+    except IntegrityError:
+        existing = find_lab(user, challenge, team)
+        if existing is None:
+            raise
+        join(existing, user)
+        return existing, False
+
+
+def leave(container, user):
+    """A'zoni chiqaradi. Konteyner endi hech kimga kerak bo'lmasa True (to'xtatish kerak)."""
+    with transaction.atomic():
+        container.holders.remove(user)
+        return not container.holders.exists()
+
+
+def drop_members(team_id, user_ids):
+    """
+    A'zolarni jamoaning barcha laboratoriyalaridan chiqaradi. Endi hech kim
+    foydalanmayotgan konteynerlar ro'yxatini qaytaradi (to'xtatish kerak).
+    """
+    with transaction.atomic():
+        held = list(
+            ActiveContainer.objects.filter(team_id=team_id, holders__in=user_ids)
+            .values_list('pk', flat=True).distinct()
+        )
+        if not held:
+            return []
+        ActiveContainer.holders.through.objects.filter(activecontainer_id__in=held, user_id__in=user_ids).delete()
+        return list(ActiveContainer.objects.filter(pk__in=held).annotate(n=Count('holders')).filter(n=0))
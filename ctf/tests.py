@@ -1,3 +1,1342 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import importlib
+import json
+import socket
+import tempfile
+import threading
+import time
+import unittest.mock
+from datetime import timedelta
+from pathlib import Path
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError, connection
+from django.db.models import F
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from kurs.models import UserProfile
+
+from . import admission, attempt_log, container_status, docker_utils, images, jobs, ledger, live, nodes, ports, progress, ranking, ratelimit, readiness, reaper, scheduler, search, team_labs, user_context
+from .lab_pool import LabPool
+from .models import ActiveContainer, Challenge, ChallengeAttempt, CTFProfile, ScoreEvent, SolvedChallenge, TelegramAuth, Team, Tournament, TournamentRegistration
+from .pagination import KeysetPaginator
+
+
+def make_challenge(**kwargs):
+    defaults = {
+        'title': 'Sanity Check',
+        'description': 'flag{welcome}',
+        'category': 'Misc',
+        'points': 10,
+        'flag_hash': '0' * 64,
+    }
+    defaults.update(kwargs)
+    return Challenge.objects.create(**defaults)
+
+
+class ChallengeSearchTests(TestCase):
+    def setUp(self):
+        self.sqli = make_challenge(title='SQL Injection Basic', description="Login formasiga ' OR '1'='1", category='Web')
+        self.caesar = make_challenge(title='Caesar Salad', description='Sezar shifri', category='Crypto')
+
+    def search(self, query):
+        return list(search.filter_queryset(Challenge.objects.all(), query))
+
+    def test_prefix_match(self):
+        self.assertEqual(self.search('inj'), [self.sqli])
+        self.assertEqual(self.search('caes sal'), [self.caesar])
+
+    def test_index_follows_save_and_delete(self):
+        self.caesar.title = 'Vigenere Salad'
+        self.caesar.save()
+        self.assertEqual(self.search('caesar'), [])
+        self.assertEqual(self.search('vigenere'), [self.caesar])
+
+        self.caesar.delete()
+        self.assertEqual(self.search('vigenere'), [])
+
+    def test_title_ranks_above_description(self):
+        other = make_challenge(title='Login Portal', description='SQL injection somewhere', category='Web')
+        self.assertEqual(self.search('injection'), [self.sqli, other])
+
+    def test_rebuild(self):
+        Challenge.objects.filter(pk=self.caesar.pk).update(title='Rot13')  # signal chetlab o'tiladi
+        self.assertEqual(search.rebuild_index(), 2)
+        self.assertEqual(self.search('rot13'), [self.caesar])
+
+    def test_challenges_view(self):
+        response = self.client.get(reverse('challenges'), {'q': 'sql'})
+        self.assertEqual(list(response.context['challenges']), [self.sqli])
+
+
+class ProgressCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        writer, attempt_log.writer = attempt_log.writer, attempt_log.AttemptWriter(background=False)
+        self.addCleanup(setattr, attempt_log, 'writer', writer)
+        self.user = User.objects.create_user('agent', password='pw')
+        self.client.force_login(self.user)
+        self.easy = make_challenge(title='Easy', flag_hash=hashlib.sha256(b'flag{easy}').hexdigest())
+        self.hard = make_challenge(title='Hard', flag_hash=hashlib.sha256(b'flag{hard}').hexdigest())
+
+    def submit(self, challenge, flag):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('challenge_detail', args=[challenge.id]), {'flag': flag})
+
+    def test_bitset_helpers(self):
+        p = progress.UserProgress(solved=1 << 3, attempted=(1 << 3) | (1 << 70))
+        self.assertTrue(p.is_solved(3))
+        self.assertFalse(p.has_failed(3))
+        self.assertTrue(p.has_failed(70))
+        self.assertEqual(p.solved_ids(), [3])
+        self.assertEqual(p.failed_ids(), [70])
+
+    def test_submissions_update_cache_without_rebuild(self):
+        progress.load(self.user.id)  # keshni isitish
+        self.submit(self.hard, 'wrong')
+        self.submit(self.hard, 'wrong again')
+        self.submit(self.easy, 'flag{easy}')
+
+        with self.assertNumQueries(0):
+            p = progress.load(self.user.id)
+        self.assertEqual(p.solved_ids(), [self.easy.id])
+        self.assertEqual(p.failed_ids(), [self.hard.id])
+        with self.assertNumQueries(0):
+            progress.load(self.user.id)
+
+    def test_lost_event_rebuilds_from_db(self):
+        progress.load(self.user.id)
+        self.submit(self.hard, 'wrong')
+        cache.delete(progress._event_key(self.user.id, 1))
+        with self.assertNumQueries(2):
+            p = progress.load(self.user.id)
+        self.assertEqual(p.failed_ids(), [self.hard.id])
+
+    def test_filters_use_cache(self):
+        self.submit(self.hard, 'wrong')
+        response = self.client.get(reverse('challenges'), {'category': 'failed'})
+        self.assertEqual(list(response.context['challenges']), [self.hard])
+
+    def test_invalidated_on_solve_delete(self):
+        self.submit(self.easy, 'flag{easy}')
+        self.assertTrue(progress.load(self.user.id).is_solved(self.easy.id))
+
+        SolvedChallenge.objects.filter(user=self.user).delete()
+        ChallengeAttempt.objects.filter(user=self.user).delete()
+        self.assertFalse(progress.load(self.user.id).is_solved(self.easy.id))
+
+
+class AttemptWriterTests(TestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.spool = Path(root.name) / 'attempts.spool'
+        # Fon thread'i ishga tushmaydi - flush qo'lda chaqiriladi
+        self.writer = attempt_log.AttemptWriter(background=True, batch_size=50, spool=self.spool)
+        self.writer._ensure_started = lambda: None
+        self.user = User.objects.create_user('agent')
+        self.challenge = make_challenge()
+
+    def test_buffered_until_flush(self):
+        for flag in ('a', 'b', 'c'):
+            self.writer.record(self.user.id, self.challenge.id, flag, False)
+        self.assertEqual(ChallengeAttempt.objects.count(), 0)
+        self.assertEqual(self.writer.pending_challenge_ids(self.user.id), {self.challenge.id})
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.writer.flush(), 3)
+        self.assertEqual(self.writer.pending(), [])
+        self.assertEqual(ChallengeAttempt.objects.count(), 3)
+
+    def test_shutdown_spools_and_replays_with_original_timestamps(self):
+        stamp = timezone.now() - timedelta(seconds=30)
+        self.writer.record(self.user.id, self.challenge.id, 'x' * 300, False, stamp)
+        with unittest.mock.patch.object(ChallengeAttempt.objects, 'bulk_create', side_effect=DatabaseError('locked')):
+            self.writer.shutdown()
+        self.assertEqual(ChallengeAttempt.objects.count(), 0)
+        self.assertTrue(self.spool.exists())
+
+        self.assertEqual(self.writer.replay_spool(), 1)
+        self.assertFalse(self.spool.exists())
+        attempt = ChallengeAttempt.objects.get()
+        self.assertEqual(attempt.timestamp, stamp)
+        self.assertEqual(len(attempt.input_flag), 255)
+
+
+@override_settings(CTF_RATELIMITS={'flag': (3, 60), 'flag-user': (4, 60)})
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        writer, attempt_log.writer = attempt_log.writer, attempt_log.AttemptWriter(background=False)
+        self.addCleanup(setattr, attempt_log, 'writer', writer)
+        self.user = User.objects.create_user('agent')
+        self.client.force_login(self.user)
+        self.first = make_challenge(title='First')
+        self.second = make_challenge(title='Second')
+
+    def submit(self, challenge):
+        return self.client.post(reverse('challenge_detail', args=[challenge.id]), {'flag': 'wrong'})
+
+    def test_per_challenge_and_per_user_limits(self):
+        for _ in range(3):
+            self.assertEqual(self.submit(self.first).status_code, 200)
+        response = self.submit(self.first)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+        # Rad etilgan so'rov umumiy limitni yemaydi: yana bitta joy bor
+        self.assertEqual(self.submit(self.second).status_code, 200)
+        self.assertEqual(self.submit(self.second).status_code, 429)
+        self.assertEqual(ChallengeAttempt.objects.count(), 4)
+
+    def test_only_wrong_flags_are_counted(self):
+        self.first.flag_hash = hashlib.sha256(b'flag{ok}').hexdigest()
+        self.first.save()
+        for _ in range(2):
+            self.assertEqual(self.submit(self.first).status_code, 200)
+        # To'g'ri flag va qayta yuborish limitni yemaydi
+        url = reverse('challenge_detail', args=[self.first.id])
+        self.assertEqual(self.client.post(url, {'flag': 'flag{ok}'}).status_code, 302)
+        for _ in range(3):
+            self.assertEqual(self.client.post(url, {'flag': 'flag{ok}'}).status_code, 302)
+        # Umumiy limit (4) dan faqat 2 ta noto'g'ri flag ishlatilgan
+        for _ in range(2):
+            self.assertEqual(self.submit(self.second).status_code, 200)
+        self.assertEqual(self.submit(self.second).status_code, 429)
+
+    def test_parallel_hits_cannot_pass_the_cap(self):
+        limit = ratelimit.RateLimit('test', 5, 60)
+        barrier = threading.Barrier(20, timeout=10)
+        allowed = []
+
+        def hit():
+            barrier.wait()
+            allowed.append(limit.hit('k', now=60)[0])
+
+        threads = [threading.Thread(target=hit) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(allowed.count(True), 5)
+
+    def test_sliding_window_retry_after(self):
+        limit = ratelimit.RateLimit('test', 2, 60)
+        self.assertEqual(limit.hit('k', now=60)[0], True)
+        self.assertEqual(limit.hit('k', now=61)[0], True)
+        self.assertEqual(limit.hit('k', now=62), (False, 58 + 30))
+        # Keyingi oynada oldingi oyna yarmi hali hisobda
+        self.assertEqual(limit.hit('k', now=120 + 29)[0], False)
+        self.assertEqual(limit.hit('k', now=120 + 30)[0], True)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Ko'p teng ballar: tie-break last_solved va id bo'yicha
+        for i in range(25):
+            user = User.objects.create_user(f'user{i}')
+            CTFProfile.objects.filter(user=user).update(total_points=(i % 4) * 10)
+        self.expected = list(CTFProfile.objects.order_by('-total_points', 'last_solved', 'id'))
+
+    def test_forward_and_backward(self):
+        paginator = KeysetPaginator(CTFProfile.objects.all(), ('-total_points', 'last_solved', 'id'), 10)
+
+        seen = []
+        page = paginator.get_page(None)
+        ranks = []
+        while True:
+            seen.extend(page)
+            ranks.append(page.start_rank)
+            if not page.has_next():
+                break
+            page = paginator.get_page(page.next_cursor)
+
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(ranks, [1, 11, 21])
+        self.assertEqual(page.number, 3)
+
+        previous = paginator.get_page(page.previous_cursor)
+        self.assertEqual(list(previous), self.expected[10:20])
+        self.assertEqual(previous.start_rank, 11)
+        self.assertTrue(previous.has_previous())
+
+    def test_garbage_cursor_is_first_page(self):
+        paginator = KeysetPaginator(CTFProfile.objects.all(), ('-total_points', 'last_solved', 'id'), 10)
+        self.assertEqual(list(paginator.get_page('not-a-cursor')), self.expected[:10])
+
+    def test_leaderboard_view(self):
+        response = self.client.get(reverse('leaderboard'))
+        page = response.context['page_obj']
+        response = self.client.get(reverse('leaderboard'), {'cursor': page.next_cursor})
+        self.assertEqual([p.rank for p in response.context['page_obj']], list(range(21, 26)))
+        self.assertFalse(response.context['is_first_page'])
+
+
+class RankIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.carol = User.objects.create_user('carol')
+        CTFProfile.objects.filter(user=self.alice).update(total_points=50)
+        CTFProfile.objects.filter(user=self.bob).update(total_points=100)
+        CTFProfile.objects.filter(user=self.carol).update(total_points=50)
+
+    def test_rank_breaks_ties_by_last_solved(self):
+        self.assertEqual(ranking.rank_of(self.bob), 1)
+        self.assertEqual(ranking.rank_of(self.alice), 2)
+        self.assertEqual(ranking.rank_of(self.carol), 3)
+        self.assertEqual(ranking.top(1), [self.bob.ctf_profile.pk])
+
+    def test_updates_on_save_after_commit(self):
+        ranking.rank_of(self.alice)  # indeksni qurish
+        profile = self.carol.ctf_profile
+        profile.total_points = 500
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+
+        with self.assertNumQueries(2):  # har bir o'qishda faqat versiya (PK), qayta qurish yo'q
+            self.assertEqual(ranking.rank_of(self.carol), 1)
+            self.assertEqual(ranking.page(1, 2), [self.bob.ctf_profile.pk, self.alice.ctf_profile.pk])
+
+    def test_other_worker_sees_change_without_waiting(self):
+        other_worker = ranking.RankIndex()
+        self.assertEqual(other_worker.rank_of(self.carol), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            ledger.award_solve(self.carol, make_challenge(points=1000))
+        self.assertEqual(other_worker.rank_of(self.carol), 1)
+
+    def test_other_process_change_triggers_rebuild(self):
+        ranking.rank_of(self.alice)
+        CTFProfile.objects.filter(user=self.alice).update(total_points=1000)
+        ranking.bump_version()  # boshqa worker o'zgartirgandek (lokal indeks bu haqda bilmaydi)
+
+        self.assertEqual(ranking.rank_of(self.alice), 1)
+
+    def test_profile_view_rank(self):
+        self.client.force_login(self.carol)
+        response = self.client.get(reverse('ctf_profile'))
+        self.assertEqual(response.context['rank'], 3)
+
+
+def make_tournament(**kwargs):
+    now = timezone.now()
+    defaults = {
+        'title': 'Wan-Net Cup',
+        'description': '...',
+        'start_date': now - timedelta(hours=1),
+        'end_date': now + timedelta(hours=1),
+        'is_active': True,
+        'mode': 'SOLO',
+    }
+    defaults.update(kwargs)
+    return Tournament.objects.create(**defaults)
+
+
+class TournamentLeaderboardTests(TestCase):
+    def leaderboard_queries(self, tournament):
+        url = reverse('tournament_leaderboard', args=[tournament.id])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        return len(ctx.captured_queries), response.context['leaderboard']
+
+    def test_constant_query_count(self):
+        small = make_tournament(mode='TEAM')
+        large = make_tournament(mode='TEAM', title='Big Cup')
+        for i in range(60):
+            captain = User.objects.create_user(f'captain{i}')
+            team = Team.objects.create(name=f'team{i}', captain=captain)
+            TournamentRegistration.objects.create(tournament=large, team=team, score=i)
+            if i < 3:
+                TournamentRegistration.objects.create(tournament=small, team=team, score=i)
+
+        small_count, small_board = self.leaderboard_queries(small)
+        large_count, large_board = self.leaderboard_queries(large)
+
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(len(large_board), 60)
+        self.assertEqual(large_board[0]['name'], 'team59')
+
+    def test_page_uses_live_snapshot_limit(self):
+        tournament = make_tournament()
+        for i in range(3):
+            TournamentRegistration.objects.create(tournament=tournament, user=User.objects.create_user(f'u{i}'), score=i)
+        with unittest.mock.patch.object(live, 'SNAPSHOT_LIMIT', 2):
+            _, board = self.leaderboard_queries(tournament)
+        self.assertEqual([e['name'] for e in board], ['u2', 'u1'])
+
+    def test_ties_broken_by_last_solved(self):
+        tournament = make_tournament()
+        now = timezone.now()
+        late = User.objects.create_user('late')
+        early = User.objects.create_user('early')
+        TournamentRegistration.objects.create(tournament=tournament, user=late, score=100)
+        TournamentRegistration.objects.create(tournament=tournament, user=early, score=100)
+        # auto_now ni chetlab o'tish uchun update()
+        TournamentRegistration.objects.filter(user=late).update(last_solved=now)
+        TournamentRegistration.objects.filter(user=early).update(last_solved=now - timedelta(minutes=5))
+
+        _, board = self.leaderboard_queries(tournament)
+        self.assertEqual([(e['rank'], e['name']) for e in board], [(1, 'early'), (2, 'late')])
+
+
+class LiveScoreboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tournament = make_tournament()
+        self.challenge = make_challenge(tournament=self.tournament)
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.alice_reg = TournamentRegistration.objects.create(tournament=self.tournament, user=self.alice, score=10)
+        self.bob_reg = TournamentRegistration.objects.create(tournament=self.tournament, user=self.bob, score=20)
+
+    def test_diff_standings(self):
+        before = [{'id': 1, 'name': 'a', 'rank': 1, 'score': 20}, {'id': 2, 'name': 'b', 'rank': 2, 'score': 10}]
+        after = [{'id': 2, 'name': 'b', 'rank': 1, 'score': 70}, {'id': 1, 'name': 'a', 'rank': 2, 'score': 20}]
+        changes = live.diff_standings(before, after)
+        self.assertEqual([(c['id'], c['old_rank'], c['rank']) for c in changes], [(2, 2, 1), (1, 1, 2)])
+
+    def publish(self):
+        TournamentRegistration.objects.filter(pk=self.alice_reg.pk).update(score=70)
+        with CaptureQueriesContext(connection) as ctx:
+            live.publish_solve(self.tournament, 'alice', self.challenge, 60, True)
+        return len(ctx.captured_queries)
+
+    def test_one_computation_for_many_viewers(self):
+        url = reverse('tournament_live', args=[self.tournament.id])
+        after = self.client.get(url).json()['seq']  # tomoshabin bor
+        self.assertEqual(self.publish(), 1)
+
+        # Har qanday worker'dagi tomoshabinlar jurnalni bazaga so'rovsiz o'qiydi
+        for _ in range(5):
+            with self.assertNumQueries(1):  # faqat get_object_or_404
+                body = self.client.get(url, {'after': after}).json()
+            self.assertEqual([e['type'] for e in body['events']], ['solve', 'scoreboard'])
+        self.assertEqual(body['events'][1]['data']['standings'][0]['name'], 'alice')
+        self.assertEqual(self.client.get(url, {'after': body['seq']}).json()['events'], [])
+
+    def test_no_viewers_no_computation(self):
+        self.assertEqual(self.publish(), 0)
+        self.assertEqual(live.last_seq(self.tournament.id), 0)
+
+    def test_lost_events_resync_with_standings(self):
+        live.touch(self.tournament.id)
+        self.publish()
+        cache.delete(live._key(self.tournament.id, 'e:1'))
+        seq, events = live.read(self.tournament, 0)
+        self.assertEqual([(n, t) for n, t, _ in events], [(seq, 'scoreboard')])
+        self.assertEqual(events[0][2]['standings'][0]['name'], 'alice')
+
+    def test_stream_disabled_under_wsgi(self):
+        response = self.client.get(reverse('tournament_stream', args=[self.tournament.id]))
+        self.assertEqual(response.status_code, 204)
+
+    @override_settings(CTF_LIVE_STREAM=True)
+    def test_stream_resumes_and_ends(self):
+        live.touch(self.tournament.id)
+        self.publish()
+
+        async def collect():
+            return [chunk async for chunk in live.event_stream(self.tournament, after=0)]
+
+        with unittest.mock.patch.multiple(live, STREAM_SECONDS=0.05, STREAM_POLL_SECONDS=0.01):
+            chunks = async_to_sync(collect)()
+        self.assertEqual(chunks[0], "retry: 5000\n\n")
+        self.assertTrue(chunks[1].startswith('id: 1\nevent: solve'))
+        self.assertTrue(chunks[2].startswith('id: 2\nevent: scoreboard'))
+
+
+class FakeDockerMixin:
+    def setUp(self):
+        super().setUp()
+        self.docker = docker_utils.FakeDockerBackend()
+        docker_utils.set_backend(self.docker)
+        self.addCleanup(docker_utils.set_backend, None)
+        # Job'lar test ichida sinxron bajariladi
+        runner, jobs.runner = jobs.runner, jobs.JobRunner(background=False)
+        self.addCleanup(setattr, jobs, 'runner', runner)
+        # Fake konteynerlar portni tinglamaydi
+        no_probe = override_settings(CTF_LAB_READINESS=False)
+        no_probe.enable()
+        self.addCleanup(no_probe.disable)
+
+
+class WarmPoolTests(FakeDockerMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.challenge = make_challenge(docker_image_name='wan-net/ping-rce:latest', pool_min_idle=2, pool_max_idle=3)
+        self.user = User.objects.create_user('agent')
+        self.pool = LabPool(background=False)
+
+    def test_refill_and_acquire(self):
+        self.assertEqual(self.pool.refill(self.challenge), 2)
+        self.assertEqual(len(self.docker.containers), 2)
+
+        row = self.pool.acquire(self.challenge, self.user)
+        self.assertEqual(row.user, self.user)
+        # Berilgandan keyin pool qayta to'ldiriladi
+        self.assertEqual(ActiveContainer.objects.filter(challenge=self.challenge, user__isnull=True).count(), 2)
+        self.assertEqual(self.pool.metrics()['hits'], 1)
+
+    def test_idle_container_is_claimed_once(self):
+        self.challenge.pool_min_idle = 1
+        self.pool.refill(self.challenge)
+        self.challenge.pool_min_idle = 0  # qayta to'ldirmaslik uchun
+        other = User.objects.create_user('other')
+
+        self.assertIsNotNone(self.pool.acquire(self.challenge, self.user))
+        self.assertIsNone(self.pool.acquire(self.challenge, other))
+        self.assertEqual(self.pool.metrics()['misses'], 1)
+
+    def test_excess_idle_containers_are_stopped(self):
+        self.pool.refill(self.challenge)
+        self.challenge.pool_min_idle = self.challenge.pool_max_idle = 1
+        self.pool.refill(self.challenge)
+        self.assertEqual(len(self.docker.containers), 1)
+
+
+
+class LabJobTests(FakeDockerMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.challenge = make_challenge(docker_image_name='wan-net/ping-rce:latest')
+        self.user = User.objects.create_user('agent', password='pw')
+        self.client.force_login(self.user)
+
+    def status(self):
+        return self.client.get(reverse('lab_status', args=[self.challenge.id])).json()
+
+    def test_start_runs_in_background_job(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.get(reverse('start_container', args=[self.challenge.id]))
+        # Request javob berganda konteyner hali ishga tushmagan
+        self.assertEqual(self.status()['state'], 'pending')
+        self.assertEqual(self.docker.run_calls, 0)
+
+        for callback in callbacks:
+            callback()
+        data = self.status()
+        self.assertEqual(data['state'], 'running')
+        self.assertIn(str(ActiveContainer.objects.get().host_port), data['url'])
+
+    def test_failed_start_reports_error(self):
+        self.docker.fail_images.add(self.challenge.docker_image_name)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('start_container', args=[self.challenge.id]))
+        self.assertEqual(self.status()['state'], 'failed')
+
+        # Sahifa xatoni ko'rsatadi va qatorni (portni) bo'shatadi
+        self.client.get(reverse('challenge_detail', args=[self.challenge.id]))
+        self.assertEqual(self.status()['state'], 'none')
+
+    def test_stop_before_start_job_runs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('start_container', args=[self.challenge.id]))
+            # Stop job start job'dan oldin bajariladi
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.get(reverse('stop_container', args=[self.challenge.id]))
+        self.assertFalse(ActiveContainer.objects.exists())
+        self.assertEqual(self.docker.run_calls, 0)
+
+
+class ContainerStatusTests(FakeDockerMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.challenge = make_challenge(docker_image_name='wan-net/ping-rce:latest')
+        self.user = User.objects.create_user('agent', password='pw')
+
+    def run_lab(self, user):
+        container = docker_utils.start_container(self.challenge.docker_image_name)
+        lease = ports.allocator.lease(user=user, challenge=self.challenge, container_id=container.id, state=ActiveContainer.RUNNING)
+        return lease
+
+    def test_status_is_served_from_cache_and_updated_by_events(self):
+        row = self.run_lab(self.user)
+        self.assertEqual(container_status.get_status(row.container_id), 'running')
+
+        self.docker.containers[row.container_id].status = 'exited'
+        self.assertEqual(container_status.get_status(row.container_id), 'running')
+
+        container_status.watcher.handle_event({'Type': 'container', 'Action': 'die', 'id': row.container_id})
+        self.client.force_login(self.user)
+        self.client.get(reverse('challenge_detail', args=[self.challenge.id]))
+        self.assertFalse(ActiveContainer.objects.exists())
+
+    def test_reconcile_removes_ghosts_in_one_pass(self):
+        rows = [self.run_lab(User.objects.create_user(f'user{i}')) for i in range(3)]
+        self.docker.stop(rows[0].container_id)
+        self.docker.containers[rows[1].container_id].status = 'exited'
+
+        with self.assertNumQueries(4):  # select + cascade collect + holders + delete
+            removed = container_status.reconcile_ghosts()
+        self.assertEqual(removed, 2)
+        self.assertEqual(list(ActiveContainer.objects.values_list('pk', flat=True)), [rows[2].pk])
+
+
+class ReaperTests(FakeDockerMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.challenge = make_challenge(docker_image_name='wan-net/ping-rce:latest')
+
+    def run_lab(self, username, **fields):
+        container = docker_utils.start_container(self.challenge.docker_image_name)
+        return ports.allocator.lease(
+            user=User.objects.create_user(username), challenge=self.challenge,
+            container_id=container.id, state=ActiveContainer.RUNNING, **fields
+        )
+
+    def test_expired_labs_are_stopped_and_ports_freed(self):
+        now = timezone.now()
+        expired = [self.run_lab(f'old{i}', expires_at=now - timedelta(seconds=1)) for i in range(5)]
+        alive = self.run_lab('fresh', expires_at=now + timedelta(minutes=3))
+        free_before = ports.allocator.free_count()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(reaper.reap(batch_size=2), 5)
+
+        self.assertEqual(list(ActiveContainer.objects.values_list('pk', flat=True)), [alive.pk])
+        self.assertEqual(list(self.docker.containers), [alive.container_id])
+        self.assertEqual(ports.allocator.free_count(), free_before + len(expired))
+
+    def test_extend_lease(self):
+        row = self.run_lab('agent', expires_at=timezone.now() + timedelta(seconds=10))
+        self.client.force_login(row.user)
+        self.client.get(reverse('extend_container', args=[self.challenge.id]))
+        row.refresh_from_db()
+        self.assertGreater(row.expires_at, timezone.now() + timedelta(seconds=200))
+        self.assertEqual(reaper.reap(), 0)
+
+
+@override_settings(CTF_LAB_CAPACITY=2)
+class AdmissionTests(FakeDockerMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.challenge = make_challenge(docker_image_name='wan-net/ping-rce:latest')
+
+    def start(self, username, challenge=None):
+        challenge = challenge or self.challenge
+        user = User.objects.create_user(username)
+        self.client.force_login(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('start_container', args=[challenge.id]))
+        return ActiveContainer.objects.get(user=user)
+
+    def test_capacity_is_derived_from_lab_limits(self):
+        with self.settings(CTF_LAB_CAPACITY=None, CTF_HOST_MEMORY_MB=1024, CTF_HOST_MEMORY_FRACTION=1, CTF_HOST_CPUS=8):
+            self.assertEqual(admission.capacity(), 1024 // 128)
+
+    def test_queue_is_admitted_when_a_slot_frees(self):
+        first = self.start('a')
+        self.start('b')
+        third = self.start('c')
+        self.assertEqual(third.state, ActiveContainer.QUEUED)
+        self.assertEqual(self.client.get(reverse('lab_status', args=[self.challenge.id])).json()['position'], 1)
+
+        self.client.force_login(first.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('stop_container', args=[self.challenge.id]))
+        third.refresh_from_db()
+        self.assertEqual(third.state, ActiveContainer.RUNNING)
+        self.assertEqual(len(self.docker.containers), 2)
+
+    def test_tournament_reservation(self):
+        tournament = make_tournament(reserved_labs=1)
+        tournament_challenge = make_challenge(title='Cup lab', docker_image_name='wan-net/sqli:latest', tournament=tournament)
+
+        self.assertEqual(self.start('a').state, ActiveContainer.RUNNING)
+        # Oxirgi joy turnir uchun saqlangan
+        self.assertEqual(self.start('b').state, ActiveContainer.QUEUED)
+        self.assertEqual(self.start('player', tournament_challenge).state, ActiveContainer.RUNNING)
+
+
+class NodeSchedulingTests(FakeDockerMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        docker_utils.set_backend(None)
+        fake = {'backend': 'ctf.docker_utils.FakeDockerBackend', 'capacity': 2}
+        nodes.registry.configure({
+            'lab-1': dict(fake, public_host='lab1.wan-net.uz'),
+            'lab-2': dict(fake, public_host='lab2.wan-net.uz'),
+        })
+        self.addCleanup(nodes.registry.configure)
+        self.challenge = make_challenge(docker_image_name='wan-net/ping-rce:latest')
+
+    def start(self, username):
+        user = User.objects.create_user(username)
+        self.client.force_login(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('start_container', args=[self.challenge.id]))
+        return ActiveContainer.objects.get(user=user)
+
+    def running_on(self, name):
+        return len(nodes.registry.get(name).backend.containers)
+
+    def test_least_loaded_spreads_labs_and_routes_stop(self):
+        rows = [self.start(f'user{i}') for i in range(4)]
+        self.assertEqual(self.running_on('lab-1'), 2)
+        self.assertEqual(self.running_on('lab-2'), 2)
+        self.assertEqual(admission.capacity(), 4)
+
+        row = rows[0]
+        self.assertEqual(
+            self.client.get(reverse('lab_status', args=[self.challenge.id])).json()['url'],
+            f"http://{nodes.registry.get(rows[3].node).public_host}:{rows[3].host_port}",
+        )
+        self.client.force_login(row.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('stop_container', args=[self.challenge.id]))
+        self.assertEqual(self.running_on(row.node), 1)
+
+    @override_settings(CTF_NODE_STRATEGY='binpack')
+    def test_binpack_fills_one_node_first(self):
+        first, second, third = [self.start(f'user{i}') for i in range(3)]
+        self.assertEqual(first.node, second.node)
+        self.assertNotEqual(third.node, first.node)
+
+
+class LazyDockerClientTests(TestCase):
+    def test_connects_on_first_use_and_backs_off(self):
+        backend = docker_utils.DockerBackend(base_url='unix:///nonexistent/docker.sock')
+        self.assertFalse(backend._client.connected)
+
+        attempts = []
+        connect = backend._client._connect
+        backend._client._connect = lambda: attempts.append(1) or connect()
+        self.assertEqual(backend.status('abc'), 'error')
+        self.assertFalse(backend.run('wan-net/ping-rce:latest', {}))
+        # Daemon yo'q - RECONNECT_INTERVAL ichida qayta ulanishga urinmaydi
+        self.assertEqual(len(attempts), 1)
+
+
+class ChallengeImageTests(FakeDockerMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.context = Path(root.name) / 'ping_rce'
+        self.context.mkdir()
+        (self.context / 'Dockerfile').write_text('FROM python:3.9-slim\n')
+        (self.context / 'app.py').write_text('print(1)\n')
+        self.contexts = images.discover(root.name)
+        self.challenge = make_challenge(docker_image_name='wan-net/ping-rce:latest')
+
+    def sync(self):
+        return [r.action for r in images.sync_images(self.contexts, ['local'])]
+
+    def test_unchanged_context_is_not_rebuilt(self):
+        self.assertEqual([ctx.image for ctx in self.contexts], ['wan-net/ping-rce:latest'])
+        self.assertEqual(self.sync(), ['built'])
+        self.assertEqual(self.sync(), ['cached'])
+        self.assertEqual(self.docker.build_calls, 1)
+        self.challenge.refresh_from_db()
+        self.assertEqual(self.challenge.docker_image_digest, self.docker.images['wan-net/ping-rce:latest']['digest'])
+
+        (self.context / 'app.py').write_text('print(2)\n')
+        self.assertEqual(self.sync(), ['built'])
+        self.challenge.refresh_from_db()
+        self.assertEqual(self.challenge.docker_image_digest, self.docker.images['wan-net/ping-rce:latest']['digest'])
+
+    def test_images_without_context_are_pulled(self):
+        make_challenge(docker_image_name='nginx:1.27')
+        self.assertEqual([ctx.image for ctx in images.challenge_images()], ['nginx:1.27'])
+        self.assertEqual([r.action for r in images.sync_images(images.challenge_images(), ['local'])], ['pulled'])
+        self.assertEqual(self.docker.pull_calls, 1)
+
+
+class TeamLabTests(FakeDockerMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.tournament = make_tournament(mode='TEAM')
+        self.challenge = make_challenge(docker_image_name='wan-net/ping-rce:latest', tournament=self.tournament)
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.team = Team.objects.create(name='Root', captain=self.alice)
+        self.team.members.add(self.alice, self.bob)
+
+    def as_user(self, user, name):
+        self.client.force_login(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.get(reverse(name, args=[self.challenge.id]))
+
+    def status(self, user):
+        self.client.force_login(user)
+        return self.client.get(reverse('lab_status', args=[self.challenge.id])).json()
+
+    def test_members_share_one_container_until_last_leaves(self):
+        self.as_user(self.alice, 'start_container')
+        self.as_user(self.bob, 'start_container')
+        self.assertEqual(len(self.docker.containers), 1)
+        self.assertEqual(self.status(self.alice)['url'], self.status(self.bob)['url'])
+        row = ActiveContainer.objects.get()
+        self.assertEqual(row.team, self.team)
+        self.assertEqual(row.holders.count(), 2)
+
+        self.as_user(self.alice, 'stop_container')
+        self.assertEqual(len(self.docker.containers), 1)
+        self.as_user(self.bob, 'stop_container')
+        self.assertEqual(self.docker.containers, {})
+        self.assertFalse(ActiveContainer.objects.exists())
+
+    def test_kicked_and_departed_members_release_team_lab(self):
+        carol = User.objects.create_user('carol')
+        self.team.members.add(carol)
+        for user in (self.alice, self.bob, carol):
+            self.as_user(user, 'start_container')
+        row = ActiveContainer.objects.get()
+
+        self.client.force_login(self.alice)
+        self.client.post(reverse('kick_team_member', args=[self.bob.id]))
+        self.assertFalse(team_labs.user_labs(self.bob).exists())
+        self.assertEqual(len(self.docker.containers), 1)
+
+        # Oxirgi ushlab turgan a'zo chiqsa konteyner to'xtatiladi
+        self.as_user(self.alice, 'stop_container')
+        self.client.force_login(carol)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('leave_team'))
+        self.assertFalse(row.holders.exists())
+        self.assertEqual(self.docker.containers, {})
+        self.assertFalse(ActiveContainer.objects.exists())
+
+    def test_sharing_can_be_disabled(self):
+        self.tournament.share_team_labs = False
+        self.tournament.save()
+        self.as_user(self.alice, 'start_container')
+        self.as_user(self.bob, 'start_container')
+        self.assertEqual(len(self.docker.containers), 2)
+
+
+def free_local_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def serve_http_later(port, delay):
+    """delay soniyadan keyin portni tinglab, bitta HTTP javob qaytaradigan server."""
+    def run():
+        time.sleep(delay)
+        with socket.socket() as server:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind(('127.0.0.1', port))
+            server.listen()
+            server.settimeout(5)
+            conn, _ = server.accept()
+            with conn:
+                conn.recv(1024)
+                conn.sendall(b"HTTP/1.0 200 OK\r\n\r\n")
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+class ReadinessTests(FakeDockerMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.challenge = make_challenge(docker_image_name='wan-net/ping-rce:latest')
+        self.user = User.objects.create_user('agent')
+
+    def pending_row(self, port):
+        return ActiveContainer.objects.create(
+            user=self.user, challenge=self.challenge, container_id='', host_port=port, state=ActiveContainer.PENDING
+        )
+
+    def test_waits_for_app_before_running(self):
+        port = free_local_port()
+        server = serve_http_later(port, 0.3)
+        with self.settings(CTF_LAB_READINESS=True, CTF_LAB_READY_TIMEOUT=3):
+            row = self.pending_row(port)
+            jobs.start_lab(row.pk)
+        server.join()
+        row.refresh_from_db()
+        self.assertEqual(row.state, ActiveContainer.RUNNING)
+        self.assertIsNotNone(row.ready_at)
+        self.assertGreaterEqual(row.probe_latency_ms, 250)
+
+        # Statistika qator o'chirilgandan keyin ham qoladi
+        row.delete()
+        stats = readiness.latency_stats()[self.challenge.id]
+        self.assertEqual((stats['count'], stats['failed']), (1, 0))
+        self.assertGreaterEqual(stats['max_ms'], 250)
+
+    def test_unresponsive_lab_fails_and_is_stopped(self):
+        with self.settings(CTF_LAB_READINESS=True, CTF_LAB_READY_TIMEOUT=0.5):
+            row = self.pending_row(free_local_port())
+            jobs.start_lab(row.pk)
+        row.refresh_from_db()
+        self.assertEqual(row.state, ActiveContainer.FAILED)
+        self.assertEqual(self.docker.containers, {})
+        self.assertEqual(readiness.latency_stats()[self.challenge.id]['failed'], 1)
+
+class PortAllocatorTests(TestCase):
+    def setUp(self):
+        self.challenge = make_challenge(docker_image_name='wan-net/ping-rce:latest')
+
+    def test_lease_skips_port_taken_by_other_worker(self):
+        first = ports.PortAllocator(20000, 20004)
+        second = ports.PortAllocator(20000, 20004)
+        second.reload()  # free-list ikkala "process"da ham bir xil
+
+        a = first.lease(user=None, challenge=self.challenge, container_id='')
+        b = second.lease(user=None, challenge=self.challenge, container_id='')
+        self.assertEqual(a.host_port, 20000)
+        self.assertEqual(b.host_port, 20001)
+
+    def test_exhausted_range_and_release(self):
+        allocator = ports.PortAllocator(20000, 20001)
+        leases = [allocator.lease(user=None, challenge=self.challenge, container_id='') for _ in range(2)]
+        self.assertIsNone(allocator.lease(user=None, challenge=self.challenge, container_id=''))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            leases[0].delete()
+        self.assertEqual(allocator.lease(user=None, challenge=self.challenge, container_id='').host_port, 20000)
+
+    def test_other_constraint_returns_port(self):
+        allocator = ports.PortAllocator(20000, 20004)
+        user = User.objects.create_user('agent')
+        allocator.lease(user=user, challenge=self.challenge, container_id='')
+        free = allocator.free_count()
+        with self.assertRaises(IntegrityError):
+            allocator.lease(user=user, challenge=self.challenge, container_id='')
+        self.assertEqual(allocator.free_count(), free)
+
+    def test_concurrent_allocate_is_unique(self):
+        allocator = ports.PortAllocator(20000, 20999)
+        allocator.reload()
+        results = []
+
+        def worker():
+            results.extend(allocator.allocate() for _ in range(50))
+
+        threads = [threading.Thread(target=worker) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(results)), 1000)
+
+    def test_many_workers_with_stale_free_lists(self):
+        # 4 ta worker bir xil (eskirgan) free-list bilan: to'qnashuvlar UNIQUE orqali hal bo'ladi
+        workers = [ports.PortAllocator(20000, 20099) for _ in range(4)]
+        for allocator in workers:
+            allocator.reload()
+
+        leases = [workers[i % 4].lease(user=None, challenge=self.challenge, container_id='') for i in range(60)]
+        used = [lease.host_port for lease in leases]
+        self.assertEqual(len(set(used)), 60)
+
+
+class FirstBloodTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        writer, attempt_log.writer = attempt_log.writer, attempt_log.AttemptWriter(background=False)
+        self.addCleanup(setattr, attempt_log, 'writer', writer)
+        self.challenge = make_challenge(points=10, flag_hash=hashlib.sha256(b'flag{fb}').hexdigest())
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+
+    def test_stale_reader_does_not_take_first_blood(self):
+        # Ikkinchi yechim first blood yo'q paytda o'qilgan (eskirgan) challenge obyekti bilan
+        stale_a, stale_b = Challenge.objects.get(), Challenge.objects.get()
+        self.assertTrue(stale_a.register_solve(self.alice))
+        self.assertFalse(stale_b.register_solve(self.bob))
+        self.challenge.refresh_from_db()
+        self.assertEqual(self.challenge.solve_count, 2)
+        self.assertEqual(self.challenge.first_blood_user, self.alice)
+
+    def test_solve_view_and_delete(self):
+        for user in (self.alice, self.bob):
+            self.client.force_login(user)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse('challenge_detail', args=[self.challenge.id]), {'flag': 'flag{fb}'})
+        self.assertEqual(CTFProfile.objects.get(user=self.alice).total_points, 60)
+        self.assertEqual(CTFProfile.objects.get(user=self.bob).total_points, 10)
+
+        response = self.client.get(reverse('challenges'))
+        self.assertEqual(response.context['challenges'][0].solve_count, 2)
+
+        SolvedChallenge.objects.get(user=self.alice).delete()
+        self.challenge.refresh_from_db()
+        self.assertEqual(self.challenge.solve_count, 1)
+        self.assertEqual(self.challenge.first_blood_user, self.bob)
+        # Bonus yangi egaga jurnal orqali o'tadi - reconcile farq topmaydi
+        self.assertEqual(CTFProfile.objects.get(user=self.alice).total_points, 0)
+        self.assertEqual(CTFProfile.objects.get(user=self.bob).total_points, 60)
+        self.assertEqual(ledger.score_drift(), {'profiles': [], 'registrations': []})
+
+
+class ScoreLedgerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        writer, attempt_log.writer = attempt_log.writer, attempt_log.AttemptWriter(background=False)
+        self.addCleanup(setattr, attempt_log, 'writer', writer)
+        self.tournament = make_tournament()
+        self.challenge = make_challenge(points=100, tournament=self.tournament, flag_hash=hashlib.sha256(b'flag{t}').hexdigest())
+        self.user = User.objects.create_user('agent')
+        self.registration = TournamentRegistration.objects.create(tournament=self.tournament, user=self.user)
+        self.client.force_login(self.user)
+
+    def totals(self):
+        return (
+            CTFProfile.objects.get(user=self.user).total_points,
+            TournamentRegistration.objects.get(pk=self.registration.pk).score,
+        )
+
+    def test_solve_revoke_and_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('challenge_detail', args=[self.challenge.id]), {'flag': 'flag{t}'})
+        self.assertEqual(self.totals(), (150, 150))
+        self.assertEqual(
+            sorted(ScoreEvent.objects.values_list('kind', 'points')),
+            [(ScoreEvent.FIRST_BLOOD, 50), (ScoreEvent.SOLVE, 100)],
+        )
+        self.assertEqual(ranking.rank_of(self.user), 1)
+
+        # Hisoblagichlar buzilsa ham jurnaldan tiklanadi
+        CTFProfile.objects.filter(user=self.user).update(total_points=7)
+        TournamentRegistration.objects.update(score=7)
+        self.assertEqual(ledger.rebuild_totals(), (1, 1))
+        self.assertEqual(self.totals(), (150, 150))
+
+        # Bekor qilish bonus bilan birga ikkala hisobdan ham qaytaradi
+        SolvedChallenge.objects.get(user=self.user).delete()
+        self.assertEqual(self.totals(), (0, 0))
+        self.assertEqual(ScoreEvent.objects.get(kind=ScoreEvent.REVOKE).points, -150)
+        ledger.rebuild_totals()
+        self.assertEqual(self.totals(), (0, 0))
+
+    def test_deleting_user_keeps_other_totals(self):
+        other = User.objects.create_user('other')
+        ledger.award_solve(other, self.challenge, first_blood=True)
+        ledger.award_solve(self.user, self.challenge, registration=self.registration)
+        other.delete()
+        ledger.rebuild_totals()
+        self.assertEqual(self.totals(), (100, 100))
+
+    def test_reconcile_fixes_only_drifted_rows(self):
+        ledger.award_solve(self.user, self.challenge, first_blood=True, registration=self.registration)
+        other = User.objects.create_user('other')
+        CTFProfile.objects.filter(user=self.user).update(total_points=100)  # bonus yo'qolgan
+
+        drift = ledger.score_drift()
+        self.assertEqual(drift['profiles'], [(self.user.ctf_profile.pk, 100, 150)])
+        self.assertEqual(drift['registrations'], [])
+
+        # O'qish va tuzatish orasida kelgan yechim ustidan yozilmaydi
+        CTFProfile.objects.filter(user=self.user).update(total_points=F('total_points') + 10)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(ledger.apply_drift(drift, batch_size=1), (1, 0))
+        self.assertEqual(self.totals(), (160, 150))
+        self.assertEqual(sum(q['sql'].startswith('UPDATE "ctf_ctfprofile"') for q in queries.captured_queries), 1)
+        self.assertEqual(CTFProfile.objects.get(user=other).total_points, 0)
+
+
+    def test_legacy_drift_is_reported_after_backfill_cleanup(self):
+        from django.apps import apps
+        cleanup = importlib.import_module('ctf.migrations.0029_drop_backfill_adjustments')
+
+        # Eski xato: yechim o'chirilgan, lekin profil/registratsiyada ball (bonus bilan) qolgan
+        CTFProfile.objects.filter(user=self.user).update(total_points=150)
+        TournamentRegistration.objects.filter(pk=self.registration.pk).update(score=150)
+        # 0024 ning avvalgi backfill'i farqni jurnalga ko'chirgan edi
+        ScoreEvent.objects.create(kind=ScoreEvent.ADJUST, user=self.user, points=150)
+        ScoreEvent.objects.create(kind=ScoreEvent.ADJUST, registration=self.registration, points=150)
+        self.assertEqual(ledger.score_drift(), {'profiles': [], 'registrations': []})
+
+        cleanup.drop_backfill_adjustments(apps, None)
+        drift = ledger.score_drift()
+        self.assertEqual(drift['profiles'], [(self.user.ctf_profile.pk, 150, 0)])
+        self.assertEqual(drift['registrations'], [(self.registration.pk, 150, 0)])
+        ledger.apply_drift(drift)
+        self.assertEqual(self.totals(), (0, 0))
+
+class ProfileProvisioningTests(TestCase):
+    def test_signup_creates_both_profiles_once(self):
+        # user + CTFProfile + kurs UserProfile + reyting versiyasi (UPDATE, yangi qiymatni SELECT)
+        with self.assertNumQueries(5):
+            user = User.objects.create_user('newbie')
+        self.assertTrue(CTFProfile.objects.filter(user=user).exists())
+        self.assertTrue(UserProfile.objects.filter(user=user).exists())
+
+    def test_user_save_does_not_touch_profiles(self):
+        user = User.objects.create_user('agent')
+        with self.assertNumQueries(1):
+            user.last_login = timezone.now()
+            user.save(update_fields=['last_login'])
+
+    def test_telegram_login_queries(self):
+        user = User.objects.create_user('agent')
+        CTFProfile.objects.filter(user=user).update(telegram_id=42)
+        TelegramAuth.objects.create(telegram_id=42, username='agent', access_code='123456')
+
+        # auth code + profile(+user) + sessiya (3) + last_login + code delete + sessiya yangilash
+        # + savepointlar (6). Profillarga hech qanday so'rov yo'q.
+        with CaptureQueriesContext(connection) as queries, self.assertNumQueries(13):
+            response = self.client.post(reverse('login'), {'access_code': '123456'})
+        self.assertRedirects(response, reverse('ctf_home'), fetch_redirect_response=False)
+        self.assertEqual(int(self.client.session['_auth_user_id']), user.pk)
+        self.assertFalse([q for q in queries.captured_queries if 'profile' in q['sql'] and not q['sql'].startswith('SELECT')])
+
+
+class UserContextTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.team = Team.objects.create(name='Root', captain=self.alice)
+        self.team.members.add(self.alice, self.bob)
+
+    def test_team_is_one_query_per_request(self):
+        user = User.objects.get(pk=self.bob.pk)
+        with self.assertNumQueries(1):
+            ctx = user_context.UserContext(user)
+            self.assertEqual(ctx.team, self.team)
+            self.assertEqual(ctx.team, self.team)
+
+    def test_profiles_loaded_together_on_demand(self):
+        user = User.objects.get(pk=self.bob.pk)
+        with self.assertNumQueries(1):  # user + ikkala profil (JOIN)
+            ctx = user_context.UserContext(user)
+            self.assertEqual(ctx.ctf_profile, user.ctf_profile)
+            self.assertEqual(ctx.profile, user.profile)
+
+    def test_membership_and_team_changes_are_visible(self):
+        def team_of(user):
+            return user_context.UserContext(User.objects.get(pk=user.pk)).team
+
+        self.assertEqual(team_of(self.bob), self.team)
+        self.team.name = 'Root2'
+        self.team.save()
+        self.assertEqual(team_of(self.bob).name, 'Root2')
+
+        self.team.members.remove(self.bob)
+        self.assertIsNone(team_of(self.bob))
+        self.bob.teams.add(self.team)
+        self.assertEqual(team_of(self.bob), self.team)
+        self.team.members.clear()
+        self.assertIsNone(team_of(self.bob))
+        self.assertIsNone(team_of(self.alice))
+
+    def test_kicked_member_loses_team_without_invalidation(self):
+        self.assertEqual(user_context.UserContext(self.bob).team, self.team)
+        # Signalsiz o'zgarish (masalan boshqa worker yoki to'g'ridan-to'g'ri SQL)
+        Team.members.through.objects.filter(user=self.bob).delete()
+        self.assertIsNone(user_context.UserContext(User.objects.get(pk=self.bob.pk)).team)
+
+    def test_request_ctx(self):
+        self.client.force_login(self.bob)
+        response = self.client.get(reverse('team_dashboard'))
+        self.assertEqual(response.context['team'], self.team)
+        self.assertEqual(response.wsgi_request.ctx.team, self.team)
+
+        self.client.logout()
+        response = self.client.get(reverse('ctf_home'))
+        self.assertIsNone(response.wsgi_request.ctx.team)
+
+
+class SchedulerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        self.tournament = make_tournament(start_date=now + timedelta(hours=1), end_date=now + timedelta(hours=2))
+        self.cup = make_challenge(title='Cup task', tournament=self.tournament)
+        make_challenge(title='Warmup')
+
+    def listed(self):
+        response = self.client.get(reverse('challenges'))
+        return {challenge.title for challenge in response.context['challenges']}
+
+    def test_phase_and_visibility_follow_schedule(self):
+        self.assertEqual(self.tournament.phase, Tournament.UPCOMING)
+        self.assertEqual(self.cup.visibility, Challenge.TOURNAMENT)
+        self.assertEqual(self.listed(), {'Warmup'})
+
+        start, end = self.tournament.start_date, self.tournament.end_date
+        self.assertEqual(scheduler.next_transition(), start)
+        self.assertEqual(scheduler.sync(start), {'tournaments': 1, 'challenges': 0})
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.phase, Tournament.RUNNING)
+        self.assertEqual(scheduler.next_transition(start), end)
+
+        self.assertEqual(scheduler.sync(end), {'tournaments': 1, 'challenges': 1})
+        self.assertEqual(self.listed(), {'Warmup', 'Cup task'})
+        self.assertEqual(scheduler.sync(end), {'tournaments': 0, 'challenges': 0})
+
+    def test_catch_up_runs_only_when_due(self):
+        # Yangi process (bo'sh kesh) - birinchi chaqiriq catch-up qiladi
+        self.assertTrue(scheduler.catch_up())
+        with self.assertNumQueries(0):
+            self.assertFalse(scheduler.catch_up())
+        # Scheduler to'xtab qolgan bo'lsa ham chegaradan keyingi birinchi so'rov holatni tuzatadi
+        self.assertTrue(scheduler.catch_up(self.tournament.end_date + timedelta(seconds=1)))
+        self.assertEqual(Tournament.objects.get().phase, Tournament.FINISHED)
+        self.assertEqual(Challenge.objects.get(pk=self.cup.pk).visibility, Challenge.PUBLIC)
+
+    def test_listing_is_cached_until_challenges_change(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.listed()
+        with CaptureQueriesContext(connection) as warm:
+            self.listed()
+        self.assertLess(len(warm), len(cold))
+        self.assertFalse([q for q in warm.captured_queries if 'ctf_challenge' in q['sql']])
+
+        make_challenge(title='Fresh')
+        self.assertEqual(self.listed(), {'Warmup', 'Fresh'})
+
+    def test_editing_dates_and_deleting_tournament(self):
+        self.tournament.end_date = timezone.now() - timedelta(minutes=1)
+        self.tournament.start_date = self.tournament.end_date - timedelta(hours=1)
+        self.tournament.save()
+        self.assertEqual(self.tournament.phase, Tournament.FINISHED)
+        self.assertEqual(Challenge.objects.get(pk=self.cup.pk).visibility, Challenge.PUBLIC)
+
+        self.tournament.end_date = timezone.now() + timedelta(hours=1)
+        self.tournament.save()
+        self.assertEqual(self.listed(), {'Warmup'})
+        self.tournament.delete()
+        self.assertEqual(self.listed(), {'Warmup', 'Cup task'})
+
+
+class ConcurrentDBMixin:
+    """Threadli testlar: har thread o'z ulanishini ochadi, shuning uchun test bazasi faylda bo'lishi kerak (settings TEST.NAME)."""
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("In-memory SQLite bir nechta ulanishdan yozishga ruxsat bermaydi")
+        super().setUp()
+
+
+class FirstBloodStressTests(ConcurrentDBMixin, TransactionTestCase):
+    def test_parallel_correct_submissions_award_one_first_blood(self):
+        attempt_log.writer, writer = attempt_log.AttemptWriter(background=False), attempt_log.writer
+        self.addCleanup(setattr, attempt_log, 'writer', writer)
+        challenge = make_challenge(points=10, flag_hash=hashlib.sha256(b'flag{fb}').hexdigest())
+        users = [User.objects.create_user(f'user{i}') for i in range(10)]
+        url = reverse('challenge_detail', args=[challenge.id])
+        barrier = threading.Barrier(len(users), timeout=10)
+        errors = []
+
+        def submit(user):
+            try:
+                client = Client()
+                client.force_login(user)
+                barrier.wait()
+                client.post(url, {'flag': 'flag{fb}'})
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        challenge.refresh_from_db()
+        self.assertEqual(challenge.solve_count, len(users))
+        points = sorted(CTFProfile.objects.values_list('total_points', flat=True))
+        self.assertEqual(points, [10] * (len(users) - 1) + [60])
+        self.assertEqual(CTFProfile.objects.get(user=challenge.first_blood_user).total_points, 60)
+
+
+    def test_parallel_register_solve_with_stale_objects(self):
+        challenge = make_challenge(points=10)
+        users = [User.objects.create_user(f'racer{i}') for i in range(10)]
+        barrier = threading.Barrier(len(users), timeout=10)
+        wins, errors = [], []
+
+        def register(user):
+            try:
+                stale = Challenge.objects.get(pk=challenge.pk)  # first blood yo'q paytda o'qilgan
+                barrier.wait()
+                wins.append((user.pk, stale.register_solve(user)))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=register, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        winners = [user_id for user_id, won in wins if won]
+        self.assertEqual(len(winners), 1)
+        challenge.refresh_from_db()
+        self.assertEqual(challenge.solve_count, len(users))
+        self.assertEqual(challenge.first_blood_user_id, winners[0])
+
+
+class PortLeaseStressTests(ConcurrentDBMixin, FakeDockerMixin, TransactionTestCase):
+    def test_concurrent_starts_get_unique_ports(self):
+        challenge = make_challenge(docker_image_name='wan-net/ping-rce:latest')
+        users = [User.objects.create_user(f'user{i}', password='pw') for i in range(20)]
+        url = reverse('start_container', args=[challenge.id])
+        barrier = threading.Barrier(len(users), timeout=10)
+        errors = []
+
+        def start(user):
+            try:
+                client = Client()
+                client.force_login(user)
+                barrier.wait()
+                client.get(url)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=start, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        used = list(ActiveContainer.objects.values_list('host_port', flat=True))
+        self.assertEqual(len(used), len(users))
+        self.assertEqual(len(set(used)), len(users))
+        bound = [list(c.ports.values())[0] for c in self.docker.containers.values()]
+        self.assertCountEqual(bound, used)
+
+
+@override_settings(CTF_LAB_CAPACITY=2)
+class AdmissionStressTests(ConcurrentDBMixin, FakeDockerMixin, TransactionTestCase):
+    def test_parallel_admit_respects_capacity(self):
+        challenge = make_challenge(docker_image_name='wan-net/ping-rce:latest')
+        for i in range(6):
+            ports.lease(user=User.objects.create_user(f'user{i}'), challenge=challenge, container_id='', state=ActiveContainer.QUEUED)
+        barrier = threading.Barrier(6, timeout=10)
+        admitted, errors = [], []
+
+        def admit():
+            try:
+                barrier.wait()
+                admitted.append(admission.admit())
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=admit) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sum(admitted), 2)
+        self.assertEqual(ActiveContainer.objects.exclude(state=ActiveContainer.QUEUED).count(), 2)
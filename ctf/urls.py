@@ -8,6 +8,9 @@ urlpatterns = [
     path('challenge/<int:challenge_id>/render/', views.challenge_render_view, name='challenge_render'),
     path('challenge/<int:challenge_id>/start/', views.start_container_view, name='start_container'),
     path('challenge/<int:challenge_id>/stop/', views.stop_container_view, name='stop_container'),
+    path('challenge/<int:challenge_id>/extend/', views.extend_container_view, name='extend_container'),
+    path('challenge/<int:challenge_id>/lab-status/', views.lab_status, name='lab_status'),
+    path('labs/pool/metrics/', views.lab_pool_metrics, name='lab_pool_metrics'),
     path('leaderboard/', views.leaderboard, name='leaderboard'),
     path('profile/', views.profile, name='ctf_profile'),
     
@@ -23,6 +26,8 @@ urlpatterns = [
     path('tournament/<int:tournament_id>/', views.tournament_detail, name='tournament_detail'),
     path('tournament/<int:tournament_id>/register/', views.register_tournament, name='register_tournament'),
     path('tournament/<int:tournament_id>/leaderboard/', views.tournament_leaderboard, name='tournament_leaderboard'),
+    path('tournament/<int:tournament_id>/stream/', views.tournament_stream, name='tournament_stream'),
+    path('tournament/<int:tournament_id>/live/', views.tournament_live, name='tournament_live'),
     
     # Team System
     path('team/', views.team_dashboard, name='team_dashboard'),
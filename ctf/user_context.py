@@ -0,0 +1,72 @@
+"""
+So'rov doirasidagi foydalanuvchi konteksti: jamoa va profillar.
+
+Viewlar `request.user.teams.first()` ni qayta-qayta chaqirardi, shablonlar esa
+`user.ctf_profile` / `user.profile` ga dangasa murojaat qilardi - har biri
+alohida so'rov. UserContextMiddleware `request.ctx` ni o'rnatadi; har bir
+qiymat birinchi murojaatda yuklanadi va so'rov oxirigacha qayta ishlatiladi:
+
+    request.ctx.team                       - bitta so'rov
+    request.ctx.ctf_profile, .profile      - ikkalasi bitta JOIN so'rovi bilan
+
+Jamoa ruxsatlar uchun ishlatiladi (kapitan, jamoa laboratoriyasi), shuning
+uchun hech narsa so'rovlar orasida keshlanmaydi: chiqarilgan a'zo yoki
+almashtirilgan kapitan barcha worker'larda darhol ruxsatini yo'qotadi.
+"""
+
+_UNSET = object()
+
+
+def _load_team(user):
+    from .models import Team
+
+    # Avvalgi `user.teams.first()` bilan bir xil: birinchi qo'shilgan jamoa
+    return Team.objects.filter(members=user).order_by('pk').first()
+
+
+def _load_profiles(user):
+    from django.contrib.auth.models import User
+
+    loaded = User.objects.select_related('ctf_profile', 'profile').get(pk=user.pk)
+    data = {
+        'ctf_profile': getattr(loaded, 'ctf_profile', None),
+        'profile': getattr(loaded, 'profile', None),
+    }
+    # user.ctf_profile / user.profile qayta so'rov yubormasligi uchun
+    for name, value in data.items():
+        related = getattr(User, name).related
+        if value is not None and not related.is_cached(user):
+            related.set_cached_value(user, value)
+            related.field.set_cached_value(value, user)
+    return data
+
+
+class UserContext:
+    """request.ctx - anonim foydalanuvchi uchun barcha qiymatlar None."""
+
+    def __init__(self, user):
+        self._user = user
+        self._team = _UNSET
+        self._profiles = None
+
+    @property
+    def team(self):
+        if self._team is _UNSET:
+            self._team = _load_team(self._user) if self._user.is_authenticated else None
+        return self._team
+
+    def _get_profiles(self):
+        if self._profiles is None:
+            if self._user.is_authenticated:
+                self._profiles = _load_profiles(self._user)
+            else:
+                self._profiles = {'ctf_profile': None, 'profile': None}
+        return self._profiles
+
+    @property
+    def ctf_profile(self):
+        return self._get_profiles()['ctf_profile']
+
+    @property
+    def profile(self):
+        return self._get_profiles()['profile']
@@ -4,82 +4,102 @@ from django.contrib import messages
 from django.utils import timezone
 from .models import Challenge, SolvedChallenge, CTFProfile, ChallengeAttempt, Tournament, Team, TournamentRegistration, ActiveContainer
 import hashlib
-from . import docker_utils
-import random
-import socket
-
-from django.http import HttpResponse
+from . import search
+from . import progress
+from . import ranking
+from . import scoreboard
+from . import live
+from . import lab_pool
+from . import ports
+from . import jobs
+from . import container_status
+from . import reaper
+from . import admission
+from . import nodes
+from . import team_labs
+from . import readiness
+from . import attempt_log
+from . import ratelimit
+from . import ledger
+from . import scheduler
+
+from django.http import HttpResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.contrib.admin.views.decorators import staff_member_required
 
 def ctf_home(request):
     return render(request, 'ctf/ctf_home.html')
 
-from django.db.models import Q, Sum, Count
-from django.db import transaction
-from django.core.paginator import Paginator
+from django.db.models import Count
+from django.core.cache import cache
+from django.db import transaction, IntegrityError
+from .pagination import KeysetPaginator, OffsetCursorPaginator
 from kurs.models import Course, Lesson, LessonProgress # Import from 'kurs' app
 
 
 def challenges(request):
-    # 1. User Progress (Pre-calculation)
+    # 1. User Progress (bitset kesh, ChallengeAttempt jadvali skan qilinmaydi)
     if request.user.is_authenticated:
-        user_solved_ids = set(SolvedChallenge.objects.filter(user=request.user).values_list('challenge_id', flat=True))
-        user_attempted_ids = set(ChallengeAttempt.objects.filter(user=request.user).values_list('challenge_id', flat=True))
+        user_progress = progress.load(request.user.id)
     else:
-        user_solved_ids = set()
-        user_attempted_ids = set()
+        user_progress = progress.UserProgress()
 
-    # Base QuerySet:
-    # 1. Turnirga bog'lanmagan (Public)
-    # 2. YOKI Turniri tugagan (Archived)
-    queryset = Challenge.objects.filter(is_active=True).filter(
-        Q(tournament__isnull=True) | 
-        Q(tournament__end_date__lt=timezone.now())
-    ).order_by('-created_at')
+    # Base QuerySet: turnirga bog'lanmagan yoki turniri tugagan (visibility, ctf/scheduler.py)
+    scheduler.catch_up()
+    queryset = Challenge.objects.filter(is_active=True, visibility=Challenge.PUBLIC).order_by('-created_at')
     
     # 2. Search Logic
     query = request.GET.get('q', '').strip()
     if query:
-        queryset = queryset.filter(
-            Q(title__icontains=query) | 
-            Q(description__icontains=query) |
-            Q(category__icontains=query)
-        )
+        # FTS indeks orqali (relevantlik bo'yicha saralangan)
+        queryset = search.filter_queryset(queryset, query)
 
     # 3. Filter by Category (New logic)
     category_filter = request.GET.get('category', '').strip()
     if category_filter and category_filter != 'Kategoriyalar':
         if category_filter == 'solved':
             if request.user.is_authenticated:
-                queryset = queryset.filter(id__in=user_solved_ids)
+                queryset = queryset.filter(id__in=user_progress.solved_ids())
             else:
                 queryset = queryset.none()
         elif category_filter == 'failed':
             if request.user.is_authenticated:
-                failed_ids = user_attempted_ids - user_solved_ids
-                queryset = queryset.filter(id__in=failed_ids)
+                queryset = queryset.filter(id__in=user_progress.failed_ids())
             else:
                 queryset = queryset.none()
         else:
             queryset = queryset.filter(category=category_filter)
 
-    # 5. Pagination
-    paginator = Paginator(queryset, 12) # Show 12 items per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # 5. Pagination (cursor-based, OFFSET va qo'shimcha COUNT siz)
+    cursor = request.GET.get('cursor')
+    # Qidiruv va shaxsiy filtrlarsiz sahifa hamma uchun bir xil - keyingi o'tishgacha keshlanadi
+    cache_key = None
+    if not query and category_filter not in ('solved', 'failed'):
+        cache_key = scheduler.listing_key('page', category_filter, cursor or '')
+    cached = cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        page_obj, total_challenges, displayed_count = cached
+    else:
+        if query:
+            # Relevantlik bo'yicha saralangan natijalar - barqaror kalit yo'q
+            paginator = OffsetCursorPaginator(queryset, 12)
+        else:
+            paginator = KeysetPaginator(queryset, ('-created_at', '-id'), 12) # Show 12 items per page
+        page_obj = paginator.get_page(cursor)
+        total_challenges = Challenge.objects.filter(is_active=True).count()
+        displayed_count = queryset.count()
+        if cache_key:
+            cache.set(cache_key, (page_obj, total_challenges, displayed_count), scheduler.listing_timeout())
 
     # We can attach 'is_solved' attribute to objects on the fly for template convenience
     # Calculate starting index for sequential numbering
-    start_index = page_obj.start_index() if page_obj.paginator.count > 0 else 0
+    start_index = page_obj.start_rank
     
     for i, challenge in enumerate(page_obj):
-        challenge.is_solved = challenge.id in user_solved_ids
+        challenge.is_solved = user_progress.is_solved(challenge.id)
         challenge.serial_number = start_index + i
         
         # If not solved but attempted -> Failed status
-        if not challenge.is_solved and challenge.id in user_attempted_ids:
-            challenge.has_failed_attempt = True
-        else:
-            challenge.has_failed_attempt = False
+        challenge.has_failed_attempt = user_progress.has_failed(challenge.id)
 
     # Get all categories defined in the Model
     all_categories = []
@@ -98,30 +118,40 @@ def challenges(request):
         'query': query,
         'selected_category': category_filter,
         'all_categories': all_categories,
-        'total_challenges': Challenge.objects.filter(is_active=True).count(),
-        'displayed_count': queryset.count()
+        'total_challenges': total_challenges,
+        'displayed_count': displayed_count
     }
 
     return render(request, 'ctf/challenges.html', context)
 
+# Noto'g'ri flaglar: masala bo'yicha 5 ta/daqiqa va umumiy 30 ta/daqiqa (settings.CTF_RATELIMITS).
+# Har POST oldindan atomar hisoblanadi; to'g'ri flag va qayta yuborishda hisob qaytariladi
+FLAG_PER_CHALLENGE = ratelimit.RateLimit(
+    'flag', 5, 60, key=lambda request, challenge_id, **kwargs: f"{request.user.pk}:{challenge_id}",
+)
+FLAG_PER_USER = ratelimit.RateLimit('flag-user', 30, 60)
+
+
 @login_required
+@ratelimit.ratelimit(FLAG_PER_USER, FLAG_PER_CHALLENGE)
 def challenge_detail(request, challenge_id):
     challenge = get_object_or_404(Challenge, id=challenge_id)
     now = timezone.now()
 
     # --- TOURNAMENT SECURITY & TEAM LOGIC ---
+    scheduler.catch_up(now)  # bosqich o'tishi kechikmasin (odatda faqat cache.get)
     tournament = challenge.tournament
-    user_team = request.user.teams.first()
+    user_team = request.ctx.team
     
-    # 1. Security Check if Tournament Challenge
+    # 1. Security Check if Tournament Challenge (bosqich - tournament.phase, ctf/scheduler.py)
     if tournament:
         # 1. Boshlanmagan yoki Nofaol
-        if not tournament.is_active or now < tournament.start_date:
+        if not tournament.is_active or tournament.phase == Tournament.UPCOMING:
              messages.error(request, "Bu masala hozir yopiq.")
              return redirect('tournaments')
         
         # 2. Agar turnir tugagan bo'lsa:
-        if now > tournament.end_date:
+        if tournament.phase == Tournament.FINISHED:
              # Agar Turnir sahifasidan kelgan bo'lsa -> TAQIQLASH
              if request.GET.get('from_tournament') == 'true':
                  messages.error(request, "Turnir vaqti tugadi! Endi masalalarni yecha olmaysiz.")
@@ -153,33 +183,31 @@ def challenge_detail(request, challenge_id):
     # 3. Docker Status (If Docker Challenge)
     active_container = None
     if challenge.docker_image_name:
-        active_container = ActiveContainer.objects.filter(user=request.user, challenge=challenge).first()
+        lab_pool.pool.refill_async(challenge)
+        lab_team = team_labs.lab_team(user_team, challenge)
+        active_container = team_labs.find_lab(request.user, challenge, lab_team)
         # Verify it's actually running
-        if active_container:
-            status = docker_utils.get_container_status(active_container.container_id)
-            if status != "running":
-                # Auto-clean ghost records
+        if active_container and active_container.state == ActiveContainer.QUEUED:
+            active_container.queue_position = admission.queue_position(active_container)
+        elif active_container and active_container.state == ActiveContainer.FAILED:
+            messages.error(request, active_container.error or "Konteynerni ishga tushirishda xatolik!")
+            active_container.delete()
+            active_container = None
+        elif active_container and active_container.state == ActiveContainer.RUNNING:
+            # Holat event'lar bilan yangilanadigan cache dan o'qiladi (Docker API ga murojaat yo'q)
+            status = container_status.get_status(active_container.container_id, active_container.node)
+            if status in container_status.GONE_STATUSES:
+                # Auto-clean ghost records (qolganlarini reconciler bitta pass da tozalaydi)
                 active_container.delete()
                 active_container = None
             else:
-                active_container.url = f"http://127.0.0.1:{active_container.host_port}"
+                active_container.url = nodes.registry.public_url(active_container)
+                reaper.touch(active_container, now)
 
     if request.method == 'POST':
-        # --- ANTI-BRUTE-FORCE ---
-        # 5 attempts in last 1 minute
-        fail_count = ChallengeAttempt.objects.filter(
-            user=request.user, 
-            challenge=challenge,
-            is_correct=False,
-            timestamp__gte=now - timedelta(minutes=1)
-        ).count()
-        
-        if fail_count >= 5:
-            messages.error(request, "Juda ko'p xato urinishlar! Iltimos, 1 daqiqa kuting.")
-            return redirect('challenge_detail', challenge_id=challenge.id)
-        # ------------------------
-
+        # Anti-brute-force: @ratelimit (bazaga so'rovsiz); faqat noto'g'ri flag hisobda qoladi
         if is_solved:
+            ratelimit.undo_request(request)
             messages.info(request, "Bu masalani allaqachon yechgansiz!")
             return redirect('challenge_detail', challenge_id=challenge.id)
 
@@ -187,66 +215,55 @@ def challenge_detail(request, challenge_id):
         hashed_input = hashlib.sha256(flag_input.encode()).hexdigest()
         is_correct = (hashed_input == challenge.flag_hash)
         
-        # Log attempt
-        try:
-            ChallengeAttempt.objects.create(
-                user=request.user, 
-                challenge=challenge, 
-                input_flag=flag_input,
-                is_correct=is_correct
-            )
-        except:
-            pass
+        # Log attempt (write-behind: bufer bulk_create bilan yoziladi, ctf/attempt_log.py)
+        attempt_log.writer.record(request.user.id, challenge.id, flag_input, is_correct)
+        progress.record_attempt(request.user.id, challenge.id)
 
         if is_correct:
+            ratelimit.undo_request(request)
             try:
                 with transaction.atomic():
-                    # Check First Blood (Before creating this solve record)
-                    # We check if ANY solve exists for this challenge
-                    is_first_blood = not SolvedChallenge.objects.filter(challenge=challenge).exists()
-                    bonus_points = 50 if is_first_blood else 0
-                    
                     # A. Record personal solve
                     SolvedChallenge.objects.create(user=request.user, challenge=challenge)
+
+                    # First Blood: solve_count bilan birga shartli UPDATE (parallel yechimlardan faqat bittasi)
+                    is_first_blood = challenge.register_solve(request.user)
+                    bonus_points = ledger.FIRST_BLOOD_BONUS if is_first_blood else 0
+                    user_id = request.user.id
+                    transaction.on_commit(lambda: progress.record_solve(user_id, challenge.id))
                     
-                    # B. Scoring
-                    points_to_add = challenge.points + bonus_points
-                    
+                    # B. Scoring: ballar jurnali (ScoreEvent) + F() hisoblagichlar (ctf/ledger.py)
                     msg = ""
                     if tournament:
                         # Tournament Scoring
                         if tournament.mode == 'TEAM' and user_team:
                             reg = TournamentRegistration.objects.get(tournament=tournament, team=user_team)
-                            reg.score += points_to_add
-                            reg.save()
+                            points_to_add = ledger.award_solve(request.user, challenge, is_first_blood, reg, now)
+                            solver_name = user_team.name
                             if is_first_blood:
                                 msg = f"🩸 FIRST BLOOD! Jamoangizga {points_to_add} ball ({bonus_points} bonus) qo'shildi!"
                             else:
                                 msg = f"TABRIKLAYMIZ! Jamoangizga {points_to_add} ball qo'shildi!"
                         else:
                             reg = TournamentRegistration.objects.get(tournament=tournament, user=request.user)
-                            reg.score += points_to_add
-                            reg.save()
+                            points_to_add = ledger.award_solve(request.user, challenge, is_first_blood, reg, now)
+                            solver_name = request.user.username
                             if is_first_blood:
                                 msg = f"🩸 FIRST BLOOD! Turnir hisobingizga {points_to_add} ball ({bonus_points} bonus) qo'shildi!"
                             else:
                                 msg = f"Turnir hisobingizga {points_to_add} ball qo'shildi!"
-                            
-                        # Update Global Profile
-                        profile, _ = CTFProfile.objects.select_for_update().get_or_create(user=request.user)
-                        profile.total_points += points_to_add
-                        profile.last_solved = now
-                        profile.save()
+
+                        # Jonli scoreboard: commit dan keyin bir marta hisoblab, barcha tomoshabinlarga
+                        transaction.on_commit(lambda: live.publish_solve(
+                            tournament, solver_name, challenge, points_to_add, is_first_blood
+                        ))
                         
                         messages.success(request, msg)
                         return redirect('tournament_detail', tournament_id=tournament.id)
                         
                     else:
                         # Regular Challenge
-                        profile, _ = CTFProfile.objects.select_for_update().get_or_create(user=request.user)
-                        profile.total_points += points_to_add
-                        profile.last_solved = now
-                        profile.save()
+                        points_to_add = ledger.award_solve(request.user, challenge, is_first_blood, solved_at=now)
                         if is_first_blood:
                              messages.success(request, f"🩸 FIRST BLOOD! Sizga {points_to_add} ball ({bonus_points} bonus) berildi.")
                         else:
@@ -266,25 +283,24 @@ def challenge_detail(request, challenge_id):
     })
 
 def leaderboard(request):
-    queryset = CTFProfile.objects.order_by('-total_points', 'last_solved')
-
-    paginator = Paginator(queryset, 20)
-    page_number = int(request.GET.get('page', 1))
-    page_obj = paginator.get_page(page_number)
+    # Sahifa xotiradagi reyting indeksidan olinadi (cursor: total_points, last_solved, id)
+    page_obj = ranking.leaderboard_page(request.GET.get('cursor'), 20)
 
-    start_rank = page_obj.start_index()
+    start_rank = page_obj.start_rank
     for i, profile in enumerate(page_obj):
         profile.rank = start_rank + i
 
+    is_first_page = not page_obj.has_previous()
     podium = []
-    if page_number == 1:
+    if is_first_page:
+        # Birinchi sahifa = ranking.top(20), podium uning boshidagi 3 tasi
         items = list(page_obj)
         podium = items[:3]
 
     return render(request, 'ctf/leaderboard_v2.html', {
         'page_obj': page_obj,
         'podium': podium,
-        'is_first_page': page_number == 1,
+        'is_first_page': is_first_page,
         'is_paginated': page_obj.has_other_pages(),
     })
 
@@ -305,8 +321,11 @@ def profile(request):
 
     solved_challenges = SolvedChallenge.objects.filter(user=request.user).select_related('challenge').order_by('-solved_at')
     
-    # Calculate rank
-    rank = CTFProfile.objects.filter(total_points__gt=user_profile.total_points).count() + 1
+    # Calculate rank (leaderboard bilan bir xil tie-break: last_solved)
+    rank = ranking.rank_of(request.user)
+    if rank is None:
+        # Profil hozirgina yaratilgan va indeksga hali tushmagan
+        rank = len(ranking.index) + 1
     
     return render(request, 'ctf/profile.html', {
         'profile': user_profile, 
@@ -486,14 +505,14 @@ def telegram_login(request):
                     with transaction.atomic():
                         try:
                             # 1. Try to find existing profile explicitly by Telegram ID
-                            profile = CTFProfile.objects.select_for_update().get(telegram_id=telegram_id)
+                            profile = CTFProfile.objects.select_for_update().select_related('user').get(telegram_id=telegram_id)
                             user = profile.user
                             
                             # Sync Username if needed (optional)
                             if tg_username and tg_username != "Unknown" and user.username != tg_username:
                                 if not User.objects.filter(username=tg_username).exists():
                                     user.username = tg_username
-                                    user.save()
+                                    user.save(update_fields=['username'])
 
                         except CTFProfile.DoesNotExist:
                             # 2. Not found by ID. Try to find by USERNAME
@@ -504,9 +523,9 @@ def telegram_login(request):
                             
                             if user:
                                 # Found existing user by username! Link Telegram ID to this user.
-                                profile = CTFProfile.objects.select_for_update().get(user=user)
+                                profile, _ = CTFProfile.objects.select_for_update().get_or_create(user=user)
                                 profile.telegram_id = telegram_id
-                                profile.save()
+                                profile.save(update_fields=['telegram_id'])
                             else:
                                 # 3. Create new user (if not found by ID and not found by Username)
                                 
@@ -522,14 +541,9 @@ def telegram_login(request):
                                 user = User.objects.create_user(username=final_username)
                                 
                                 # Signal creates profile, we just need to update it
-                                profile = CTFProfile.objects.select_for_update().get(user=user)
-                                profile.telegram_id = telegram_id
-                                profile.save()
+                                if not CTFProfile.objects.filter(user=user).update(telegram_id=telegram_id):
+                                    raise Exception("Failed to link Telegram ID")
                         
-                        # Verify save
-                        if not CTFProfile.objects.filter(telegram_id=telegram_id).exists():
-                            raise Exception("Failed to link Telegram ID")
-
                         # Log in
                         login(request, user, backend='django.contrib.auth.backends.ModelBackend')
                         
@@ -560,12 +574,14 @@ def secret_view(request):
 
 def tournament_list(request):
     # Only show active/upcoming/recent
+    scheduler.catch_up()
     tournaments = Tournament.objects.filter(is_active=True).order_by('start_date')
     return render(request, 'ctf/tournaments.html', {'tournaments': tournaments})
 
 def tournament_detail(request, tournament_id):
-    tournament = get_object_or_404(Tournament, id=tournament_id)
     now = timezone.now()
+    scheduler.catch_up(now)
+    tournament = get_object_or_404(Tournament, id=tournament_id)
     
     # 1. Registration Status
     is_registered = False
@@ -574,7 +590,7 @@ def tournament_detail(request, tournament_id):
             is_registered = TournamentRegistration.objects.filter(tournament=tournament, user=request.user).exists()
         else:
             # Check if user's team is registered
-            user_team = request.user.teams.first()
+            user_team = request.ctx.team
             if user_team:
                 is_registered = TournamentRegistration.objects.filter(tournament=tournament, team=user_team).exists()
     
@@ -583,7 +599,7 @@ def tournament_detail(request, tournament_id):
     show_challenges = False
     challenges = []
     
-    if is_registered and tournament.is_active and now >= tournament.start_date:
+    if is_registered and tournament.is_active and tournament.phase != Tournament.UPCOMING:
         show_challenges = True
         
         # Load challenges
@@ -596,8 +612,7 @@ def tournament_detail(request, tournament_id):
         if request.user.is_authenticated:
             # Solved (Team aware check happens logic in loop? No, pre-calc for efficiency)
             if tournament.mode == 'TEAM' and is_registered: # and user has team
-                # Get user team again to be safe
-                user_team = request.user.teams.first()
+                user_team = request.ctx.team
                 if user_team:
                     # Get IDs solved by ANY team member
                     team_members = user_team.members.all()
@@ -615,7 +630,7 @@ def tournament_detail(request, tournament_id):
             user_attempted_ids = set(ChallengeAttempt.objects.filter(
                 user=request.user,
                 challenge__tournament=tournament
-            ).values_list('challenge_id', flat=True))
+            ).values_list('challenge_id', flat=True)) | attempt_log.writer.pending_challenge_ids(request.user.id)
             
         for ch in challenges_qs:
             ch.is_solved = ch.id in user_solved_ids
@@ -637,16 +652,19 @@ def tournament_detail(request, tournament_id):
         'challenges': challenges,
         'scoreboard': scoreboard,
         'now': now,
-        'TIME_ZONE': timezone.get_current_timezone_name()
+        'TIME_ZONE': timezone.get_current_timezone_name(),
+        'live_stream': live.stream_enabled(),
+        'live_poll_ms': live.POLL_SECONDS * 1000,
     }
     return render(request, 'ctf/tournament_detail.html', context)
 
 @login_required
 def register_tournament(request, tournament_id):
+    scheduler.catch_up()
     tournament = get_object_or_404(Tournament, id=tournament_id)
     
     # Check registration times
-    if timezone.now() > tournament.end_date:
+    if tournament.phase == Tournament.FINISHED:
         messages.error(request, "Turnir tugagan.")
         return redirect('tournament_detail', tournament_id=tournament.id)
 
@@ -655,12 +673,12 @@ def register_tournament(request, tournament_id):
         messages.success(request, f"{tournament.title} ga muvaffaqiyatli ro'yxatdan o'tdingiz!")
     else:
         # Team registration
-        user_team = request.user.teams.first()
+        user_team = request.ctx.team
         if not user_team:
             messages.error(request, "Jamoaviy turnirda qatnashish uchun avval Jamoa tuzishingiz kerak!")
             return redirect('team_dashboard')
             
-        if user_team.captain != request.user:
+        if user_team.captain_id != request.user.id:
             messages.error(request, "Faqat jamoa sardori jamoani ro'yxatdan o'tkaza oladi!")
             return redirect('tournament_detail', tournament_id=tournament.id)
             
@@ -671,7 +689,7 @@ def register_tournament(request, tournament_id):
 
 @login_required
 def team_dashboard(request):
-    user_team = request.user.teams.first()
+    user_team = request.ctx.team
     
     # Default stats
     stats_labels = ['Web', 'Crypto', 'Forensics', 'Reverse', 'Misc']
@@ -710,66 +728,64 @@ def tournament_leaderboard(request, tournament_id):
     """
     tournament = get_object_or_404(Tournament, id=tournament_id)
     
-    # Calculate Leaderboard
-    registrations = TournamentRegistration.objects.filter(tournament=tournament)
-    
-    leaderboard = []
-    
-    if tournament.mode == 'TEAM':
-        # Team Leaderboard
-        teams_processed = set()
-        for reg in registrations:
-            team = reg.team
-            if team and team.id not in teams_processed:
-                # Sum points of all members or track differently?
-                # Usually for team tournaments, points are per team (need TeamScore model or aggregate)
-                # For simplicity here: summing member profiles
-                
-                # BETTER APPROACH: Sum solved challenges for this tournament by this team
-                # But simple aggregate from Profile for now (GLOBAL SCORE)? 
-                # NO, MUST BE TOURNAMENT SCORE.
-                
-                # Let's count points from SolvedChallenge filtered by tournament
-                score = SolvedChallenge.objects.filter(
-                    user__teams=team,
-                    challenge__tournament=tournament
-                ).aggregate(total=Sum('challenge__points'))['total'] or 0
-                
-                leaderboard.append({
-                    'name': team.name, # Team Name
-                    'score': score,
-                    'is_team': True,
-                    'avatar_url': team.avatar.url if team.avatar else None
-                })
-                teams_processed.add(team.id)
-    else:
-        # Solo Leaderboard (User)
-        for reg in registrations:
-            user = reg.user
-            # Calculate score for this tournament ONLY
-            score = SolvedChallenge.objects.filter(
-                user=user,
-                challenge__tournament=tournament
-            ).aggregate(total=Sum('challenge__points'))['total'] or 0
-            
-            leaderboard.append({
-                'name': user.username,
-                'score': score,
-                'is_team': False
-            })
-
-    # Sort by score descending
-    leaderboard.sort(key=lambda x: x['score'], reverse=True)
-    
-    # Add Rank
-    for i, entry in enumerate(leaderboard):
-        entry['rank'] = i + 1
+    # Bitta so'rov: ballar TournamentRegistration.score da saqlanadi.
+    # Jonli yangilanishlar (live.py) bilan bir xil chegarada - pastdagi qatorlar eskirib qolmasin
+    leaderboard = scoreboard.tournament_standings(tournament, limit=live.SNAPSHOT_LIMIT)
 
     return render(request, 'ctf/tournament_leaderboard.html', {
         'tournament': tournament,
-        'leaderboard': leaderboard
+        'leaderboard': leaderboard,
+        'limit': live.SNAPSHOT_LIMIT,
+        'live_stream': live.stream_enabled(),
+        'live_poll_ms': live.POLL_SECONDS * 1000,
+    })
+
+@staff_member_required
+def lab_pool_metrics(request):
+    metrics = lab_pool.pool.metrics()
+    # Readiness probe kutish vaqti (ms) - challenge bo'yicha
+    metrics['readiness'] = readiness.latency_stats()
+    return JsonResponse(metrics)
+
+def tournament_live(request, tournament_id):
+    """
+    Jonli hodisalar (poll): ?after=<raqam> dan keyingi yechimlar va reyting o'zgarishlari.
+    after berilmasa - faqat joriy raqam (sahifa o'zi render qilingan).
+    """
+    tournament = get_object_or_404(Tournament, id=tournament_id)
+    live.touch(tournament.id)
+    try:
+        after = int(request.GET['after'])
+    except (KeyError, ValueError):
+        return JsonResponse({'seq': live.last_seq(tournament.id), 'events': []})
+
+    seq, events = live.read(tournament, after)
+    return JsonResponse({
+        'seq': seq,
+        'events': [{'id': n, 'type': event_type, 'data': data} for n, event_type, data in events],
     })
 
+async def tournament_stream(request, tournament_id):
+    """
+    Server-Sent Events: scoreboard o'zgarishlari, yangi yechimlar va first blood.
+    Faqat ASGI da (CTF_LIVE_STREAM); aks holda 204 - sahifa tournament_live ni poll qiladi.
+    """
+    if not live.stream_enabled():
+        return HttpResponse(status=204)
+    try:
+        tournament = await Tournament.objects.aget(id=tournament_id)
+    except Tournament.DoesNotExist:
+        raise Http404
+
+    try:
+        after = int(request.headers['Last-Event-ID'])
+    except (KeyError, ValueError):
+        after = None
+    response = StreamingHttpResponse(live.event_stream(tournament, after), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx buferlamasin
+    return response
+
 @login_required
 def create_team(request):
     if request.method == 'POST':
@@ -786,7 +802,7 @@ def create_team(request):
             return redirect('team_dashboard')
             
         # Check if user is already in a team
-        if request.user.teams.exists():
+        if request.ctx.team is not None:
             messages.error(request, "Siz allaqachon jamoaga a'zosiz. Avval undan chiqing (hozircha chiqish yo'q).")
             return redirect('team_dashboard')
 
@@ -808,7 +824,7 @@ def join_team(request):
 
         try:
             team = Team.objects.get(token=token.upper())
-            if request.user.teams.exists():
+            if request.ctx.team is not None:
                 messages.error(request, "Siz allaqachon boshqa jamoaga a'zosiz.")
             else:
                 team.members.add(request.user)
@@ -825,74 +841,114 @@ def start_container_view(request, challenge_id):
         messages.error(request, "Bu masala uchun Docker muhiti mavjud emas.")
         return redirect('challenge_detail', challenge_id=challenge.id)
 
-    # Check limit (1 container per user)
-    if ActiveContainer.objects.filter(user=request.user).exists():
-        # Check if it's the SAME challenge
-        existing = ActiveContainer.objects.filter(user=request.user, challenge=challenge).first()
-        if existing:
-             messages.info(request, "Sizda allaqachon aktiv laboratoriya mavjud.")
-             return redirect('challenge_detail', challenge_id=challenge.id)
+    # TEAM turnirida laboratoriya jamoaga tegishli - mavjud bo'lsa qo'shilamiz
+    team = team_labs.lab_team(request.ctx.team, challenge)
+    existing = team_labs.find_lab(request.user, challenge, team)
+    if existing:
+        if team:
+            team_labs.join(existing, request.user)
+            messages.success(request, "Jamoangiz laboratoriyasiga qo'shildingiz.")
         else:
-             messages.error(request, "Sizda boshqa aktiv laboratoriya mavjud. Avval uni o'chiring!")
-             return redirect('challenges') # or back
-
-    # Pick random port
-    def is_port_in_use(port):
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            return s.connect_ex(('localhost', port)) == 0
-
-    host_port = 0
-    for _ in range(10):
-        p = random.randint(20000, 30000)
-        if not is_port_in_use(p):
-            host_port = p
-            break
-    
-    if host_port == 0:
-        messages.error(request, "Bo'sh port topilmadi. Keyinroq urinib ko'ring.")
+            messages.info(request, "Sizda allaqachon aktiv laboratoriya mavjud.")
         return redirect('challenge_detail', challenge_id=challenge.id)
 
-    # Start Container
-    container = docker_utils.start_container(
-        challenge.docker_image_name, 
-        {f"{challenge.docker_port}/tcp": host_port}
-    )
+    # Check limit (1 container per user)
+    if team_labs.user_labs(request.user).exists():
+        messages.error(request, "Sizda boshqa aktiv laboratoriya mavjud. Avval uni o'chiring!")
+        return redirect('challenges') # or back
+
+    # Warm pool: tayyor konteyner bo'lsa darhol beramiz
+    pooled = lab_pool.pool.acquire(challenge, request.user, team)
+    if pooled:
+        messages.success(request, f"Laboratoriya ishga tushdi! Port: {pooled.host_port}")
+        return redirect('challenge_detail', challenge_id=challenge.id)
 
-    if container:
-        ActiveContainer.objects.create(
-            user=request.user,
-            challenge=challenge,
-            container_id=container.id,
-            host_port=host_port
-        )
-        messages.success(request, f"Laboratoriya ishga tushdi! Port: {host_port}")
+    # Port ijarasi: qator konteynerdan OLDIN yoziladi ((node, host_port) UNIQUE),
+    # shuning uchun parallel so'rovlar bir xil portni ololmaydi
+    if team:
+        lease, created = team_labs.create_or_join(ports.lease, team, challenge, request.user)
+        if lease and not created:
+            messages.success(request, "Jamoangiz laboratoriyasiga qo'shildingiz.")
+            return redirect('challenge_detail', challenge_id=challenge.id)
     else:
-        messages.error(request, "Konteynerni ishga tushirishda xatolik!")
+        try:
+            lease = ports.lease(user=request.user, challenge=challenge, container_id='', state=ActiveContainer.QUEUED)
+        except IntegrityError:
+            messages.info(request, "Sizda allaqachon aktiv laboratoriya mavjud.")
+            return redirect('challenge_detail', challenge_id=challenge.id)
+
+    if lease is None:
+        messages.error(request, "Bo'sh port topilmadi. Keyinroq urinib ko'ring.")
+        return redirect('challenge_detail', challenge_id=challenge.id)
 
+    # Sig'im bo'lsa darhol pending ga o'tadi va konteyner fonda ishga tushiriladi,
+    # aks holda navbatda kutadi; sahifa lab_status orqali holatni kuzatadi
+    admission.admit()
+    lease.refresh_from_db(fields=['state'])
+    position = admission.queue_position(lease)
+    if position:
+        messages.info(request, f"Server band. Siz navbatdasiz: {position}-o'rin.")
+    else:
+        messages.success(request, "Laboratoriya ishga tushirilmoqda...")
     return redirect('challenge_detail', challenge_id=challenge.id)
 
 @login_required
 def stop_container_view(request, challenge_id):
     challenge = get_object_or_404(Challenge, id=challenge_id)
-    active_container = get_object_or_404(ActiveContainer, user=request.user, challenge=challenge)
-    
-    success = docker_utils.stop_container(active_container.container_id)
-    if success:
-        active_container.delete()
-        messages.success(request, "Laboratoriya o'chirildi.")
-    else:
-        # Force delete if docker fails (maybe already stopped manually)
-        active_container.delete() 
-        messages.warning(request, "Laboratoriya o'chirildi (lekin Docker javob bermadi).")
+    team = team_labs.lab_team(request.ctx.team, challenge)
+    active_container = team_labs.find_lab(request.user, challenge, team)
+    if active_container is None:
+        raise Http404
+
+    if team and not team_labs.leave(active_container, request.user):
+        # Jamoadoshlar hali ishlayapti - konteyner oxirgi a'zo chiqquncha qoladi
+        messages.success(request, "Siz laboratoriyadan chiqdingiz. Jamoadoshlaringiz undan foydalanishda davom etadi.")
+        return redirect('challenge_detail', challenge_id=challenge.id)
+
+    # Docker stop fonda bajariladi; qator (va port) job tugagach o'chiriladi
+    jobs.enqueue_stop(active_container)
+    messages.success(request, "Laboratoriya o'chirilmoqda.")
 
     return redirect('challenge_detail', challenge_id=challenge.id)
 
+@login_required
+def extend_container_view(request, challenge_id):
+    challenge = get_object_or_404(Challenge, id=challenge_id)
+    active_container = team_labs.find_lab(request.user, challenge, team_labs.lab_team(request.ctx.team, challenge))
+    if active_container is None or active_container.state != ActiveContainer.RUNNING:
+        raise Http404
+    previous = active_container.expires_at
+    expires_at = reaper.extend(active_container)
+    if expires_at == previous:
+        messages.warning(request, "Laboratoriya vaqtini boshqa uzaytirib bo'lmaydi.")
+    else:
+        messages.success(request, f"Laboratoriya vaqti uzaytirildi ({timezone.localtime(expires_at):%H:%M} gacha).")
+    return redirect('challenge_detail', challenge_id=challenge_id)
+
+@login_required
+def lab_status(request, challenge_id):
+    """Challenge sahifasi shu endpointni so'raydi (polling) - konteyner holati JSON da."""
+    challenge = get_object_or_404(Challenge, id=challenge_id)
+    active_container = team_labs.find_lab(request.user, challenge, team_labs.lab_team(request.ctx.team, challenge))
+    if active_container is None:
+        return JsonResponse({'state': 'none'})
+
+    data = {'state': active_container.state}
+    if active_container.state == ActiveContainer.QUEUED:
+        data['position'] = admission.queue_position(active_container)
+    if active_container.state == ActiveContainer.RUNNING:
+        data['url'] = nodes.registry.public_url(active_container)
+        data['expires_at'] = active_container.expires_at
+    elif active_container.state == ActiveContainer.FAILED:
+        data['error'] = active_container.error
+    return JsonResponse(data)
+
 def kick_team_member(request, member_id):
-    user_team = request.user.teams.first()
+    user_team = request.ctx.team
     if not user_team:
         return redirect('team_dashboard')
     
-    if user_team.captain != request.user:
+    if user_team.captain_id != request.user.id:
         messages.error(request, "Faqat kapitan a'zolarni chetlashtira oladi.")
         return redirect('team_dashboard')
     
@@ -912,11 +968,11 @@ def kick_team_member(request, member_id):
 
 @login_required
 def leave_team(request):
-    user_team = request.user.teams.first()
+    user_team = request.ctx.team
     if not user_team:
         return redirect('team_dashboard')
         
-    if user_team.captain == request.user:
+    if user_team.captain_id == request.user.id:
         messages.error(request, "Kapitan jamoadan chiqa olmaydi. Jamoani o'chiring yoki kapitanni o'zgartiring.")
         return redirect('team_dashboard')
         
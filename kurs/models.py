@@ -118,17 +118,12 @@ class UserProfile(models.Model):
         verbose_name = "Foydalanuvchi profili"
         verbose_name_plural = "Foydalanuvchi profillari"
 
-# Signal to create/update UserProfile
+# Signal to create UserProfile (faqat yangi foydalanuvchi uchun;
+# profilsiz eski foydalanuvchilar 0010 migratsiyasida to'ldirilgan)
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 @receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
-    if created:
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
         UserProfile.objects.create(user=instance)
-
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    # This prevents "RelatedObjectDoesNotExist" error for old users without profile
-    UserProfile.objects.get_or_create(user=instance)
-    instance.profile.save()
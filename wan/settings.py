@@ -69,6 +69,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'ctf.middleware.UserContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     
@@ -109,6 +110,15 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Parallel yozuvchilar "database is locked" o'rniga navbat kutadi
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # Fayldagi test bazasi: in-memory bazada threadli (parallel) testlar ishlamaydi
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -132,6 +142,59 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Cache
+# Progress bitsetlari va boshqa tezkor ma'lumotlar shu yerda saqlanadi.
+# Bir nechta worker process bilan ishlaganda umumiy backend (Redis/Memcached) shart:
+# LocMem process ichida qoladi va o'chirishlar boshqa worker'larga yetmaydi.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'wan-net',
+    }
+}
+
+# Jonli scoreboard (ctf/live.py). Standart - poll (WSGI: runserver/gunicorn).
+# SSE oqimi faqat ASGI server bilan yoqilsin: `pip install uvicorn`,
+# `uvicorn wan.asgi:application --workers 4`. WSGI da har oqim worker'ni band qiladi.
+CTF_LIVE_STREAM = False
+
+
+# Docker laboratoriyalari
+# Node'lar ro'yxati (batafsil: ctf/nodes.py). 'local' - docker.from_env()
+CTF_DOCKER_NODES = {
+    'local': {},
+}
+# least_loaded - yukni tekis taqsimlash, binpack - avval bitta node ni to'ldirish
+CTF_NODE_STRATEGY = 'least_loaded'
+# Daemon ga bir vaqtdagi run/stop soni (fon job'lari ham shu songa teng)
+CTF_DOCKER_CONCURRENCY = 4
+# Docker API so'rovlari timeout i (soniya) va node boshiga HTTP ulanishlar pool'i
+CTF_DOCKER_TIMEOUT = 15
+CTF_DOCKER_POOL_SIZE = 10
+# Laboratoriya ijarasi (soniya): reap_containers muddati o'tganlarini to'xtatadi
+CTF_LAB_TTL = 240
+CTF_LAB_MAX_LIFETIME = 3600
+# Sahifa shuncha vaqt ochilmasa to'xtatish (None - o'chirilgan)
+CTF_LAB_IDLE_TIMEOUT = None
+# Host sig'imi: laboratoriyalar soni LAB_MEM_LIMIT/LAB_CPU_QUOTA dan hisoblanadi
+# (CTF_LAB_CAPACITY berilsa - aynan shu son)
+CTF_HOST_MEMORY_MB = 4096
+CTF_HOST_CPUS = 4
+CTF_LAB_QUEUE_TIMEOUT = 900
+# Konteyner ilovasi javob berishini necha soniya kutish (readiness probe)
+CTF_LAB_READINESS = True
+CTF_LAB_READY_TIMEOUT = 30
+# Flag urinishlari buferi (ctf/attempt_log.py): shuncha ms yoki shuncha qatordan keyin bulk_create
+CTF_ATTEMPT_FLUSH_MS = 250
+CTF_ATTEMPT_BATCH_SIZE = 200
+# Baza mavjud bo'lmaganda process tugashida urinishlar shu faylga yoziladi
+CTF_ATTEMPT_SPOOL = BASE_DIR / 'attempts.spool'
+# Progress bitseti keshi, soniya (LocMem da boshqa worker'lar shuncha eskirgan ko'rishi mumkin)
+CTF_PROGRESS_TTL = 60
+# Masalalar ro'yxati sahifasi keshi, soniya (keyingi turnir o'tishidan uzoq emas, ctf/scheduler.py)
+CTF_CHALLENGE_LIST_TTL = 60
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/6.0/topics/i18n/
 